@@ -9,15 +9,13 @@ import os
 import asyncio
 import argparse
 from datetime import datetime
-from src.crawlers.base.observer import DataSaveObserver, LLMProcessingObserver
-from src.data.repositories.RealEstateRepository import RealEstateRepository
-from src.data.repositories.WebsiteStateRepository import WebsiteStateRepository
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 # Setup logging
-from src.services.llm_service import LLMService
+# Các service/repository (crawl4ai, numpy, pymongo, LLM backend...) được import trong từng action,
+# để `--action list` hay `--help` không phải trả chi phí import của những phần không dùng tới
 from src.utils.logging import setup_logging
 
 setup_logging()
@@ -28,6 +26,11 @@ def get_enabled_websites_from_db(config):
     Trả về dict {name: config} cho các website đang enabled,
     lấy trạng thái từ DB, còn config chi tiết lấy từ config.
     """
+    from src.data.database.connection import db
+    from src.data.repositories.WebsiteStateRepository import WebsiteStateRepository
+
+    if not db.connected and not db.connect(config.MONGODB_URI):
+        raise RuntimeError(f"Failed to connect to MongoDB: {config.MONGODB_URI}")
     enabled_names = WebsiteStateRepository.get_enabled_websites()  # trả về list tên web đang enabled
     return {name: config.WEBSITES[name] for name in enabled_names if name in config.WEBSITES}
 
@@ -41,11 +44,8 @@ async def run_full_crawl():
         # Import components
         from src.config.settings import config
         from src.crawlers.base.factory import CrawlerFactory
-        from src.crawlers.base.observer import (
-            DataSaveObserver, LoggingObserver,
-            ProgressObserver, LLMProcessingObserver
-        )
-
+        from src.data.repositories.RealEstateRepository import RealEstateRepository
+        from src.services.crawl_pipeline import CrawlPipeline
         from src.services.llm_service import LLMService
         from src.utils.logging import get_logger
 
@@ -63,14 +63,7 @@ async def run_full_crawl():
             print(f"   - {name}")
 
         # Initialize observers
-        data_save_observer = DataSaveObserver(repository)
-        llm_observer = LLMProcessingObserver(llm_service, downstream_observers=[data_save_observer])
-        observers = [
-            LoggingObserver(logger),
-            ProgressObserver(),
-            llm_observer,
-            data_save_observer
-        ]
+        pipeline = CrawlPipeline(repository, llm_service, logger, config)
 
         total_properties = 0
 
@@ -80,8 +73,7 @@ async def run_full_crawl():
             print("-" * 40)
             try:
                 crawler = CrawlerFactory.create_crawler(website_name, website_config)
-                for observer in observers:
-                    crawler.add_observer(observer)
+                pipeline.attach(crawler)
                 properties = await crawler.crawl_all()
                 print(f"✅ {website_name}: Found {len(properties)} properties")
                 return len(properties)
@@ -97,9 +89,8 @@ async def run_full_crawl():
         # Chạy song song
         results = await asyncio.gather(*tasks)
         total_properties = sum(results)
-        if llm_observer.tasks:
-            print(">>> [MAIN] Waiting for all LLM tasks to finish...")
-            await asyncio.gather(*llm_observer.tasks)
+        print(">>> [MAIN] Waiting for LLM enrichment queue to drain...")
+        await pipeline.drain()
 
         print(f"\n🎉 Crawl completed!")
         print(f"   Total properties found: {total_properties}")
@@ -122,7 +113,9 @@ async def test_single_website(website_name):
     try:
         from src.config.settings import config
         from src.crawlers.base.factory import CrawlerFactory
-        from src.crawlers.base.observer import LoggingObserver, ProgressObserver
+        from src.data.repositories.RealEstateRepository import RealEstateRepository
+        from src.services.crawl_pipeline import CrawlPipeline
+        from src.services.llm_service import LLMService
         from src.utils.logging import get_logger
 
         repository = RealEstateRepository()
@@ -147,16 +140,8 @@ async def test_single_website(website_name):
         print(f"✅ Crawler created: {type(crawler).__name__}")
 
         # Add basic observers  
-        data_save_observer = DataSaveObserver(repository)
-        llm_observer = LLMProcessingObserver(llm_service, downstream_observers=[data_save_observer])
-        observers = [
-            LoggingObserver(logger),
-            ProgressObserver(),
-            llm_observer,
-            data_save_observer
-        ]
-        for observer in observers:
-            crawler.add_observer(observer)
+        pipeline = CrawlPipeline(repository, llm_service, logger, config)
+        pipeline.attach(crawler)
 
         # Test crawl (will use default settings from config)
         print(f"\n🚀 Starting crawl test...")
@@ -164,9 +149,8 @@ async def test_single_website(website_name):
 
         properties = await crawler.crawl_all()
 
-        if llm_observer.tasks:
-            print(">>> [MAIN] Waiting for all LLM tasks to finish...")
-            await asyncio.gather(*llm_observer.tasks)
+        print(">>> [MAIN] Waiting for LLM enrichment queue to drain...")
+        await pipeline.drain()
 
         print(f"✅ Test successful!")
         print(f"   - Properties found: {len(properties)}")
@@ -183,6 +167,56 @@ async def test_single_website(website_name):
         return False
 
 
+async def run_profiled_crawl(website_name=None, mode="sample", output_dir=None):
+    """
+    Crawl có profile: các site chạy lần lượt (không song song như --action crawl) để mỗi site
+    có một báo cáo riêng trong PROFILE_DIR: loop lag, stack chặn loop, sampler/cProfile, tracemalloc
+    """
+    print(f"🔬 Profiling crawl (mode: {mode})")
+    print("=" * 60)
+
+    try:
+        from src.config.settings import config
+        from src.crawlers.base.factory import CrawlerFactory
+        from src.data.repositories.RealEstateRepository import RealEstateRepository
+        from src.services.crawl_pipeline import CrawlPipeline
+        from src.services.llm_service import LLMService
+        from src.utils.logging import get_logger
+        from src.utils.profiling import CrawlProfiler
+
+        repository = RealEstateRepository()
+        llm_service = LLMService()
+        logger = get_logger("crawler_profile")
+        websites = get_enabled_websites_from_db(config)
+        if website_name:
+            if website_name not in websites:
+                print(f"❌ Website '{website_name}' not found in enabled websites")
+                return False
+            websites = {website_name: websites[website_name]}
+
+        pipeline = CrawlPipeline(repository, llm_service, logger, config)
+        for name, website_config in websites.items():
+            print(f"\n🚀 Profiling crawl for: {name}")
+            crawler = CrawlerFactory.create_crawler(name, website_config)
+            pipeline.attach(crawler)
+            async with CrawlProfiler(name, mode=mode, output_dir=output_dir, config=config) as profiler:
+                properties = await crawler.crawl_all()
+                # Enrich/lưu DB chạy sau crawl cũng nằm trong profile
+                await pipeline.drain()
+                profiler.extra["properties"] = len(properties)
+                if crawler.crawl_stats:
+                    profiler.extra["status"] = crawler.crawl_stats.status
+                    profiler.extra["timings"] = crawler.crawl_stats.timings
+            print(f"✅ {name}: {len(properties)} properties, report in {profiler.output_path}")
+        return True
+
+    except Exception as e:
+        print(f"❌ Profiling failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
 async def list_websites():
     """List all available websites (enabled in DB)"""
     print("🌐 Available Websites")
@@ -204,16 +238,180 @@ async def list_websites():
         return False
 
 
+def run_normalize(batch_size=None, dry_run=False):
+    """Chuẩn hóa lại dữ liệu đã lưu trong collection properties"""
+    print("🧹 Normalizing stored properties" + (" (dry run)" if dry_run else ""))
+    print("=" * 60)
+
+    try:
+        from src.services.normalization_service import NormalizationService
+
+        totals = NormalizationService(batch_size=batch_size).run(dry_run=dry_run)
+        print(f"✅ Scanned: {totals['scanned']}, changed: {totals['changed']}, modified: {totals['modified']}")
+        return True
+
+    except Exception as e:
+        print(f"❌ Normalization failed: {e}")
+        return False
+
+
+def run_dedup(batch_size=None, dry_run=False):
+    """Backfill cluster_id (tin gần trùng) cho toàn bộ collection properties"""
+    print("🔁 Detecting near-duplicate properties" + (" (dry run)" if dry_run else ""))
+    print("=" * 60)
+
+    try:
+        from src.services.dedup_service import DedupService
+
+        totals = DedupService().backfill(batch_size=batch_size, dry_run=dry_run)
+        print(f"✅ Scanned: {totals['scanned']}, clusters: {totals['clusters']}, "
+              f"duplicates: {totals['duplicates']}, modified: {totals['modified']}")
+        return True
+
+    except Exception as e:
+        print(f"❌ Dedup failed: {e}")
+        return False
+
+
+def run_market_stats():
+    """Tính lại toàn bộ collection market_stats từ properties"""
+    print("📈 Rebuilding market statistics")
+    print("=" * 60)
+
+    try:
+        from src.services.market_stats_service import MarketStatsService
+
+        total = MarketStatsService().rebuild()
+        print(f"✅ Market stats groups: {total}")
+        return True
+
+    except Exception as e:
+        print(f"❌ Market stats rebuild failed: {e}")
+        return False
+
+
+def run_export(fmt="parquet", output_dir=None, incremental=False, batch_size=None):
+    """Xuất properties ra Parquet/CSV gzip cho phía phân tích"""
+    print(f"📦 Exporting properties to {fmt}" + (" (incremental)" if incremental else ""))
+    print("=" * 60)
+
+    try:
+        from src.services.export_service import ExportService
+
+        result = ExportService(batch_size=batch_size).export(fmt=fmt, output_dir=output_dir, incremental=incremental)
+        print(f"✅ Rows: {result['rows']}, files: {len(result['files'])}, watermark: {result['watermark']}")
+        for path in result['files']:
+            print(f"   - {path}")
+        return True
+
+    except Exception as e:
+        print(f"❌ Export failed: {e}")
+        return False
+
+
+def run_enqueue(website_name=None):
+    """Chia site thành các shard (search URL × khoảng trang) và đưa vào hàng đợi crawl_jobs"""
+    print("📥 Enqueueing crawl jobs")
+    print("=" * 60)
+
+    try:
+        from src.config.settings import config
+        from src.crawlers.base.shards import plan_shards
+        from src.data.repositories.CrawlJobRepository import CrawlJobRepository
+
+        websites = get_enabled_websites_from_db(config)
+        if website_name:
+            if website_name not in websites:
+                print(f"❌ Website '{website_name}' not found in enabled websites")
+                return False
+            websites = {website_name: websites[website_name]}
+        for name, website_config in websites.items():
+            shards = plan_shards(website_config['search_urls'], config.PAGES_SITE, config.SHARD_PAGES)
+            result = CrawlJobRepository.enqueue(name, shards, config.JOB_MAX_ATTEMPTS)
+            print(f"✅ {name}: queued {result['queued']} shards, skipped {result['skipped']} (run {result['run_id']})")
+        return True
+
+    except Exception as e:
+        print(f"❌ Enqueue failed: {e}")
+        return False
+
+
+def run_worker(worker_id=None, max_jobs=None, exit_when_idle=False):
+    """Worker của hàng đợi crawl_jobs; chạy nhiều tiến trình/node để cùng crawl"""
+    print("👷 Starting crawl job worker")
+    print("=" * 60)
+
+    try:
+        from src.services.crawl_job_worker import CrawlJobWorker
+
+        worker = CrawlJobWorker(worker_id)
+        print(f"✅ Worker id: {worker.worker_id}")
+        processed = asyncio.run(worker.run(max_jobs=max_jobs, exit_when_idle=exit_when_idle))
+        print(f"✅ Jobs processed: {processed}")
+        return True
+
+    except Exception as e:
+        print(f"❌ Worker failed: {e}")
+        return False
+
+
+def run_indexes():
+    """Đồng bộ index theo khai báo trong model và in thống kê sử dụng ($indexStats)"""
+    print("🗂️ Syncing MongoDB indexes")
+    print("=" * 60)
+
+    try:
+        from src.config.settings import config
+        from src.data.database.connection import db
+        from src.data.database.indexes import IndexManager
+
+        if not db.connected and not db.connect(config.MONGODB_URI):
+            print(f"❌ Failed to connect to MongoDB: {config.MONGODB_URI}")
+            return False
+
+        manager = IndexManager(db.db, drop_stale=config.INDEX_DROP_STALE)
+        for collection, result in manager.sync().items():
+            print(f"📁 {collection}: created {result['created'] or '-'}, dropped {result['dropped'] or '-'}"
+                  + (f", failed {result['failed']}" if result['failed'] else ""))
+
+        print("\n📊 Index usage (since mongod start):")
+        for row in manager.usage():
+            flag = "" if row["declared"] else " (undeclared)"
+            print(f"   {row['collection']}.{row['name']}: {row['ops']} ops{flag}")
+        return True
+
+    except Exception as e:
+        print(f"❌ Index sync failed: {e}")
+        return False
+
+
 def main():
     parser = argparse.ArgumentParser(description='Real Estate Crawler')
-    parser.add_argument('--action', choices=['crawl', 'test', 'list'],
+    parser.add_argument('--action', choices=['crawl', 'test', 'list', 'normalize', 'dedup', 'indexes',
+                                             'market_stats', 'export', 'enqueue', 'worker'],
                         default='crawl', help='Action to perform')
-    parser.add_argument('--website', help='Website to test (for test action)')
+    parser.add_argument('--website', help='Website to test (for test/enqueue action)')
+    parser.add_argument('--batch-size', type=int, help='Cursor batch size (for normalize/dedup action)')
+    parser.add_argument('--dry-run', action='store_true', help='Only count changes (for normalize/dedup action)')
+    parser.add_argument('--format', choices=['parquet', 'csv'], default='parquet', help='Export format (for export action)')
+    parser.add_argument('--output', help='Output directory (for export action, default EXPORT_DIR)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only export properties saved since the last export (for export action)')
+    parser.add_argument('--worker-id', help='Worker id, default <hostname>:<pid> (for worker action)')
+    parser.add_argument('--max-jobs', type=int, help='Stop after this many jobs (for worker action)')
+    parser.add_argument('--exit-when-idle', action='store_true', help='Stop when the queue is empty (for worker action)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Profile the crawl site by site and write reports to PROFILE_DIR (for crawl/test action)')
+    parser.add_argument('--profiler', choices=['sample', 'cprofile', 'none'], default='sample',
+                        help='CPU profiler for --profile: stack sampler (flame graph), cProfile, or none')
+    parser.add_argument('--profile-dir', help='Report directory (for --profile, default PROFILE_DIR)')
 
     args = parser.parse_args()
 
     try:
-        if args.action == 'list':
+        if args.profile and args.action in ('crawl', 'test'):
+            asyncio.run(run_profiled_crawl(args.website, args.profiler, args.profile_dir))
+        elif args.action == 'list':
             asyncio.run(list_websites())
         elif args.action == 'test':
             if not args.website:
@@ -221,6 +419,20 @@ def main():
                 print("Use --action list to see available websites")
                 return
             asyncio.run(test_single_website(args.website))
+        elif args.action == 'normalize':
+            run_normalize(args.batch_size, args.dry_run)
+        elif args.action == 'dedup':
+            run_dedup(args.batch_size, args.dry_run)
+        elif args.action == 'indexes':
+            run_indexes()
+        elif args.action == 'market_stats':
+            run_market_stats()
+        elif args.action == 'export':
+            run_export(args.format, args.output, args.incremental, args.batch_size)
+        elif args.action == 'enqueue':
+            run_enqueue(args.website)
+        elif args.action == 'worker':
+            run_worker(args.worker_id, args.max_jobs, args.exit_when_idle)
         elif args.action == 'crawl':
             total = asyncio.run(run_full_crawl())
             if total > 0:
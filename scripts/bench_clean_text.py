@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: clean_text / strip_accents dùng str.translate so với bản cũ.
+
+    python scripts/bench_clean_text.py [--repeat 100]
+
+Corpus: mô tả tin đăng thật trong scripts/fixtures/descriptions.txt (mỗi dòng một
+mô tả, xuống dòng được escape thành \\n). Bản cũ giữ nguyên văn bên dưới (legacy_*).
+"""
+import argparse
+import os
+import re
+import sys
+import timeit
+import unicodedata
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from src.utils import text_processing  # noqa: E402
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "descriptions.txt")
+
+
+# --------------------------- legacy implementations ---------------------------
+
+def legacy_clean_text(text: str) -> str:
+    """Làm sạch text"""
+    if not text:
+        return None
+
+    # Loại bỏ khoảng trắng thừa
+    text = re.sub(r'\s+', ' ', text.strip())
+
+    # Loại bỏ ký tự đặc biệt
+    text = re.sub(
+        r'[^\w\s\-.,:;()\[\]{}!?@#$%^&*+=<>/\\|`~"\'àáạảãâầấậẩẫăằắặẳẵèéẹẻẽêềếệểễìíịỉĩòóọỏõôồốộổỗơờớợởỡùúụủũưừứựửữỳýỵỷỹđ]',
+        '', text)
+
+    return text.strip()
+
+
+def legacy_strip_accents(text: str) -> str:
+    """Bỏ dấu tiếng Việt (giữ nguyên hoa/thường), dùng cho so khớp không dấu"""
+    if not text:
+        return text
+    text = unicodedata.normalize('NFD', text)
+    text = ''.join(ch for ch in text if unicodedata.category(ch) != 'Mn')
+    return text.replace('đ', 'd').replace('Đ', 'D')
+
+
+CASES = [
+    ("clean_text", legacy_clean_text, text_processing.clean_text),
+    ("strip_accents", legacy_strip_accents, text_processing.strip_accents),
+    ("clean+fold",
+     lambda text: legacy_strip_accents(legacy_clean_text(text)),
+     lambda text: text_processing.clean_text(text, fold_accents=True)),
+]
+
+
+def load_corpus(path: str = FIXTURE):
+    with open(path, encoding="utf-8") as f:
+        return [line.rstrip("\n").replace("\\n", "\n") for line in f if line.strip()]
+
+
+def bench(func, corpus, repeat: int) -> float:
+    """Thời gian trung bình mỗi lần gọi (micro giây)"""
+    timer = timeit.Timer(lambda: [func(text) for text in corpus])
+    best = min(timer.repeat(repeat=5, number=repeat))
+    return best / (repeat * len(corpus)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    avg_len = sum(len(text) for text in corpus) // len(corpus)
+    print(f"Corpus: {len(corpus)} descriptions (avg {avg_len} chars), repeat={args.repeat}")
+    print(f"{'function':<16}{'legacy us':>12}{'new us':>12}{'speedup':>10}{'diffs':>8}")
+    for name, legacy, new in CASES:
+        legacy_us = bench(legacy, corpus, args.repeat)
+        new_us = bench(new, corpus, args.repeat)
+        # Khác biệt chỉ do khoảng trắng (bản cũ để lại 2 space sau khi xóa ký tự) không tính
+        diffs = [text for text in corpus if " ".join((legacy(text) or "").split()) != (new(text) or "")]
+        print(f"{name:<16}{legacy_us:>12.2f}{new_us:>12.2f}{legacy_us / new_us:>9.2f}x{len(diffs):>8}")
+
+
+if __name__ == "__main__":
+    main()
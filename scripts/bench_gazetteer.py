@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: gazetteer Aho-Corasick so với extract_city_from_address cũ và
+với cách dò tuần tự từng alias (cùng tập alias với gazetteer).
+
+    python scripts/bench_gazetteer.py [--repeat 200]
+
+Corpus: scripts/fixtures/addresses.txt. Bản cũ giữ nguyên văn bên dưới (legacy_*).
+"""
+import argparse
+import os
+import re
+import sys
+import timeit
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from src.utils import gazetteer  # noqa: E402
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "addresses.txt")
+
+
+# --------------------------- legacy implementations ---------------------------
+
+def legacy_extract_city_from_address(text: str) -> str:
+    """Extract city name from address (after last comma, clean format)"""
+    if not text:
+        return None
+
+    # Split by comma and get the last part
+    parts = text.split(',')
+    if len(parts) >= 2:
+        city_part = parts[-1].strip()
+    else:
+        city_part = text.strip()
+
+    # Clean city name - remove prefixes like TP, Thành phố, Tỉnh, etc.
+    city_part = re.sub(r'^(TP\.?\s*|Thành phố\s*|Tỉnh\s*|Huyện\s*)', '', city_part, flags=re.IGNORECASE)
+
+    # Specific handling for common Vietnamese cities
+    city_mapping = {
+        'Hồ Chí Minh': 'Hồ Chí Minh',
+        'HCM': 'Hồ Chí Minh',
+        'TPHCM': 'Hồ Chí Minh',
+        'Ho Chi Minh': 'Hồ Chí Minh',
+        'Sai Gon': 'Hồ Chí Minh',
+        'Sài Gòn': 'Hồ Chí Minh',
+        'Hà Nội': 'Hà Nội',
+        'Ha Noi': 'Hà Nội',
+        'Hanoi': 'Hà Nội',
+        'Đà Nẵng': 'Đà Nẵng',
+        'Da Nang': 'Đà Nẵng',
+        'Danang': 'Đà Nẵng',
+        'Hải Phòng': 'Hải Phòng',
+        'Hai Phong': 'Hải Phòng',
+        'Cần Thơ': 'Cần Thơ',
+        'Can Tho': 'Cần Thơ',
+        'Biên Hòa': 'Biên Hòa',
+        'Bien Hoa': 'Biên Hòa',
+        'Nha Trang': 'Nha Trang',
+        'Vũng Tàu': 'Vũng Tàu',
+        'Vung Tau': 'Vũng Tàu',
+        'Huế': 'Huế',
+        'Hue': 'Huế'
+    }
+
+    # Check exact matches first
+    for key, value in city_mapping.items():
+        if key.lower() in city_part.lower():
+            return value
+
+    # If no exact match, clean and return the city part
+    city_part = city_part.strip()
+
+    # Remove any remaining prefixes/suffixes
+    city_part = re.sub(r'(việt nam|vietnam|vn)$', '', city_part, flags=re.IGNORECASE).strip()
+
+    return city_part if city_part else None
+
+
+def build_naive_resolver(gz: gazetteer.Gazetteer):
+    """Dò tuần tự mọi alias của gazetteer bằng regex có biên từ: O(số alias) mỗi địa chỉ"""
+    patterns = []
+    stack = [(0, "")]
+    goto, out = gz._automaton._goto, gz._automaton._out
+    while stack:
+        node, prefix = stack.pop()
+        for length, entry in out[node]:
+            if length == len(prefix):
+                patterns.append((re.compile(r'\b' + re.escape(prefix) + r'\b'), entry))
+        stack.extend((child, prefix + ch) for ch, child in goto[node].items())
+
+    def resolve(address: str):
+        text = gazetteer.fold(address)
+        found = {}
+        for pattern, entry in patterns:
+            if entry.kind in (gazetteer.CITY, gazetteer.DISTRICT) and pattern.search(text):
+                found.setdefault(entry.kind, entry.name)
+        return found
+
+    return resolve, len(patterns)
+
+
+def load_corpus(path: str = FIXTURE):
+    with open(path, encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+
+def bench(func, corpus, repeat: int) -> float:
+    """Thời gian trung bình mỗi địa chỉ (micro giây)"""
+    timer = timeit.Timer(lambda: [func(text) for text in corpus])
+    best = min(timer.repeat(repeat=5, number=repeat))
+    return best / (repeat * len(corpus)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--show", action="store_true", help="In kết quả resolve từng địa chỉ")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    gz = gazetteer.get_gazetteer()
+    naive_resolve, alias_count = build_naive_resolver(gz)
+    print(f"Corpus: {len(corpus)} addresses, {alias_count} aliases, repeat={args.repeat}")
+
+    rows = [
+        ("legacy city (25 aliases)", legacy_extract_city_from_address),
+        ("naive alias scan", naive_resolve),
+        ("gazetteer.resolve", gz.resolve),
+    ]
+    for name, func in rows:
+        print(f"{name:<28}{bench(func, corpus, args.repeat):>10.2f} us")
+    timer = timeit.Timer(lambda: gazetteer.resolve_addresses(corpus))
+    batch_us = min(timer.repeat(repeat=5, number=args.repeat)) / (args.repeat * len(corpus)) * 1e6
+    print(f"{'resolve_addresses (batch)':<28}{batch_us:>10.2f} us")
+
+    legacy_hits = sum(1 for text in corpus if legacy_extract_city_from_address(text) in gazetteer.PROVINCES)
+    results = gazetteer.resolve_addresses(corpus)
+    print(f"City resolved to a province: legacy {legacy_hits}/{len(corpus)}, "
+          f"gazetteer {sum(1 for r in results if r['city'])}/{len(corpus)}; "
+          f"district {sum(1 for r in results if r['district'])}, ward {sum(1 for r in results if r['ward'])}")
+    if args.show:
+        for text, result in zip(corpus, results):
+            print(f"    {text!r}: {result}")
+
+
+if __name__ == "__main__":
+    main()
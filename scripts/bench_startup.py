@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark thời gian khởi động (cold start) của từng entry point, dựa trên `python -X importtime`.
+
+    python scripts/bench_startup.py [--runs 5] [--top 15] [--only cli,pool-worker]
+    python scripts/bench_startup.py --save startup.json        # lưu kết quả làm mốc
+    python scripts/bench_startup.py --compare startup.json     # so với mốc đã lưu
+
+Mỗi lần đo là một interpreter mới (không có __pycache__ ấm thì lần đầu chậm hơn, nên lấy median).
+Entry point `api` chạy phần import-time của website_api (kết nối MongoDB, khởi động scheduler),
+nên cần MongoDB truy cập được như khi chạy API thật.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Những gì mỗi tiến trình import trước khi bắt đầu làm việc
+ENTRY_POINTS = {
+    # main.py trước khi dispatch action (mọi --action đều trả phần này)
+    "cli": "import main",
+    # main.py --action list
+    "cli-list": "import main; from src.data.repositories.WebsiteStateRepository import WebsiteStateRepository",
+    # Tiến trình con spawn của CrawlWorkerPool (trước khi vào _worker_loop)
+    "pool-worker": "import src.services.crawl_worker_pool",
+    # main.py --action worker
+    "job-worker": "import main; import src.services.crawl_job_worker",
+    # Tạo một crawler: chỉ import module của site đó
+    "crawler": "from src.crawlers.base.factory import CrawlerFactory; CrawlerFactory.get_crawler_class('mogi.vn')",
+    # uvicorn src.api.website_api:app
+    "api": "import src.api.website_api",
+}
+
+
+def parse_importtime(stderr: str):
+    """[(module, self_us, cumulative_us, depth)] từ output của -X importtime"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            self_us, cumulative_us = int(self_us), int(cumulative_us)
+        except ValueError:
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), self_us, cumulative_us, depth))
+    return rows
+
+
+def measure(code: str):
+    """(wall ms, tổng import ms, các module) của một interpreter mới chạy `code`"""
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                          capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - started) * 1000
+    rows = parse_importtime(proc.stderr)
+    if proc.returncode != 0:
+        errors = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError("\n".join(errors[-5:]))
+    import_ms = sum(cumulative for _, _, cumulative, depth in rows if depth == 0) / 1000
+    return wall_ms, import_ms, rows
+
+
+def bench(name: str, code: str, runs: int, top: int):
+    walls, imports, last_rows = [], [], []
+    for _ in range(runs):
+        wall_ms, import_ms, last_rows = measure(code)
+        walls.append(wall_ms)
+        imports.append(import_ms)
+    # Module tốn nhất: chỉ lấy package cấp cao (depth 0) để không đếm trùng phần lồng bên trong
+    heaviest = sorted(((cumulative / 1000, module) for module, _, cumulative, depth in last_rows if depth == 0),
+                      reverse=True)[:top]
+    return {
+        "wall_ms": statistics.median(walls),
+        "import_ms": statistics.median(imports),
+        "modules": len(last_rows),
+        "heaviest": [[module, round(ms, 1)] for ms, module in heaviest],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Số module nặng nhất in ra cho mỗi entry point")
+    parser.add_argument("--only", help="Danh sách entry point, cách nhau bởi dấu phẩy")
+    parser.add_argument("--save", help="Ghi kết quả ra file JSON")
+    parser.add_argument("--compare", help="File JSON kết quả cũ để so sánh")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(ENTRY_POINTS)
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = {}
+    print(f"{'entry point':<14}{'wall ms':>10}{'import ms':>11}{'modules':>9}{'vs base':>10}")
+    for name in names:
+        try:
+            result = bench(name, ENTRY_POINTS[name], args.runs, args.top)
+        except RuntimeError as e:
+            print(f"{name:<14} failed: {e}")
+            continue
+        results[name] = result
+        delta = ""
+        if name in baseline:
+            delta = f"{result['wall_ms'] - baseline[name]['wall_ms']:+.0f}"
+        print(f"{name:<14}{result['wall_ms']:>10.0f}{result['import_ms']:>11.0f}{result['modules']:>9}{delta:>10}")
+        for module, ms in result["heaviest"]:
+            print(f"{'':<16}{ms:>8.1f} ms  {module}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
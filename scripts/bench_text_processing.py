@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: parser giá/diện tích/số phòng mới (compiled, single-pass) so với bản cũ.
+
+    python scripts/bench_text_processing.py [--repeat 200]
+
+Bản cũ được giữ nguyên văn bên dưới (legacy_*) để so sánh tốc độ và kết quả
+trên corpus scripts/fixtures/price_area_corpus.txt.
+"""
+import argparse
+import os
+import re
+import sys
+import timeit
+from typing import Optional
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from src.utils import text_processing  # noqa: E402
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "price_area_corpus.txt")
+
+
+# --------------------------- legacy implementations ---------------------------
+
+def legacy_extract_price(text: str) -> Optional[float]:
+    """Trích xuất giá từ text (VND), hỗ trợ cả dạng '12 tỷ 500 triệu'."""
+    if not text:
+        return None
+
+    text = text.lower().replace(',', '.').replace('  ', ' ')
+    total = 0
+
+    # Xử lý dạng "x tỷ y triệu"
+    ty_match = re.search(r'(\d+(?:[.,]\d+)?)\s*t[ỷy]', text)
+    trieu_match = re.search(r'(\d+(?:[.,]\d+)?)\s*triệu', text)
+    nghin_match = re.search(r'(\d+(?:[.,]\d+)?)\s*(nghìn|ngàn|k)', text)
+
+    if ty_match:
+        ty = float(ty_match.group(1).replace(',', '.'))
+        total += ty * 1_000_000_000
+    if trieu_match:
+        trieu = float(trieu_match.group(1).replace(',', '.'))
+        total += trieu * 1_000_000
+    if nghin_match:
+        nghin = float(nghin_match.group(1).replace(',', '.'))
+        total += nghin * 1_000
+
+    # Nếu có dạng "x tỷ y triệu" thì trả về luôn
+    if total > 0:
+        return total
+
+    # Nếu không, fallback về các pattern cũ
+    patterns = [
+        (r'(\d+)[,\.](\d+)\s*tỷ', 1_000_000_000),
+        (r'(\d+)[,\.](\d+)\s*ty', 1_000_000_000),
+        (r'(\d+)\s*tỷ', 1_000_000_000),
+        (r'(\d+)\s*ty', 1_000_000_000),
+        (r'(\d+)[,\.](\d+)\s*triệu', 1_000_000),
+        (r'(\d+)[,\.](\d+)\s*tr(?![aăâ])', 1_000_000),
+        (r'(\d+)\s*triệu', 1_000_000),
+        (r'(\d+)\s*tr(?![aăâ])', 1_000_000),
+        (r'(\d+)[,\.](\d+)\s*nghìn', 1_000),
+        (r'(\d+)[,\.](\d+)\s*ngàn', 1_000),
+        (r'(\d+)[,\.](\d+)\s*k', 1_000),
+        (r'(\d+)\s*nghìn', 1_000),
+        (r'(\d+)\s*ngàn', 1_000),
+        (r'(\d+)\s*k', 1_000),
+        (r'(\d+(?:\d{3})*)', 1),
+    ]
+
+    for pattern, multiplier in patterns:
+        match = re.search(pattern, text)
+        if match:
+            try:
+                if len(match.groups()) == 2:
+                    integer_part = int(match.group(1))
+                    decimal_part = int(match.group(2))
+                    if decimal_part < 10:
+                        value = integer_part + decimal_part / 10.0
+                    else:
+                        value = integer_part + decimal_part / 100.0
+                else:
+                    value = float(match.group(1))
+                return value * multiplier
+            except (ValueError, IndexError):
+                continue
+
+    return None
+
+
+def legacy_extract_area(text: str) -> Optional[float]:
+    """Trích xuất diện tích từ text (m²)"""
+    if not text:
+        return None
+
+    text = text.lower().replace(',', '.')
+
+    patterns = [
+        r'(\d+(?:\.\d+)?)\s*m[²2]',
+        r'(\d+(?:\.\d+)?)\s*m\s*2',
+        r'(\d+(?:\.\d+)?)\s*mét\s*vuông',
+        r'(\d+(?:\.\d+)?)\s*met\s*vuong'
+    ]
+
+    for pattern in patterns:
+        match = re.search(pattern, text)
+        if match:
+            return float(match.group(1))
+
+    return None
+
+
+def legacy_extract_rooms(text: str) -> Optional[int]:
+    """Trích xuất số phòng ngủ từ text (hỗ trợ cả dạng viết tắt như 2PN, 3bed...)"""
+    if not text:
+        return None
+
+    text = text.lower()
+
+    patterns = [
+        r'(\d+)\s*phòng\s*ngủ',
+        r'(\d+)\s*pn\b',
+        r'(\d+)\s*bed(room)?\b',
+        r'(\d+)\s*bed\b',
+        r'(\d+)\s* ngủ\b',
+        r'(\d+)\s*pn',  # 2pn, 3pn không dấu cách
+        r'(\d+)\s*phòng',
+    ]
+
+    for pattern in patterns:
+        match = re.search(pattern, text)
+        if match:
+            return int(match.group(1))
+
+    # Nếu chỉ là số, ví dụ "2", "3"
+    if text.strip().isdigit():
+        return int(text.strip())
+
+    return None
+
+
+def legacy_extract_bathrooms(text: str) -> Optional[int]:
+    """Trích xuất số phòng tắm/vệ sinh từ text (hỗ trợ cả dạng viết tắt như 2WC, 1bath...)"""
+    if not text:
+        return None
+
+    text = text.lower()
+
+    patterns = [
+        r'(\d+)\s*phòng',
+        r'(\d+)\s*phòng\s*tắm',
+        r'(\d+)\s*phòng\s*vệ\s*sinh',
+        r'(\d+)\s*wc\b',
+        r'(\d+)\s*toilet\b',
+        r'(\d+)\s*bath(room)?\b',
+        r'(\d+)\s*tắm\b',
+        r'(\d+)\s*vệ\s*sinh\b',
+        r'(\d+)\s*wc',  # 2wc, 3wc không dấu cách
+    ]
+
+    for pattern in patterns:
+        match = re.search(pattern, text)
+        if match:
+            return int(match.group(1))
+
+    # Nếu chỉ là số, ví dụ "1", "2"
+    if text.strip().isdigit():
+        return int(text.strip())
+
+    return None
+
+
+# ------------------------------------------------------------------------------
+
+CASES = [
+    ("extract_price", legacy_extract_price, text_processing.extract_price),
+    ("extract_area", legacy_extract_area, text_processing.extract_area),
+    ("extract_rooms", legacy_extract_rooms, text_processing.extract_rooms),
+    ("extract_bathrooms", legacy_extract_bathrooms, text_processing.extract_bathrooms),
+]
+
+
+def load_corpus(path: str = FIXTURE):
+    with open(path, encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+
+def bench(func, corpus, repeat: int) -> float:
+    """Thời gian trung bình mỗi lần gọi (micro giây)"""
+    timer = timeit.Timer(lambda: [func(text) for text in corpus])
+    best = min(timer.repeat(repeat=5, number=repeat))
+    return best / (repeat * len(corpus)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    print(f"Corpus: {len(corpus)} texts, repeat={args.repeat}")
+    print(f"{'function':<20}{'legacy us':>12}{'new us':>12}{'speedup':>10}{'diffs':>8}")
+    for name, legacy, new in CASES:
+        legacy_us = bench(legacy, corpus, args.repeat)
+        new_us = bench(new, corpus, args.repeat)
+        diffs = [(text, legacy(text), new(text)) for text in corpus if legacy(text) != new(text)]
+        print(f"{name:<20}{legacy_us:>12.2f}{new_us:>12.2f}{legacy_us / new_us:>9.2f}x{len(diffs):>8}")
+        for text, old, cur in diffs:
+            print(f"    {text!r}: {old} -> {cur}")
+
+    # parse_many: một lần quét cho cả giá và diện tích so với gọi 2 hàm cũ
+    legacy_both = lambda text: (legacy_extract_price(text), legacy_extract_area(text))  # noqa: E731
+    legacy_us = bench(legacy_both, corpus, args.repeat)
+    timer = timeit.Timer(lambda: text_processing.parse_many(corpus))
+    new_us = min(timer.repeat(repeat=5, number=args.repeat)) / (args.repeat * len(corpus)) * 1e6
+    print(f"{'parse_many':<20}{legacy_us:>12.2f}{new_us:>12.2f}{legacy_us / new_us:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Mock OpenAI-compatible server cho việc thử LLMService mà không cần mạng/GPU.
+
+Trả lời /v1/chat/completions bằng bộ phân loại cục bộ (src.services.local_enrichment),
+hỗ trợ cả stream (SSE) lẫn response thường.
+
+    python scripts/mock_openai_server.py --port 8001
+    LLM_PROVIDER=openai/mock LLM_API_BASE_URL=http://localhost:8001/v1 python main.py --action test --website mogi.vn
+"""
+import argparse
+import ast
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.services.local_enrichment import classify_one  # noqa: E402
+
+ID_LINE = re.compile(r'^\s*\d+\.\s*ID:\s*(\S+)\s*$', re.MULTILINE)
+FIELDS_LINE = re.compile(r'danh sách sau:\s*(\[[^\]]*\])')
+FIELD_LINE = re.compile(r'^(\w+): (.*)$')
+
+
+def parse_prompt(prompt: str):
+    """Tách danh sách trường cần điền và các property (id, title, description) từ prompt"""
+    match = FIELDS_LINE.search(prompt)
+    fields = ast.literal_eval(match.group(1)) if match else []
+    descriptions = []
+    ids = list(ID_LINE.finditer(prompt))
+    for i, id_match in enumerate(ids):
+        end = ids[i + 1].start() if i + 1 < len(ids) else len(prompt)
+        desc = {"id": id_match.group(1)}
+        for line in prompt[id_match.end():end].splitlines():
+            field_match = FIELD_LINE.match(line.strip())
+            if field_match:
+                value = field_match.group(2)
+                desc[field_match.group(1)] = None if value == "None" else value
+        descriptions.append(desc)
+    return fields, descriptions
+
+
+def build_content(prompt: str) -> str:
+    fields, descriptions = parse_prompt(prompt)
+    items = []
+    for desc in descriptions:
+        item = classify_one(desc, fields)
+        item.pop("_confidence", None)
+        for field in fields:
+            item.setdefault(field, None)
+        items.append(item)
+    return json.dumps({"items": items}, ensure_ascii=False)
+
+
+async def chat_completions(request: web.Request) -> web.StreamResponse:
+    payload = await request.json()
+    prompt = payload["messages"][-1]["content"]
+    content = build_content(prompt)
+    created = int(time.time())
+    model = payload.get("model", "mock")
+
+    if not payload.get("stream"):
+        return web.json_response({
+            "id": "mock-completion",
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}]
+        })
+
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+    await response.prepare(request)
+    chunk_size = request.app["chunk_size"]
+    for i in range(0, len(content), chunk_size):
+        chunk = {
+            "id": "mock-completion",
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": content[i:i + chunk_size]}, "finish_reason": None}]
+        }
+        await response.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+        await asyncio.sleep(request.app["chunk_delay"])
+    await response.write(b"data: [DONE]\n\n")
+    await response.write_eof()
+    return response
+
+
+def create_app(chunk_size: int = 32, chunk_delay: float = 0.0) -> web.Application:
+    app = web.Application()
+    app["chunk_size"] = chunk_size
+    app["chunk_delay"] = chunk_delay
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--chunk-size", type=int, default=32, help="Số ký tự mỗi SSE chunk")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Độ trễ giữa các chunk (giây)")
+    args = parser.parse_args()
+    web.run_app(create_app(args.chunk_size, args.chunk_delay), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,35 @@
+import asyncio
+import json
 import logging
-import os
-import subprocess
+import threading
+import time
+from datetime import datetime, timedelta
 
 from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR
+from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.jobstores.mongodb import MongoDBJobStore
 from apscheduler.schedulers.background import BackgroundScheduler
-from fastapi import FastAPI, HTTPException, Body
+from bson import ObjectId
+from fastapi import FastAPI, HTTPException, Body, Request
+from fastapi.responses import Response, StreamingResponse
 from starlette.middleware.cors import CORSMiddleware
 
 from src.config.settings import Config
 from src.data.database.connection import db
-from src.data.repositories.WebsiteStateRepository import WebsiteStateRepository
+from src.data.database.indexes import IndexManager
+from src.crawlers.base.shards import plan_shards
+from src.data.models.RealEstateModel import RealEstateProperty
+from src.data.repositories.CrawlJobRepository import CrawlJobRepository
+from src.data.repositories.RealEstateRepository import get_real_estate_repo
+from src.data.repositories.SellerRepository import SellerRepository
+from src.data.repositories.WebsiteStateRepository import AsyncWebsiteStateRepository, WebsiteStateRepository
+from src.services.crawl_worker_pool import CrawlWorkerPool
+from src.services.export_service import ExportService
+from src.services.market_stats_service import MarketStatsService
+from src.services.scheduling import AdmissionController, cron_trigger
+from src.utils import metrics
+from src.utils.progress_store import ProgressStore
+from src.utils.text_processing import normalize_phone, normalize_property_type
 
 app = FastAPI()
 app.add_middleware(
@@ -22,17 +41,20 @@ app.add_middleware(
 )
 
 config = Config()
+metrics.clear_multiprocess_dir()  # trước khi worker pool spawn các tiến trình ghi metrics
 db.connect(config.MONGODB_URI)
 WebsiteStateRepository.init_states(config.WEBSITES)
-crawl_processes = {}
+crawl_pool = CrawlWorkerPool(config=config)
+progress_store = ProgressStore(config.PROGRESS_FILE, list(config.WEBSITES))
 
-# Persistent job store với MongoDB
+# Persistent job store với MongoDB; job tạm (thử lại khi bị hoãn, dừng khi quá giờ) chỉ giữ trong bộ nhớ
 jobstores = {
     'default': MongoDBJobStore(
         host=config.MONGODB_URI,
         database=config.MONGODB_DATABASE,
         collection='apscheduler_jobs'
-    )
+    ),
+    'transient': MemoryJobStore(),
 }
 
 
@@ -46,35 +68,145 @@ def job_listener(event):
 scheduler = BackgroundScheduler(jobstores=jobstores, timezone="Asia/Ho_Chi_Minh")
 scheduler.add_listener(job_listener, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
 scheduler.start()
+admission = AdmissionController(config)
+# Job lịch của nhiều site chạy song song trên thread pool của scheduler:
+# kiểm tra + admit + submit phải nguyên tử, nếu không hai site cùng thấy còn slot trống
+admission_lock = threading.Lock()
+
+SITE_JOB_PREFIX = "crawl_site:"
+
+
+def sync_site_schedule(name: str):
+    """Đồng bộ job APScheduler của một site với website_states (schedule, enabled, jitter)"""
+    job_id = f"{SITE_JOB_PREFIX}{name}"
+    state = WebsiteStateRepository.get_by_name(name)
+    if not state or not state.enabled or not state.schedule:
+        if scheduler.get_job(job_id):
+            scheduler.remove_job(job_id)
+        return
+    jitter = config.SCHEDULE_JITTER_SECONDS if state.jitter_seconds is None else state.jitter_seconds
+    scheduler.add_job(
+        run_site_crawl,
+        trigger=cron_trigger(state.schedule, jitter, scheduler.timezone),
+        id=job_id,
+        args=[name],
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+        misfire_grace_time=3600,
+    )
+
+
+@app.on_event("startup")
+def start_crawl_pool():
+    # Worker khởi động browser + kết nối DB một lần, các lần crawl sau dùng lại
+    crawl_pool.start()
+    for name in config.WEBSITES:
+        sync_site_schedule(name)
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Theo route template (/sellers/{phone}) để không nổ số label theo giá trị path
+        route = request.scope.get("route")
+        metrics.observe(metrics.API_REQUESTS, time.perf_counter() - start, request.method,
+                        route.path if route else "unmatched", str(status))
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Metrics Prometheus của API và worker pool (khi đặt PROMETHEUS_MULTIPROC_DIR)"""
+    jobs = crawl_pool.status()
+    metrics.set_gauge(metrics.QUEUE_DEPTH, sum(1 for job in jobs if job["status"] == "queued"), "crawl_pool")
+    try:
+        pending = CrawlJobRepository.count_by_status().get("pending", 0)
+        metrics.set_gauge(metrics.QUEUE_DEPTH, pending, "crawl_jobs")
+    except Exception as e:
+        logging.warning(f"Cannot count crawl_jobs for metrics: {e}")
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.on_event("startup")
+async def connect_async_db():
+    # AsyncMongoClient gắn với event loop của uvicorn nên tạo ở đây, không tạo lúc import
+    db.connect_async(config.MONGODB_URI)
+
+
+@app.on_event("shutdown")
+def stop_crawl_pool():
+    crawl_pool.shutdown()
+
+
+@app.on_event("shutdown")
+async def close_async_db():
+    await db.close_async()
 
 
 @app.get("/websites")
-def list_websites():
-    return WebsiteStateRepository.get_all()
+async def list_websites():
+    return await AsyncWebsiteStateRepository.get_all()
 
 
 @app.post("/websites/enable")
-def enable_websites(names: list[str] = Body(..., embed=True)):
-    updated = []
-    for name in names:
-        ws = WebsiteStateRepository.get_by_name(name)
-        if ws:
-            WebsiteStateRepository.set_state(name, True)
-            updated.append(name)
+async def enable_websites(names: list[str] = Body(..., embed=True)):
+    updated = await AsyncWebsiteStateRepository.set_enabled(names, True)
+    for name in updated:
+        await asyncio.to_thread(sync_site_schedule, name)
     return {"message": f"Enabled: {updated}"}
 
 
 @app.post("/websites/disable")
-def disable_websites(names: list[str] = Body(..., embed=True)):
-    updated = []
-    for name in names:
-        ws = WebsiteStateRepository.get_by_name(name)
-        if ws:
-            WebsiteStateRepository.set_state(name, False)
-            updated.append(name)
+async def disable_websites(names: list[str] = Body(..., embed=True)):
+    updated = await AsyncWebsiteStateRepository.set_enabled(names, False)
+    for name in updated:
+        await asyncio.to_thread(sync_site_schedule, name)
     return {"message": f"Disabled: {updated}"}
 
 
+@app.get("/websites/enabled")
+async def list_enabled_websites():
+    return await AsyncWebsiteStateRepository.get_names(enabled=True)
+
+
+@app.put("/websites/{name}/schedule")
+def set_website_schedule(
+    name: str,
+    cron: str = Body(...),
+    priority: int = Body(0),
+    max_runtime_minutes: int = Body(None),
+    jitter_seconds: int = Body(None),
+):
+    """
+    Lịch crawl riêng của một site, vd: {"cron": "30 1 * * *", "priority": 5, "max_runtime_minutes": 90}
+    """
+    if name not in config.WEBSITES:
+        raise HTTPException(status_code=404, detail=f"Unknown website: {name}")
+    try:
+        cron_trigger(cron)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    WebsiteStateRepository.set_schedule(name, cron, priority, max_runtime_minutes, jitter_seconds)
+    sync_site_schedule(name)
+    job = scheduler.get_job(f"{SITE_JOB_PREFIX}{name}")
+    return {"website": name, "cron": cron, "next_run_time": str(job.next_run_time) if job else None}
+
+
+@app.delete("/websites/{name}/schedule")
+def delete_website_schedule(name: str):
+    if not WebsiteStateRepository.get_by_name(name):
+        raise HTTPException(status_code=404, detail=f"Unknown website: {name}")
+    WebsiteStateRepository.set_schedule(name, None)
+    sync_site_schedule(name)
+    return {"message": f"Removed schedule of {name}"}
+
+
 @app.post("/crawl_now")
 def crawl_now(websites: list[str] = None):
     """
@@ -87,86 +219,305 @@ def crawl_now(websites: list[str] = None):
 @app.post("/stop_now")
 def stop_now(websites: list[str] = None):
     """
-    Dừng các tiến trình cào ngay lập tức
+    Dừng các job cào đang chờ/chạy (dừng hợp tác: dữ liệu đã lấy vẫn được lưu)
     """
-    global crawl_processes
-    stopped = []
-    if not websites:
-        websites = list(crawl_processes.keys())
-    for name in websites:
-        proc = crawl_processes.get(name)
-        if proc and proc.poll() is None:  
-            proc.terminate()
-            try:
-                proc.wait(timeout=5) 
-            except subprocess.TimeoutExpired:
-                proc.kill()  
-            stopped.append(name)
-            crawl_processes.pop(name, None)
+    stopped = crawl_pool.cancel(websites)
     return {"message": f"Stopped crawling: {stopped}"}
 
 @app.post("/schedule_crawl")
-def schedule_crawl(interval_hours: int = 24, websites: list[str] = None):
+def schedule_crawl(
+    interval_hours: int = None,
+    cron: str = None,
+    websites: list[str] = None,
+    priority: int = 0,
+    max_runtime_minutes: int = None,
+    jitter_seconds: int = None,
+):
     """
-    Lên lịch cào vào các mốc giờ cố định trong ngày:
-    - 12h: chạy 2h và 14h
-    - 24h: chỉ chạy 2h sáng
+    Đặt cùng một lịch cho nhiều site (mặc định các site đang bật), lưu vào website_states.
+    Mỗi site là một job riêng có jitter, nên các site không cùng khởi động đúng một thời điểm.
+    - cron: biểu thức 5 trường, vd "0 2 * * *"
+    - interval_hours (tương thích cũ): 12 -> 2h và 14h, 24 -> 2h sáng
     """
-    if interval_hours not in [12, 24]:
-        raise HTTPException(status_code=400, detail="interval_hours must be 12 hoặc 24")
+    if cron is None:
+        if interval_hours not in [None, 12, 24]:
+            raise HTTPException(status_code=400, detail="interval_hours must be 12 hoặc 24")
+        cron = "0 2,14 * * *" if interval_hours == 12 else "0 2 * * *"
+    try:
+        cron_trigger(cron)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if websites is None:
-        websites = [ws.name for ws in WebsiteStateRepository.get_all() if ws.enabled]
+        websites = WebsiteStateRepository.get_enabled_websites()
+    unknown = [name for name in websites if name not in config.WEBSITES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown websites: {unknown}")
 
-    if interval_hours == 12:
-        hours = [2, 14]
-    else:  # 24h
-        hours = [2]
-
-    # Nếu chỉ có 1 giờ, truyền số nguyên, nếu nhiều giờ truyền list số nguyên
-    hour_arg = ",".join(str(h) for h in hours)
-
-    job_id = "crawl_main" 
-    if scheduler.get_job(job_id):
-        scheduler.remove_job(job_id)
-    scheduler.add_job(
-        run_crawl,
-        trigger='cron',
-        id=job_id,
-        hour=hour_arg,
-        minute=0,
-        args=[websites], 
-        replace_existing=True
-    )
-    return {"message": f"Scheduled crawl for {websites or 'all'} at hours {hours} (every {interval_hours}h from 2AM)"}
+    # Lịch chung kiểu cũ (mọi site cùng lúc) được thay bằng lịch từng site
+    if scheduler.get_job("crawl_main"):
+        scheduler.remove_job("crawl_main")
+    for name in websites:
+        WebsiteStateRepository.set_schedule(name, cron, priority, max_runtime_minutes, jitter_seconds)
+        sync_site_schedule(name)
+    return {"message": f"Scheduled crawl for {websites} with cron '{cron}'"}
 
 
 
 def run_crawl(websites=None):
-    import sys
     logging.info(f"Scheduler triggered crawl for: {websites}")
-    global crawl_processes
     if not websites:
-        websites = [ws.name for ws in WebsiteStateRepository.get_all() if ws.enabled]
-    main_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "main.py"))
+        websites = WebsiteStateRepository.get_enabled_websites()
     for name in websites:
-        logging.info(f"Starting subprocess for: {name}")
         try:
-            proc = subprocess.Popen([sys.executable, main_path, "--action", "test", "--website", name])
-            crawl_processes[name] = proc
+            job_id = crawl_pool.submit(name)
+            logging.info(f"Queued crawl job {job_id} for: {name}")
         except Exception as e:
-            logging.error(f"Failed to start subprocess for {name}: {e}")
+            logging.error(f"Failed to queue crawl for {name}: {e}")
+
+
+def run_site_crawl(name: str):
+    """
+    Job theo lịch của một site: bỏ qua nếu site đang crawl (trong pool hoặc trên hàng đợi crawl_jobs),
+    hoãn và thử lại sau nếu admission controller báo quá tải, đặt hạn dừng theo max_runtime_minutes.
+    """
+    state = WebsiteStateRepository.get_by_name(name)
+    if not state or not state.enabled:
+        return
+
+    now = datetime.now(scheduler.timezone)
+    with admission_lock:
+        if crawl_pool.active_job(name) is not None or CrawlJobRepository.has_active(name):
+            logging.info(f"Skip scheduled crawl for {name}: previous run still active")
+            return
+        reason = admission.admit(name, state.priority, crawl_pool.active_count())
+        job_id = None if reason else crawl_pool.submit(name)
+
+    if reason:
+        logging.info(f"Delay scheduled crawl for {name} by {config.ADMISSION_RETRY_SECONDS}s: {reason}")
+        scheduler.add_job(run_site_crawl, trigger='date', run_date=now + timedelta(seconds=config.ADMISSION_RETRY_SECONDS),
+                          args=[name], id=f"crawl_retry:{name}", jobstore='transient', replace_existing=True)
+        return
+
+    logging.info(f"Queued scheduled crawl job {job_id} for: {name}")
+    if state.max_runtime_minutes:
+        scheduler.add_job(stop_site_crawl, trigger='date', run_date=now + timedelta(minutes=state.max_runtime_minutes),
+                          args=[name, job_id], id=f"crawl_timeout:{name}", jobstore='transient', replace_existing=True)
+
+
+def stop_site_crawl(name: str, job_id: int):
+    if crawl_pool.cancel_job(job_id):
+        logging.warning(f"Crawl job {job_id} for {name} exceeded max runtime, stopping")
+
 
 @app.get("/current_schedule")
 def current_schedule():
-    job = scheduler.get_job("crawl_main")
-    if not job:
+    jobs = [job for job in scheduler.get_jobs() if job.id.startswith(SITE_JOB_PREFIX) or job.id == "crawl_main"]
+    if not jobs:
         return {"message": "No schedule found"}
-    # Lấy thông tin trigger và args
-    trigger = str(job.trigger)
-    args = job.args
-    next_run = job.next_run_time
+    states = {ws.name: ws for ws in WebsiteStateRepository.get_all()}
+    schedules = []
+    for job in jobs:
+        state = states.get(job.args[0]) if job.id.startswith(SITE_JOB_PREFIX) else None
+        schedules.append({
+            "id": job.id,
+            "trigger": str(job.trigger),
+            "args": job.args,
+            "next_run_time": str(job.next_run_time),
+            "priority": state.priority if state else None,
+            "max_runtime_minutes": state.max_runtime_minutes if state else None,
+        })
+    return {"schedules": schedules}
+
+
+@app.get("/workers")
+def crawl_workers():
+    """Trạng thái worker pool và các job crawl gần đây"""
+    return {
+        "workers": crawl_pool.num_workers,
+        "ready": len(crawl_pool.ready_workers),
+        "jobs": crawl_pool.status(),
+    }
+
+
+@app.get("/jobs")
+def list_jobs(website: str = None, status: str = None, run_id: str = None, limit: int = 200):
+    """Các shard trong hàng đợi crawl_jobs (dùng chung giữa các node) và worker đang giữ từng shard"""
+    return {
+        "counts": CrawlJobRepository.count_by_status(),
+        "jobs": CrawlJobRepository.list_jobs(website=website, status=status, run_id=run_id, limit=min(limit, 1000)),
+    }
+
+
+@app.post("/jobs")
+def enqueue_jobs(websites: list[str] = Body(None, embed=True)):
+    """Chia các site (mặc định: tất cả site đang enabled) thành shard và đưa vào crawl_jobs"""
+    if not websites:
+        websites = WebsiteStateRepository.get_enabled_websites()
+    unknown = [name for name in websites if name not in config.WEBSITES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown websites: {unknown}")
+    return {
+        name: CrawlJobRepository.enqueue(
+            name,
+            plan_shards(config.WEBSITES[name]['search_urls'], config.PAGES_SITE, config.SHARD_PAGES),
+            config.JOB_MAX_ATTEMPTS,
+        )
+        for name in websites
+    }
+
+
+@app.post("/jobs/cancel")
+def cancel_jobs(websites: list[str] = Body(None, embed=True)):
+    """Hủy shard đang chờ; shard đang chạy được yêu cầu dừng ở heartbeat kế tiếp"""
+    return CrawlJobRepository.cancel(websites)
+
+
+@app.get("/progress")
+def get_progress(website: str = None):
+    """
+    Tiến độ crawl hiện tại của từng site, đọc từ file progress dùng chung
+    (do các tiến trình crawl ghi), không cần gọi vào crawler.
+    """
+    progress = progress_store.read_all()
+    if website:
+        if website not in progress:
+            raise HTTPException(status_code=404, detail=f"No progress for {website}")
+        return progress[website]
+    return progress
+
+
+@app.get("/crawl_stats/{stats_id}")
+def get_crawl_stats(stats_id: str):
+    """Tổng kết một phiên crawl, gồm timings theo pha (fetch/parse/DB/LLM: p50/p95/p99) và bộ đếm"""
+    if not ObjectId.is_valid(stats_id):
+        raise HTTPException(status_code=400, detail=f"Invalid crawl stats id: {stats_id}")
+    stats = get_real_estate_repo().get_crawl_stats(ObjectId(stats_id))
+    if not stats:
+        raise HTTPException(status_code=404, detail=f"Crawl stats not found: {stats_id}")
+    stats["_id"] = str(stats["_id"])
+    return stats
+
+
+@app.get("/sellers")
+def top_sellers(limit: int = 20, min_listings: int = 2):
+    """Người bán/môi giới có nhiều tin đăng nhất"""
+    return SellerRepository.get_top(limit=min(limit, 200), min_listings=min_listings)
+
+
+@app.get("/sellers/{phone}")
+def get_seller(phone: str):
+    """Số tin đăng của một số điện thoại (chấp nhận 09xx..., 84..., +84...)"""
+    normalized = normalize_phone(phone)
+    if not normalized:
+        raise HTTPException(status_code=400, detail=f"Invalid phone number: {phone}")
+    seller = SellerRepository.get_by_phone(normalized)
+    if not seller:
+        raise HTTPException(status_code=404, detail=f"No listings for {normalized}")
+    seller["phone"] = seller.pop("_id")
+    return seller
+
+
+@app.get("/indexes")
+def index_usage():
+    """Số lần dùng của từng index ($indexStats), index ít dùng nhất lên đầu"""
+    return IndexManager(db.db, drop_stale=config.INDEX_DROP_STALE).usage()
+
+
+@app.get("/stats/market")
+def market_stats(city: str = None, type: str = None, source: str = None,
+                 day_from: datetime = None, day_to: datetime = None, limit: int = 100):
+    """
+    Thống kê thị trường đã tính sẵn theo city × type × source × ngày
+    (count, mean/median unit_price, phân vị giá), mới nhất trước
+    """
+    return MarketStatsService.query(
+        city=city, prop_type=(normalize_property_type(type) or type) if type else None, source=source,
+        day_from=day_from, day_to=day_to, limit=min(max(limit, 1), 1000),
+    )
+
+
+@app.get("/export")
+def export_properties(format: str = "csv", incremental: bool = False):
+    """
+    - format=csv: stream toàn bộ (hoặc phần mới từ lần trước nếu incremental) dạng CSV gzip
+    - format=parquet: ghi Parquet phân vùng source/tháng vào EXPORT_DIR trên server, trả về danh sách file
+    """
+    if format == "csv":
+        filename = f"properties-{datetime.now().strftime('%Y%m%d-%H%M%S')}.csv.gz"
+        return StreamingResponse(
+            ExportService().stream_csv(incremental=incremental, name="api_csv"),
+            media_type="application/gzip",
+            headers={"Content-Disposition": f"attachment; filename={filename}"},
+        )
+    if format == "parquet":
+        try:
+            return ExportService().export(fmt="parquet", incremental=incremental)
+        except RuntimeError as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    raise HTTPException(status_code=400, detail="format must be csv or parquet")
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)  # ObjectId
+
+
+@app.get("/properties")
+def search_properties(city: str = None, type: str = None, source: str = None,
+                      min_price: float = None, max_price: float = None,
+                      min_area: float = None, max_area: float = None,
+                      crawled_from: datetime = None, crawled_to: datetime = None,
+                      after: str = None, limit: int = 50, fields: str = None, format: str = "json"):
+    """
+    Tìm kiếm properties, phân trang keyset theo (price hoặc crawled_at, _id) tùy filter:
+    truyền after = next_cursor của trang trước.
+    - fields: danh sách field cách nhau bởi dấu phẩy; mặc định trả về mọi field trừ description
+    - format=ndjson: stream mỗi dòng một JSON (không giới hạn limit nếu limit=0)
+    """
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    if field_list:
+        unknown = [f for f in field_list if f not in RealEstateProperty.model_fields]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {unknown}")
+    if format not in ("json", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be json or ndjson")
+
+    query = get_real_estate_repo().build_search_filter(
+        city=city, prop_type=(normalize_property_type(type) or type) if type else None, source=source,
+        min_price=min_price, max_price=max_price, min_area=min_area, max_area=max_area,
+        crawled_from=crawled_from, crawled_to=crawled_to,
+    )
+    repo = get_real_estate_repo()
+    sort_key = repo.search_sort_key(query)
+    after_key = None
+    if after:
+        try:
+            cursor_key, value, last_id = repo.decode_cursor(after)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if cursor_key != sort_key:
+            raise HTTPException(status_code=400, detail="Cursor does not match the current filters")
+        after_key = (value, last_id)
+
+    if format == "ndjson":
+        cursor = repo.search(query, after=after_key, limit=max(limit, 0) or None, fields=field_list)
+
+        def stream():
+            try:
+                for doc in cursor:
+                    yield json.dumps(doc, default=_json_default, ensure_ascii=False) + "\n"
+            finally:
+                cursor.close()
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    limit = min(max(limit, 1), 500)
+    items = list(repo.search(query, after=after_key, limit=limit, fields=field_list))
+    next_cursor = repo.encode_cursor(items[-1], sort_key) if len(items) == limit else None
+    for doc in items:
+        doc["_id"] = str(doc["_id"])
     return {
-        "trigger": trigger,
-        "args": args,
-        "next_run_time": str(next_run)
-    }
\ No newline at end of file
+        "items": items,
+        "next_cursor": next_cursor,
+    }
@@ -15,12 +15,77 @@ class Config:
         self.ITEM_PER_BATCH = int(os.getenv('ITEM_PER_PATCH', '20'))
         self.PAGES_SITE = int(os.getenv('PAGES_PER_SITE', '1'))
         self.LLM_BATCH_SIZE = int(os.getenv('LLM_BATCH_SIZE', '10'))
+        self.LLM_QUEUE_SIZE = int(os.getenv('LLM_QUEUE_SIZE', '20'))
+        self.LLM_WORKERS = int(os.getenv('LLM_WORKERS', '2'))
         self.LLM_ENABLED = os.getenv('LLM_ENABLED', 'True').lower() == 'true'
         self.LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'gemini/gemini-2.0-flash')
         self.LLM_API_TOKEN = os.getenv('LLM_API_TOKEN', '')
         self.LLM_API_BASE_URL = os.getenv('LLM_API_BASE_URL', 'https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent')
+        self.LLM_MODEL = os.getenv('LLM_MODEL', 'mistral')  # model cho OpenAI-compatible API
+        self.LLM_BACKEND = os.getenv('LLM_BACKEND', 'remote').lower()  # remote | local | hybrid
+        self.LLM_LOCAL_MIN_CONFIDENCE = float(os.getenv('LLM_LOCAL_MIN_CONFIDENCE', '0.6'))
+        self.LLM_LOCAL_EXECUTOR = os.getenv('LLM_LOCAL_EXECUTOR', 'thread').lower()  # thread | process
+        self.LLM_LOCAL_WORKERS = int(os.getenv('LLM_LOCAL_WORKERS', '2'))
+        self.EVENT_BUFFER_SIZE = int(os.getenv('EVENT_BUFFER_SIZE', '100'))
+        # block | drop_oldest | drop_newest; chỉ áp dụng cho subscriber lossy (log, tiến độ), enrich/lưu DB luôn block
+        self.EVENT_OVERFLOW = os.getenv('EVENT_OVERFLOW', 'block').lower()
+        self.EVENT_BATCH_SIZE = int(os.getenv('EVENT_BATCH_SIZE', '20'))
+        self.PROGRESS_FILE = os.getenv('PROGRESS_FILE', 'logs/progress.bin')
+        self.PROGRESS_FLUSH_INTERVAL = float(os.getenv('PROGRESS_FLUSH_INTERVAL', '0.5'))
+        self.GAZETTEER_FILE = os.getenv('GAZETTEER_FILE', '')  # JSON mở rộng tới phường/xã
+        # Không có GAZETTEER_FILE: ward lấy nguyên văn từ đoạn có tiền tố "Phường/Xã..." (chưa đối chiếu)
+        self.GAZETTEER_PREFIX_WARDS = os.getenv('GAZETTEER_PREFIX_WARDS', 'True').lower() == 'true'
+        self.DEDUP_ENABLED = os.getenv('DEDUP_ENABLED', 'True').lower() == 'true'
+        self.DEDUP_NUM_PERM = int(os.getenv('DEDUP_NUM_PERM', '64'))
+        self.DEDUP_BANDS = int(os.getenv('DEDUP_BANDS', '16'))  # 16 band x 4 row: ứng viên từ ~50% tương đồng
+        self.DEDUP_THRESHOLD = float(os.getenv('DEDUP_THRESHOLD', '0.6'))
+        # Kết nối chỉ tạo index còn thiếu; --action indexes mới drop/tạo lại index
+        self.INDEX_AUTO_CREATE = os.getenv('INDEX_AUTO_CREATE', 'True').lower() == 'true'
+        # --action indexes: xóa cả index lạ không khai báo (index cũ trong LEGACY_INDEXES luôn bị xóa)
+        self.INDEX_DROP_STALE = os.getenv('INDEX_DROP_STALE', 'False').lower() == 'true'
+        self.MARKET_STATS_ENABLED = os.getenv('MARKET_STATS_ENABLED', 'True').lower() == 'true'
+        self.MARKET_STATS_FLUSH_SIZE = int(os.getenv('MARKET_STATS_FLUSH_SIZE', '500'))  # số tin lưu giữa 2 lần $merge
+        self.EXPORT_DIR = os.getenv('EXPORT_DIR', 'exports')
+        self.EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '10000'))
+        # Export incremental bỏ qua tin có updated_at trong N giây gần nhất (ghi dở ở tiến trình khác)
+        self.EXPORT_WATERMARK_LAG = float(os.getenv('EXPORT_WATERMARK_LAG', '60'))
+        self.CRAWL_WORKERS = int(os.getenv('CRAWL_WORKERS', '2'))  # số tiến trình crawl (mỗi tiến trình một Chromium)
+        # Shard = search URL × khoảng SHARD_PAGES trang; các shard của một site chạy song song
+        # (hoặc phân cho nhiều node qua crawl_jobs), chung giới hạn tốc độ theo domain
+        self.SHARD_PAGES = int(os.getenv('SHARD_PAGES', '5'))
+        self.SHARD_CONCURRENCY = int(os.getenv('SHARD_CONCURRENCY', '2'))
+        self.DOMAIN_MIN_INTERVAL = float(os.getenv('DOMAIN_MIN_INTERVAL', '0.5'))  # giây giữa 2 request cùng domain
+        # Hàng đợi crawl_jobs dùng chung giữa các node (--action worker)
+        self.JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', '300'))
+        self.JOB_HEARTBEAT_SECONDS = int(os.getenv('JOB_HEARTBEAT_SECONDS', '60'))
+        self.JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+        self.JOB_POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', '5'))
+        # Lịch crawl theo site (website_states.schedule) và admission controller
+        self.SCHEDULE_JITTER_SECONDS = int(os.getenv('SCHEDULE_JITTER_SECONDS', '600'))  # jitter mặc định
+        self.ADMISSION_MAX_CPU_PERCENT = float(os.getenv('ADMISSION_MAX_CPU_PERCENT', '85'))
+        self.ADMISSION_MAX_MEMORY_PERCENT = float(os.getenv('ADMISSION_MAX_MEMORY_PERCENT', '85'))
+        self.ADMISSION_MAX_RSS_MB = int(os.getenv('ADMISSION_MAX_RSS_MB', '0'))  # 0 = không giới hạn
+        self.ADMISSION_MAX_CONCURRENT = int(os.getenv('ADMISSION_MAX_CONCURRENT', '0'))  # 0 = CRAWL_WORKERS
+        self.ADMISSION_RETRY_SECONDS = int(os.getenv('ADMISSION_RETRY_SECONDS', '120'))
+        self.WEBSITE_STATE_CACHE_TTL = float(os.getenv('WEBSITE_STATE_CACHE_TTL', '5'))  # giây, cache website_states cho API
+        # Prometheus: thư mục chung để /metrics của API gộp cả worker pool; worker --action worker
+        # mở cổng scrape (METRICS_PORT, 0 = tắt) và/hoặc đẩy lên Pushgateway (host:port)
+        self.PROMETHEUS_MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR', '')
+        self.METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+        self.METRICS_PUSHGATEWAY = os.getenv('METRICS_PUSHGATEWAY', '')
+        # main.py --profile: báo cáo theo site trong PROFILE_DIR; loop bị chặn quá PROFILE_LOOP_LAG_MS
+        # thì chụp stack; PROFILE_TRACEMALLOC_FRAMES = 0 tắt tracemalloc (tốn thêm CPU/bộ nhớ)
+        self.PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+        self.PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', '5'))
+        self.PROFILE_LOOP_INTERVAL_MS = float(os.getenv('PROFILE_LOOP_INTERVAL_MS', '10'))
+        self.PROFILE_LOOP_LAG_MS = float(os.getenv('PROFILE_LOOP_LAG_MS', '50'))
+        self.PROFILE_TRACEMALLOC_FRAMES = int(os.getenv('PROFILE_TRACEMALLOC_FRAMES', '1'))
+        self.NORMALIZE_BATCH_SIZE = int(os.getenv('NORMALIZE_BATCH_SIZE', '5000'))
         self.LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
         self.LOG_FILE = os.getenv('LOG_FILE', 'logs/crawler.log')
+        self.LOG_JSON = os.getenv('LOG_JSON', 'False').lower() == 'true'  # log dạng JSON (cả stdout và file)
+        self.LOG_ENQUEUE = os.getenv('LOG_ENQUEUE', 'True').lower() == 'true'  # ghi log ở thread nền
+        self.LOG_SAMPLE_EVERY = int(os.getenv('LOG_SAMPLE_EVERY', '100'))  # log theo từng tin: 1/N dòng
 
         # Website configurations
         self.WEBSITES: Dict[str, Dict[str, Any]] = {
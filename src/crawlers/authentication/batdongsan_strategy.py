@@ -4,6 +4,18 @@ from crawl4ai import AsyncWebCrawler
 
 from .base_auth_strategy import BaseAuthStrategy
 
+# Dùng chung với BatDongSanCrawler khi trích xuất số điện thoại
+PHONE_SELECTORS = [
+    '.re__contact-phone',
+    '.contact-phone',
+    '.phone-number',
+    '[data-phone]',
+    '.seller-phone',
+    '.contact-item .phone',
+    '.seller-contact .phone',
+    '.re__contact-item .phone'
+]
+
 
 class BatDongSanAuthStrategy(BaseAuthStrategy):
     """Authentication strategy for batdongsan.com.vn - popup based login"""
@@ -220,13 +232,4 @@ class BatDongSanAuthStrategy(BaseAuthStrategy):
 
     def get_phone_selectors(self) -> list:
         """Get CSS selectors for phone extraction after login"""
-        return [
-            '.re__contact-phone',
-            '.contact-phone',
-            '.phone-number',
-            '[data-phone]',
-            '.seller-phone',
-            '.contact-item .phone',
-            '.seller-contact .phone',
-            '.re__contact-item .phone'
-        ]
\ No newline at end of file
+        return list(PHONE_SELECTORS)
\ No newline at end of file
@@ -7,14 +7,27 @@ from bs4 import BeautifulSoup
 from crawl4ai import AsyncWebCrawler
 
 from src.config.settings import config
+from src.crawlers.base.event_bus import EventBus, EventSubscriber, ObserverAdapter
+from src.crawlers.base.rate_limiter import get_rate_limiter
+from src.crawlers.base.shards import Shard, plan_shards
 from src.crawlers.crawlconfig.crawl_config import dispatcherConfig, browserConfig, crawlerRunConfig, strategyConfig
 from src.data.models.CrawlStatsModel import CrawlStats
 from src.data.models.RealEstateModel import RealEstateProperty
 from src.data.repositories.RealEstateRepository import RealEstateRepository
-from src.utils.logging import get_logger
+from src.utils import metrics, timing
+from src.utils.gazetteer import resolve_address
+from src.utils.logging import LogSampler, get_logger, log_context
+from src.utils.text_processing import extract_phone, normalize_phone
+
+# Node chứa số điện thoại dạng máy đọc được (link tel:, thuộc tính data-*), ưu tiên hơn text hiển thị
+PHONE_NODE_SELECTOR = 'a[href^="tel:"], [data-phone], [data-mobile], [data-tel], [mobile]'
+PHONE_ATTRIBUTES = ("href", "data-phone", "data-mobile", "data-tel", "mobile")
 
 
 class BaseCrawler(ABC):
+    # Selector riêng của site cho node hiển thị số điện thoại
+    phone_selectors: List[str] = []
+
     def __init__(self, website_name: str, website_config: Dict[str, Any]):
         self.website_name = website_name
         self.website_config = website_config
@@ -22,66 +35,134 @@ class BaseCrawler(ABC):
         self.search_urls = website_config['search_urls']
         self.delay = website_config.get('delay', 2)
         self.logger = get_logger(f"crawler.{website_name}")
+        self.log_sampler = LogSampler()  # log theo từng link/tin chỉ ghi 1/LOG_SAMPLE_EVERY dòng
         self.observers = []
+        self.event_bus = EventBus()
         self.crawl_stats = None
+        self.timings = None
         self.repository = RealEstateRepository()
         self.dispatcher = dispatcherConfig()
         self.browser = browserConfig()
         self.crawler = crawlerRunConfig()
         self.strategy = strategyConfig()
-
+        self.rate_limiter = get_rate_limiter()
+        # Dừng hợp tác: kiểm tra giữa các lô trang/tin; stop_event (vd: multiprocessing.Event) do worker pool gán
+        self.stop_event = None
+        self._stop_requested = False
 
     def add_observer(self, observer):
+        """
+        Đăng ký CrawlerObserver đồng bộ (chạy qua ObserverAdapter trên event bus);
+        observer không lossy (enrich, lưu DB) luôn dùng policy block
+        """
         self.observers.append(observer)
+        self.event_bus.subscribe(ObserverAdapter(observer))
 
-    def notify_observers(self, event_type: str, data: Any):
-        for observer in self.observers:
-            observer.notify(event_type, data, self.website_name)
+    def add_subscriber(self, subscriber: EventSubscriber, **options):
+        """Đăng ký subscriber bất đồng bộ; options: buffer_size, overflow (drop chỉ cho subscriber lossy), batch_size"""
+        self.event_bus.subscribe(subscriber, **options)
 
-    async def crawl_all(self) -> List[RealEstateProperty]:
-        self.logger.info(f"Starting crawl for {self.website_name}")
+    async def notify_observers(self, event_type: str, data: Any):
+        await self.event_bus.publish(event_type, data, self.website_name)
+
+    def request_stop(self):
+        """Yêu cầu dừng: crawl hiện tại kết thúc ở lô kế tiếp, dữ liệu đã lấy vẫn được xử lý và lưu"""
+        self._stop_requested = True
+
+    @property
+    def stop_requested(self) -> bool:
+        return self._stop_requested or (self.stop_event is not None and self.stop_event.is_set())
+
+    async def crawl_all(self, crawler: AsyncWebCrawler = None, shards: List[Shard] = None) -> List[RealEstateProperty]:
+        """
+        crawler: AsyncWebCrawler đã khởi động sẵn (vd: browser của worker pool), dùng lại và không đóng;
+        mặc định mở một browser riêng cho lần crawl này.
+        shards: chỉ crawl các phần (search URL × khoảng trang) này, mặc định toàn bộ site
+        chia theo SHARD_PAGES; tối đa SHARD_CONCURRENCY shard chạy song song, thống kê cộng dồn
+        vào một CrawlStats chung của site.
+        """
+        shards = shards or plan_shards(self.search_urls, config.PAGES_SITE, config.SHARD_PAGES)
+        # Timings mở tới khi CrawlPipeline.drain() xong (enrich/lưu DB còn chạy sau crawl)
+        self.timings = timing.start_run(self.website_name)
         self.crawl_stats = CrawlStats(
             source=self.website_name,
             start_time=datetime.now(),
             status="running"
         )
-        self.notify_observers("crawl_started", self.crawl_stats)
+        # Mọi log trong lần crawl (kể cả observer, repository chạy trong task con) mang site và run_id
+        with log_context(site=self.website_name, run_id=str(self.crawl_stats.id)):
+            return await self._crawl_all(crawler, shards)
+
+    async def _crawl_all(self, crawler: Optional[AsyncWebCrawler], shards: List[Shard]) -> List[RealEstateProperty]:
+        self.logger.info(f"Starting crawl for {self.website_name}")
+        await self.notify_observers("crawl_started", self.crawl_stats)
+        metrics.inc(metrics.CRAWLS_RUNNING, self.website_name)
         all_properties = []
         try:
-            async with AsyncWebCrawler(verbose=True, config=self.browser, crawler_strategy=self.strategy) as crawler:
-                for search_url in self.search_urls:
-                    self.logger.info(f"Crawling search URL: {search_url}")
-                    property_links = await self.extract_property_links(crawler, search_url)
-                    self.logger.info(f"Found {len(property_links)} property links")
-                    properties = await self.crawl_property_details_batch(crawler, property_links)
-                    all_properties.extend(properties)
-                    await asyncio.sleep(self.delay)
+            if crawler is None:
+                async with AsyncWebCrawler(verbose=True, config=self.browser, crawler_strategy=self.strategy) as crawler:
+                    await self._crawl_shards(crawler, shards, all_properties)
+            else:
+                await self._crawl_shards(crawler, shards, all_properties)
             self.crawl_stats.end_time = datetime.now()
-            self.crawl_stats.total_items = len(all_properties)
-            self.crawl_stats.successful_items = len([p for p in all_properties if p])
-            self.crawl_stats.status = "completed"
-            self.notify_observers("crawl_completed", self.crawl_stats)
+            self.crawl_stats.successful_items = len(all_properties)
+            self.crawl_stats.total_items = (self.crawl_stats.successful_items + self.crawl_stats.failed_items
+                                            + self.crawl_stats.duplicate_items)
+            self.crawl_stats.status = "cancelled" if self.stop_requested else "completed"
+            metrics.inc(metrics.CRAWL_RUNS, self.website_name, self.crawl_stats.status)
+            await self.notify_observers("crawl_completed", self.crawl_stats)
+            await self.event_bus.close()
             self.logger.info(f"Completed crawl for {self.website_name}: {len(all_properties)} properties")
             return all_properties
         except Exception as e:
             self.crawl_stats.status = "failed"
             self.crawl_stats.error_message = str(e)
             self.crawl_stats.end_time = datetime.now()
-            self.notify_observers("crawl_failed", {"error": str(e), "stats": self.crawl_stats})
+            metrics.inc(metrics.CRAWL_RUNS, self.website_name, "failed")
+            await self.notify_observers("crawl_failed", {"error": str(e), "stats": self.crawl_stats})
+            await self.event_bus.close()
             self.logger.error(f"Crawl failed for {self.website_name}: {e}")
             return []
+        finally:
+            metrics.inc(metrics.CRAWLS_RUNNING, self.website_name, amount=-1)
 
-    async def extract_property_links(self, crawler: AsyncWebCrawler, search_url: str) -> List[Dict[str, Any]]:
+    async def _crawl_shards(self, crawler: AsyncWebCrawler, shards: List[Shard],
+                            all_properties: List[RealEstateProperty]):
+        semaphore = asyncio.Semaphore(max(1, config.SHARD_CONCURRENCY))
+
+        async def run_shard(shard: Shard):
+            async with semaphore:
+                if self.stop_requested:
+                    return
+                search_url, first_page, last_page = shard
+                self.logger.info(f"Crawling search URL: {search_url} (pages {first_page}-{last_page})")
+                property_links = await self.extract_property_links(crawler, search_url, first_page, last_page)
+                self.logger.info(f"Found {len(property_links)} property links")
+                properties = await self.crawl_property_details_batch(crawler, property_links)
+                all_properties.extend(properties)
+                await asyncio.sleep(self.delay)
+
+        # Shard lỗi không kéo theo các shard khác; chỉ báo lỗi cả site khi mọi shard đều lỗi
+        results = await asyncio.gather(*(run_shard(shard) for shard in shards), return_exceptions=True)
+        errors = [result for result in results if isinstance(result, Exception)]
+        for error in errors:
+            self.logger.error(f"Shard failed for {self.website_name}: {error}")
+        if errors and len(errors) == len(shards):
+            raise errors[0]
+
+    async def extract_property_links(self, crawler: AsyncWebCrawler, search_url: str, first_page: int = 1,
+                                     last_page: int = None) -> List[Dict[str, Any]]:
         all_links = []
-        page = 1
+        page = first_page
+        last_page = last_page or config.PAGES_SITE
         batch_size = config.LINK_PER_BATCH
         total_pages_crawled = 0
-        while True:
+        while not self.stop_requested:
             batch_urls = []
             page_numbers = []
             for i in range(batch_size):
                 current_page = page + i
-                if current_page > config.PAGES_SITE:
+                if current_page > last_page:
                     break
                 paginated_url = self.build_pagination_url(search_url, current_page)
                 batch_urls.append(paginated_url)
@@ -90,26 +171,34 @@ class BaseCrawler(ABC):
                 break
             self.logger.info(f"Crawling pages {page_numbers[0]}-{page_numbers[-1]} in batch")
             try:
-                results = await crawler.arun_many(
-                    urls=batch_urls,
-                    config=self.crawler,
-                    dispatcher=self.dispatcher,
-                )
+                with timing.timed(self.website_name, "rate_limit_wait"):
+                    await self.rate_limiter.acquire(search_url, len(batch_urls))
+                with timing.timed(self.website_name, "fetch_listing_batch"):
+                    results = await crawler.arun_many(
+                        urls=batch_urls,
+                        config=self.crawler,
+                        dispatcher=self.dispatcher,
+                    )
+                batch_links = 0
                 for i, result in enumerate(results):
+                    self._record_fetch(result, "listing")
                     if result.success:
-                        soup = BeautifulSoup(result.html, 'html.parser')
-                        page_links = self.extract_links_from_page(soup)
+                        with timing.timed(self.website_name, "parse_listing"):
+                            soup = BeautifulSoup(result.html, 'html.parser')
+                            page_links = self.extract_links_from_page(soup)
                         all_links.extend(page_links)
+                        batch_links += len(page_links)
                 total_pages_crawled += len(batch_urls)
+                await self.notify_observers("pages_crawled", {"pages": len(batch_urls), "links": batch_links})
             except Exception as e:
                 self.logger.error(f"Error in batch crawling: {e}")
                 break
             page += len(batch_urls)
             await asyncio.sleep(self.delay)
         self.logger.info(f"Finished crawling, found {len(all_links)} property links")
-        # Cập nhật số page đã crawl vào crawl_stats nếu có
+        # Cộng dồn số page đã crawl vào crawl_stats (nhiều search URL/shard dùng chung một stats)
         if self.crawl_stats:
-            self.crawl_stats.total_pages = total_pages_crawled
+            self.crawl_stats.total_pages += total_pages_crawled
         return all_links
 
     async def crawl_property_details_batch(self, crawler: AsyncWebCrawler, property_links: List[Dict[str, Any]]) -> List[RealEstateProperty]:
@@ -120,50 +209,113 @@ class BaseCrawler(ABC):
 
         unique_links = []
         for prop in property_links:
-            if not self.repository.exists_by_link(prop['url']):
+            timing.count(self.website_name, "db_round_trips")
+            with timing.timed(self.website_name, "db_exists"):
+                exists = self.repository.exists_by_link(prop['url'])
+            if not exists:
                 unique_links.append(prop)
             else:
                 duplicate_count += 1
-            self.logger.info(f"Property link: {prop['url']} - Exists: {self.repository.exists_by_link(prop['url'])}")
+            if self.log_sampler.allow("property_link"):
+                self.logger.debug("Property link: {} - exists: {} (sampled)", prop['url'], exists)
 
         for i in range(0, len(unique_links), batch_size):
+            if self.stop_requested:
+                break
             batch = unique_links[i:i + batch_size]
             tasks = [self.crawl_single_property(crawler, prop_link) for prop_link in batch]
             batch_results = await asyncio.gather(*tasks, return_exceptions=True)
-            for result in batch_results:
+            for prop_link, result in zip(batch, batch_results):
                 if isinstance(result, Exception):
-                    self.logger.error(f"Property crawl failed: {result}")
+                    if self.log_sampler.allow("property_failed"):
+                        self.logger.error("Property crawl failed: {} ({} so far)", result,
+                                          self.log_sampler.counts["property_failed"])
                     failed_count += 1
+                    await self.notify_observers("property_failed", prop_link)
                 elif result:
                     properties.append(result)
-                    self.notify_observers("property_extracted", result)
+                    await self.notify_observers("property_extracted", result)
+                else:
+                    # Không tải được trang hoặc không trích xuất được dữ liệu
+                    failed_count += 1
+                    await self.notify_observers("property_failed", prop_link)
             await asyncio.sleep(self.delay)
 
-        # Cập nhật thống kê vào crawl_stats nếu có
+        metrics.inc(metrics.PROPERTIES, self.website_name, "extracted", amount=len(properties))
+        metrics.inc(metrics.PROPERTIES, self.website_name, "duplicate", amount=duplicate_count)
+        metrics.inc(metrics.PROPERTIES, self.website_name, "failed", amount=failed_count)
+        # Cộng dồn thống kê vào crawl_stats (tổng/thành công được chốt lại trong crawl_all)
         if self.crawl_stats:
-            self.crawl_stats.duplicate_items = duplicate_count
-            self.crawl_stats.failed_items = failed_count
-            self.crawl_stats.successful_items = len(properties)
-            self.crawl_stats.total_items = len(properties) + failed_count + duplicate_count
+            self.crawl_stats.duplicate_items += duplicate_count
+            self.crawl_stats.failed_items += failed_count
 
         return properties
 
     async def crawl_single_property(self, crawler: AsyncWebCrawler, property_link: Dict[str, Any]) -> Optional[RealEstateProperty]:
+        with log_context(url=property_link.get('url')):
+            return await self._crawl_single_property(crawler, property_link)
+
+    async def _crawl_single_property(self, crawler: AsyncWebCrawler, property_link: Dict[str, Any]) -> Optional[RealEstateProperty]:
         try:
             url = property_link['url']
-            result = await crawler.arun(url=url)
+            with timing.timed(self.website_name, "rate_limit_wait"):
+                await self.rate_limiter.acquire(url)
+            with timing.timed(self.website_name, "fetch_detail"):
+                result = await crawler.arun(url=url)
+            self._record_fetch(result, "detail")
             if result.success:
-                soup = BeautifulSoup(result.html, 'html.parser')
-                property_data = self.extract_property_details(soup, url)
-                if property_data:
-                    property_data['source'] = self.website_name
-                    property_data['crawled_at'] = datetime.now()
-                    property_data['link'] = url
-                    return RealEstateProperty(**property_data)
+                with timing.timed(self.website_name, "parse_detail"):
+                    return self._build_property(result.html, url)
         except Exception as e:
-            self.logger.error(f"Error crawling property {property_link.get('url', '')}: {e}")
+            if self.log_sampler.allow("property_error"):
+                self.logger.error("Error crawling property {}: {} ({} so far)", property_link.get('url', ''), e,
+                                  self.log_sampler.counts["property_error"])
         return None
 
+    def _build_property(self, html: str, url: str) -> Optional[RealEstateProperty]:
+        soup = BeautifulSoup(html, 'html.parser')
+        property_data = self.extract_property_details(soup, url)
+        if not property_data:
+            return None
+        property_data['source'] = self.website_name
+        property_data['crawled_at'] = datetime.now()
+        property_data['link'] = url
+        if property_data.get('address'):
+            location = resolve_address(property_data['address'])
+            property_data['city'] = property_data.get('city') or location['city']
+            property_data['district'] = location['district']
+            property_data['ward'] = location['ward']
+        return RealEstateProperty(**property_data)
+
+    def _record_fetch(self, result, kind: str):
+        """Đếm trang đã tải (listing/detail) theo trạng thái, mã HTTP và số byte HTML"""
+        metrics.inc(metrics.PAGES_FETCHED, self.website_name, kind, "success" if result.success else "failed")
+        status_code = getattr(result, "status_code", None)
+        if status_code:
+            metrics.inc(metrics.HTTP_RESPONSES, self.website_name, str(status_code))
+        if result.success and result.html:
+            size = len(result.html.encode('utf-8'))
+            timing.count(self.website_name, "pages_fetched")
+            timing.count(self.website_name, "bytes_downloaded", size)
+            metrics.inc(metrics.BYTES_DOWNLOADED, self.website_name, amount=size)
+
+    def extract_phone_from_soup(self, soup: BeautifulSoup, fallback_text: Optional[str] = None) -> Optional[str]:
+        """
+        Số điện thoại (E.164) lấy từ các node đích thay vì toàn trang (tránh hotline ở header/footer):
+        link tel: và thuộc tính data-*, rồi phone_selectors của site, cuối cùng là fallback_text (mô tả).
+        """
+        for node in soup.select(PHONE_NODE_SELECTOR):
+            for attr in PHONE_ATTRIBUTES:
+                phone = normalize_phone(node.get(attr) or "")
+                if phone:
+                    return phone
+        for selector in self.phone_selectors:
+            for node in soup.select(selector):
+                phone = extract_phone(node.get_text(" ", strip=True))
+                if phone:
+                    return phone
+        return extract_phone(fallback_text)
+
     # Abstract methods to be implemented by each website crawler
     @abstractmethod
     def build_pagination_url(self, base_url: str, page: int) -> str:
@@ -0,0 +1,199 @@
+import asyncio
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, List, Optional
+
+from src.config.settings import config
+from src.utils import metrics
+from src.utils.logging import get_logger
+
+logger = get_logger("event_bus")
+
+# Sự kiện vòng đời không bao giờ bị bỏ qua, kể cả khi hàng đợi đầy
+LIFECYCLE_EVENTS = {"crawl_started", "crawl_completed", "crawl_failed"}
+
+
+class OverflowPolicy:
+    BLOCK = "block"  # publish chờ tới khi có chỗ (backpressure về crawler)
+    DROP_OLDEST = "drop_oldest"  # bỏ sự kiện cũ nhất trong hàng đợi
+    DROP_NEWEST = "drop_newest"  # bỏ sự kiện đang publish
+
+    ALL = (BLOCK, DROP_OLDEST, DROP_NEWEST)
+
+
+@dataclass
+class CrawlerEvent:
+    event_type: str
+    data: Any
+    source: str
+    created_at: datetime = field(default_factory=datetime.now)
+
+
+class EventSubscriber(ABC):
+    """Subscriber bất đồng bộ, nhận sự kiện theo batch từ EventBus"""
+
+    # True nếu mất sự kiện khi quá tải không làm mất dữ liệu (log, tiến độ):
+    # chỉ subscriber lossy mới được dùng drop_oldest/drop_newest
+    lossy = False
+
+    @abstractmethod
+    async def on_event(self, event: CrawlerEvent):
+        pass
+
+    async def on_properties(self, source: str, properties: List[Any]):
+        """Nhận một loạt property_extracted liên tiếp, mặc định xử lý từng cái"""
+        for prop in properties:
+            await self.on_event(CrawlerEvent("property_extracted", prop, source))
+
+
+class ObserverAdapter(EventSubscriber):
+    """Cho các CrawlerObserver đồng bộ cũ chạy trên EventBus"""
+
+    def __init__(self, observer):
+        self.observer = observer
+        self.lossy = getattr(observer, "lossy", False)
+
+    async def on_event(self, event: CrawlerEvent):
+        if getattr(self.observer, "blocking_io", False):
+            # Observer ghi DB... chạy trong thread để không chặn event loop
+            await asyncio.to_thread(self.observer.notify, event.event_type, event.data, event.source)
+        else:
+            self.observer.notify(event.event_type, event.data, event.source)
+        await self.observer.wait_ready(event.source)
+
+
+class _Subscription:
+    def __init__(self, subscriber: EventSubscriber, buffer_size: int, overflow: str, batch_size: int):
+        if overflow not in OverflowPolicy.ALL:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.subscriber = subscriber
+        self.buffer_size = buffer_size
+        self.overflow = overflow
+        self.batch_size = max(1, batch_size)
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+        self.dropped = 0
+        # ObserverAdapter: đặt tên theo observer bên trong
+        self.queue_name = f"event_bus.{type(getattr(subscriber, 'observer', subscriber)).__name__}"
+
+
+class EventBus:
+    """
+    Event bus bất đồng bộ: mỗi subscriber có hàng đợi riêng và task tiêu thụ riêng,
+    nên subscriber chậm không làm chậm coroutine crawl (trừ khi dùng policy 'block' và hàng đợi đã đầy).
+    """
+
+    def __init__(self, buffer_size: int = None, overflow: str = None, batch_size: int = None):
+        self.buffer_size = buffer_size or config.EVENT_BUFFER_SIZE
+        self.overflow = overflow or config.EVENT_OVERFLOW
+        self.batch_size = batch_size or config.EVENT_BATCH_SIZE
+        self.subscriptions: List[_Subscription] = []
+
+    def subscribe(self, subscriber: EventSubscriber, buffer_size: int = None, overflow: str = None,
+                  batch_size: int = None) -> _Subscription:
+        """
+        overflow mặc định: policy chung (EVENT_OVERFLOW) nếu subscriber lossy, còn lại luôn block
+        (vd: enrich/lưu DB: bỏ property_extracted là mất tin)
+        """
+        lossy = getattr(subscriber, "lossy", False)
+        overflow = overflow or (self.overflow if lossy else OverflowPolicy.BLOCK)
+        if overflow != OverflowPolicy.BLOCK and not lossy:
+            raise ValueError(f"{type(subscriber).__name__} carries data, overflow policy must be 'block'")
+        subscription = _Subscription(
+            subscriber,
+            buffer_size or self.buffer_size,
+            overflow,
+            batch_size or self.batch_size
+        )
+        self.subscriptions.append(subscription)
+        return subscription
+
+    async def publish(self, event_type: str, data: Any, source: str):
+        event = CrawlerEvent(event_type, data, source)
+        for subscription in self.subscriptions:
+            self._ensure_consumer(subscription)
+            queue = subscription.queue
+            if subscription.overflow == OverflowPolicy.BLOCK or event_type in LIFECYCLE_EVENTS:
+                await queue.put(event)
+            elif not queue.full():
+                queue.put_nowait(event)
+            elif subscription.overflow == OverflowPolicy.DROP_OLDEST and self._evict_oldest(queue):
+                queue.put_nowait(event)
+                subscription.dropped += 1
+            elif subscription.overflow == OverflowPolicy.DROP_OLDEST:
+                await queue.put(event)  # hàng đợi toàn sự kiện vòng đời: không bỏ được gì, chờ như block
+            else:
+                subscription.dropped += 1
+
+    @staticmethod
+    def _evict_oldest(queue: asyncio.Queue) -> bool:
+        """Bỏ sự kiện cũ nhất không phải vòng đời, giữ nguyên thứ tự phần còn lại; False nếu không có"""
+        events = [queue.get_nowait() for _ in range(queue.qsize())]
+        victim = next((i for i, event in enumerate(events) if event.event_type not in LIFECYCLE_EVENTS), None)
+        if victim is not None:
+            del events[victim]
+        for event in events:
+            queue.put_nowait(event)
+        # get/put lại làm tăng bộ đếm unfinished: trả về đúng số cũ (trừ sự kiện bị bỏ)
+        for _ in range(len(events) + (victim is not None)):
+            queue.task_done()
+        return victim is not None
+
+    async def flush(self):
+        """Chờ mọi subscriber xử lý hết các sự kiện đã publish"""
+        for subscription in self.subscriptions:
+            if subscription.queue is not None:
+                await subscription.queue.join()
+
+    async def close(self):
+        """Flush rồi dừng các task tiêu thụ (sẽ tự khởi động lại nếu publish tiếp)"""
+        await self.flush()
+        for subscription in self.subscriptions:
+            if subscription.task is not None:
+                subscription.task.cancel()
+                await asyncio.gather(subscription.task, return_exceptions=True)
+                subscription.task = None
+            if subscription.dropped:
+                logger.warning(f"{type(subscription.subscriber).__name__} dropped {subscription.dropped} events")
+
+    def _ensure_consumer(self, subscription: _Subscription):
+        if subscription.queue is None:
+            subscription.queue = asyncio.Queue(maxsize=subscription.buffer_size)
+        if subscription.task is None:
+            subscription.task = asyncio.create_task(self._consume(subscription))
+
+    async def _consume(self, subscription: _Subscription):
+        queue = subscription.queue
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < subscription.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            metrics.set_gauge(metrics.QUEUE_DEPTH, queue.qsize(), subscription.queue_name)
+            try:
+                await self._deliver(subscription.subscriber, batch)
+            except Exception as e:
+                logger.error(f"{type(subscription.subscriber).__name__} failed to handle events: {e}")
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    @staticmethod
+    async def _deliver(subscriber: EventSubscriber, batch: List[CrawlerEvent]):
+        # Gom các property_extracted liên tiếp cùng source để giao một lần
+        properties, properties_source = [], None
+        for event in batch:
+            if event.event_type == "property_extracted" and event.source == (properties_source or event.source):
+                properties.append(event.data)
+                properties_source = event.source
+                continue
+            if properties:
+                await subscriber.on_properties(properties_source, properties)
+                properties, properties_source = [], None
+            if event.event_type == "property_extracted":
+                properties.append(event.data)
+                properties_source = event.source
+            else:
+                await subscriber.on_event(event)
+        if properties:
+            await subscriber.on_properties(properties_source, properties)
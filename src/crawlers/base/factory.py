@@ -1,30 +1,39 @@
-from typing import Dict, Any
-from src.crawlers.base.base_crawler import BaseCrawler
-from src.crawlers.sites.batdongsan_crawler import BatDongSanCrawler
-from src.crawlers.sites.nhatot_crawler import NhaTotCrawler
-from src.crawlers.sites.muaban_crawler import MuaBanCrawler
-from src.crawlers.sites.bds123_crawler import BDS123Crawler
-from src.crawlers.sites.sosanhnha_crawler import SoSanhNhaCrawler
-from src.crawlers.sites.mogi_crawler import MogiCrawler
+import importlib
+from typing import TYPE_CHECKING, Dict, Any, Union
+
+if TYPE_CHECKING:
+    from src.crawlers.base.base_crawler import BaseCrawler
 
 
 class CrawlerFactory:
     """Factory for creating website-specific crawlers"""
 
-    _crawler_classes = {
-        'batdongsan.com.vn': BatDongSanCrawler,
-        'nhatot.com': NhaTotCrawler,
-        'muaban.net': MuaBanCrawler,
-        'bds123.vn': BDS123Crawler,
-        'sosanhnha.com': SoSanhNhaCrawler,
-        'mogi.vn': MogiCrawler
+    # Đăng ký theo đường dẫn "module:Class", chỉ import module của site khi thật sự tạo crawler
+    # (import một crawler kéo theo crawl4ai/bs4, tiến trình chỉ crawl một site không cần cả sáu)
+    _crawler_classes: Dict[str, Union[str, type]] = {
+        'batdongsan.com.vn': 'src.crawlers.sites.batdongsan_crawler:BatDongSanCrawler',
+        'nhatot.com': 'src.crawlers.sites.nhatot_crawler:NhaTotCrawler',
+        'muaban.net': 'src.crawlers.sites.muaban_crawler:MuaBanCrawler',
+        'bds123.vn': 'src.crawlers.sites.bds123_crawler:BDS123Crawler',
+        'sosanhnha.com': 'src.crawlers.sites.sosanhnha_crawler:SoSanhNhaCrawler',
+        'mogi.vn': 'src.crawlers.sites.mogi_crawler:MogiCrawler'
     }
 
     @classmethod
-    def create_crawler(cls, website_name: str, website_config: Dict[str, Any]) -> BaseCrawler:
+    def get_crawler_class(cls, website_name: str) -> type:
+        """Class crawler của site; import module ở lần gọi đầu rồi giữ lại class"""
+        crawler_class = cls._crawler_classes.get(website_name)
+        if isinstance(crawler_class, str):
+            module_name, class_name = crawler_class.split(":")
+            crawler_class = getattr(importlib.import_module(module_name), class_name)
+            cls._crawler_classes[website_name] = crawler_class
+        return crawler_class
+
+    @classmethod
+    def create_crawler(cls, website_name: str, website_config: Dict[str, Any]) -> "BaseCrawler":
         """Factory method to create appropriate crawler"""
 
-        crawler_class = cls._crawler_classes.get(website_name)
+        crawler_class = cls.get_crawler_class(website_name)
 
         if not crawler_class:
             raise ValueError(f"No crawler implementation found for website: {website_name}")
@@ -37,9 +46,15 @@ class CrawlerFactory:
         return list(cls._crawler_classes.keys())
 
     @classmethod
-    def register_crawler(cls, website_name: str, crawler_class: type):
-        """Register new crawler class for a website"""
-        if not issubclass(crawler_class, BaseCrawler):
-            raise ValueError("Crawler class must inherit from BaseCrawler")
+    def register_crawler(cls, website_name: str, crawler_class: Union[str, type]):
+        """Register new crawler class (or lazy "module:Class" path) for a website"""
+        if isinstance(crawler_class, str):
+            if ":" not in crawler_class:
+                raise ValueError("Lazy crawler path must look like 'package.module:ClassName'")
+        else:
+            from src.crawlers.base.base_crawler import BaseCrawler
+
+            if not issubclass(crawler_class, BaseCrawler):
+                raise ValueError("Crawler class must inherit from BaseCrawler")
 
         cls._crawler_classes[website_name] = crawler_class
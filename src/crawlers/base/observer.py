@@ -1,34 +1,67 @@
 from abc import ABC, abstractmethod
 import asyncio
-from typing import Any
+import threading
+import time
+from typing import Any, Dict
 from src.config.settings import Config
 from src.data.models.RealEstateModel import RealEstateProperty
+from src.utils import metrics, timing
 from src.utils.logging import get_logger
+from src.utils.progress_store import COUNTERS, ProgressStore
 
 logger = get_logger("llm_service")
 class CrawlerObserver(ABC):
     """Abstract observer for crawler events"""
 
+    # True nếu notify() làm I/O chặn (DB...), khi đó sẽ được chạy trong thread
+    blocking_io = False
+    # True nếu bỏ sự kiện khi quá tải chấp nhận được (log, tiến độ), xem EVENT_OVERFLOW
+    lossy = False
+
     @abstractmethod
     def notify(self, event_type: str, data: Any, source: str):
         """Handle crawler notifications"""
         pass
 
+    async def wait_ready(self, source: str):
+        """Chờ observer sẵn sàng nhận thêm sự kiện (backpressure), mặc định không chờ"""
+        return None
+
 
 class DataSaveObserver(CrawlerObserver):
     """Observer for saving data to database"""
 
-    def __init__(self, repository):
+    blocking_io = True
+
+    def __init__(self, repository, downstream_observers=None, dedup_service=None, seller_repository=None):
         self.repository = repository
+        self.downstream_observers = downstream_observers or []
+        self.dedup_service = dedup_service
+        self.seller_repository = seller_repository
 
     def notify(self, event_type: str, data: Any, source: str):
-        # print(f"[DataSaveObserver] notify called with event: {event_type}, data={data}")
         if event_type == "property_enriched":
+            saved = False
             try:
-                # print(f"[DataSaveObserver] Saving property: {getattr(data, 'link', None)}")
-                self.repository.save_property(data)
+                property_id = self.repository.save_property(data)
+                saved = bool(property_id)
             except Exception as e:
                 logger.error(f"[DataSaveObserver] Error saving property: {e}")
+            if saved and self.dedup_service:
+                try:
+                    with timing.timed(source, "dedup_assign"):
+                        self.dedup_service.assign(data, property_id)
+                except Exception as e:
+                    logger.error(f"[DataSaveObserver] Error assigning duplicate cluster: {e}")
+            if saved and self.seller_repository:
+                try:
+                    with timing.timed(source, "seller_index"):
+                        self.seller_repository.record_listing(data)
+                except Exception as e:
+                    logger.error(f"[DataSaveObserver] Error updating seller index: {e}")
+            metrics.inc(metrics.PROPERTIES, source, "saved" if saved else "save_failed")
+            for obs in self.downstream_observers:
+                obs.notify("property_saved" if saved else "property_save_failed", data, source)
         elif event_type == "crawl_completed":
             try:
                 self.repository.save_crawl_stats(data)
@@ -36,9 +69,50 @@ class DataSaveObserver(CrawlerObserver):
                 logger.error(f"[DataSaveObserver] Error saving crawl stats: {e}")
 
 
+class MarketStatsObserver(CrawlerObserver):
+    """
+    Gom các nhóm city × type × source × ngày vừa có tin được lưu,
+    đủ flush_size tin thì tính lại các nhóm đó vào market_stats.
+    Gọi flush() sau khi pipeline enrich/lưu đã drain để đẩy nốt phần dư.
+    """
+
+    blocking_io = True
+
+    def __init__(self, market_stats_service, flush_size: int = None):
+        self.service = market_stats_service
+        self.flush_size = flush_size or Config().MARKET_STATS_FLUSH_SIZE
+        self.pending = set()
+        self.pending_items = 0
+        self._lock = threading.Lock()  # DataSaveObserver gọi downstream từ thread
+
+    def notify(self, event_type: str, data: Any, source: str):
+        if event_type != "property_saved":
+            return
+        with self._lock:
+            self.pending.add(self.service.group_key(data))
+            self.pending_items += 1
+            if self.pending_items < self.flush_size:
+                return
+            groups, self.pending, self.pending_items = self.pending, set(), 0
+        self._refresh(groups)
+
+    def flush(self):
+        with self._lock:
+            groups, self.pending, self.pending_items = self.pending, set(), 0
+        self._refresh(groups)
+
+    def _refresh(self, groups):
+        try:
+            self.service.refresh(groups)
+        except Exception as e:
+            logger.error(f"[MarketStatsObserver] Error refreshing market stats: {e}")
+
+
 class LoggingObserver(CrawlerObserver):
     """Observer for logging crawler events"""
 
+    lossy = True
+
     def __init__(self, logger):
         self.logger = logger
 
@@ -46,7 +120,7 @@ class LoggingObserver(CrawlerObserver):
         if event_type == "crawl_started":
             self.logger.info(f"[{source}] Crawl started")
         elif event_type == "property_extracted":
-            self.logger.debug(f"[{source}] Property extracted: {data.title}")
+            self.logger.debug("[{}] Property extracted: {}", source, data.title)
         elif event_type == "crawl_completed":
             self.logger.info(f"[{source}] Crawl completed: {data.successful_items} successful")
         elif event_type == "crawl_failed":
@@ -54,41 +128,97 @@ class LoggingObserver(CrawlerObserver):
 
 
 class ProgressObserver(CrawlerObserver):
-    """Observer for tracking crawl progress"""
+    """
+    Observer for tracking crawl progress.
+    Ngoài dict self.progress trong tiến trình, bộ đếm được ghi theo lô ra ProgressStore
+    (file memory-mapped) để API đọc được tiến độ của các tiến trình crawl khác.
+    """
+
+    lossy = True
 
-    def __init__(self):
+    def __init__(self, store: ProgressStore = None, flush_interval: float = None):
+        config = Config()
         self.progress = {}
+        self.store = store or ProgressStore(config.PROGRESS_FILE, list(config.WEBSITES))
+        self.flush_interval = config.PROGRESS_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self._last_flush = {}
+        self._lock = threading.Lock()  # DataSaveObserver gọi downstream từ thread
 
     def notify(self, event_type: str, data: Any, source: str):
+        with self._lock:
+            self._handle(event_type, data, source)
+
+    def _handle(self, event_type: str, data: Any, source: str):
         if source not in self.progress:
             self.progress[source] = {
                 'status': 'idle',
                 'total_items': 0,
                 'processed_items': 0,
                 'start_time': None,
-                'end_time': None
+                'end_time': None,
+                **{name: 0 for name in COUNTERS}
             }
+        progress = self.progress[source]
 
         if event_type == "crawl_started":
-            self.progress[source].update({
+            progress.update({
                 'status': 'running',
                 'start_time': data.start_time,
-                'processed_items': 0
+                'end_time': None,
+                'processed_items': 0,
+                **{name: 0 for name in COUNTERS}
             })
+        elif event_type == "pages_crawled":
+            progress['pages'] += data.get('pages', 0)
+            progress['links'] += data.get('links', 0)
         elif event_type == "property_extracted":
-            self.progress[source]['processed_items'] += 1
+            progress['processed_items'] += 1
+            progress['extracted'] += 1
+        elif event_type == "property_enriched":
+            progress['enriched'] += 1
+        elif event_type == "property_saved":
+            progress['saved'] += 1
+        elif event_type in ("property_failed", "property_save_failed"):
+            progress['failed'] += 1
         elif event_type == "crawl_completed":
-            self.progress[source].update({
+            progress.update({
                 'status': 'completed',
                 'total_items': data.total_items,
                 'end_time': data.end_time
             })
         elif event_type == "crawl_failed":
-            self.progress[source].update({
+            progress.update({
                 'status': 'failed',
                 'end_time': data['stats'].end_time
             })
 
+        lifecycle = event_type in ("crawl_started", "crawl_completed", "crawl_failed")
+        now = time.monotonic()
+        if lifecycle or now - self._last_flush.get(source, 0) >= self.flush_interval:
+            self._last_flush[source] = now
+            self._publish(source, progress)
+
+    def flush(self, source: str = None):
+        """
+        Ghi ngay bộ đếm ra store (mặc định mọi source): enriched/saved phần lớn tới sau crawl_completed
+        khi hàng đợi LLM drain, nên không có sự kiện vòng đời nào ép ghi nữa
+        """
+        with self._lock:
+            for name in [source] if source else list(self.progress):
+                if name in self.progress:
+                    self._last_flush[name] = time.monotonic()
+                    self._publish(name, self.progress[name])
+
+    def _publish(self, source: str, progress: Dict[str, Any]):
+        start_time = progress['start_time'].timestamp() if progress['start_time'] else 0
+        end_time = progress['end_time'].timestamp() if progress['end_time'] else time.time()
+        elapsed = end_time - start_time if start_time else 0
+        throughput = progress['extracted'] / elapsed if elapsed > 0 else 0.0
+        try:
+            self.store.write(source, progress['status'], progress, throughput, start_time)
+        except Exception as e:
+            logger.warning(f"[ProgressObserver] Cannot publish progress for {source}: {e}")
+
     def get_progress(self, source: str = None):
         """Get progress for specific source or all sources"""
         if source:
@@ -97,37 +227,96 @@ class ProgressObserver(CrawlerObserver):
 
 
 class LLMProcessingObserver(CrawlerObserver):
-    def __init__(self, llm_service, downstream_observers=None):
+    """
+    Enrichment stage: gom property theo từng source thành batch, đẩy vào hàng đợi
+    có giới hạn và xử lý bằng một số worker cố định.
+    Khi hàng đợi đầy, wait_ready() sẽ chặn crawler cho tới khi có chỗ trống.
+    """
+
+    def __init__(self, llm_service, downstream_observers=None, max_queue_size: int = None, workers: int = None):
         config = Config()
         self.llm_service = llm_service
-        self.batch = []
         self.batch_size = config.LLM_BATCH_SIZE
+        self.max_queue_size = max_queue_size or config.LLM_QUEUE_SIZE
+        self.num_workers = workers or config.LLM_WORKERS
         self.downstream_observers = downstream_observers or []
-        self.tasks = []  # Thêm dòng này
+        self.buffers = {}  # source -> list property chưa đủ batch
+        self.flush_sources = set()  # source đã crawl xong, cần đẩy nốt phần dư
+        self.queue = None
+        self.workers = []
 
     def notify(self, event_type: str, data: Any, source: str):
         if event_type == "property_extracted":
-            self.batch.append(data)
-            if len(self.batch) >= self.batch_size:
-                task = asyncio.create_task(self._process_batch(source))
-                self.tasks.append(task)
-        elif event_type == "crawl_completed":
-            if self.batch:
-                task = asyncio.create_task(self._process_batch(source))
-                self.tasks.append(task)
-
-    async def _process_batch(self, source):
-        if self.batch:
-            enriched = await self.llm_service.process_batch(self.batch)
-            # Thêm dòng này
-            for prop in enriched:
-                if isinstance(prop, dict):
-                    try:
-                        print("[LLM SERVICE] Enriched property:", prop)
-                        prop = RealEstateProperty(**prop)
-                    except Exception as e:
-                        logger.error(f"[LLM SERVICE] Error creating RealEstateProperty: {e}, data={prop}")
-                        continue
-                for obs in self.downstream_observers:
-                    obs.notify("property_enriched", prop, source)
-            self.batch = []
+            self.buffers.setdefault(source, []).append(data)
+        elif event_type in ("crawl_completed", "crawl_failed"):
+            self.flush_sources.add(source)
+
+    async def wait_ready(self, source: str):
+        self._ensure_workers()
+        buffer = self.buffers.get(source)
+        flush = source in self.flush_sources
+        while buffer and (len(buffer) >= self.batch_size or flush):
+            batch = buffer[:self.batch_size]
+            del buffer[:self.batch_size]
+            await self.queue.put((source, batch))
+            metrics.set_gauge(metrics.QUEUE_DEPTH, self.queue.qsize(), "llm")
+        if flush:
+            self.flush_sources.discard(source)
+            self.buffers.pop(source, None)
+
+    async def drain(self):
+        """Đẩy toàn bộ phần dư vào hàng đợi, chờ xử lý xong rồi dừng worker"""
+        self._ensure_workers()
+        for source in list(self.buffers):
+            self.flush_sources.add(source)
+            await self.wait_ready(source)
+        await self.queue.join()
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    def _ensure_workers(self):
+        if self.queue is None:
+            self.queue = asyncio.Queue(maxsize=self.max_queue_size)
+        if not self.workers:
+            self.workers = [asyncio.create_task(self._worker()) for _ in range(self.num_workers)]
+
+    async def _worker(self):
+        while True:
+            source, batch = await self.queue.get()
+            metrics.set_gauge(metrics.QUEUE_DEPTH, self.queue.qsize(), "llm")
+            try:
+                await self._process_batch(source, batch)
+            except Exception as e:
+                logger.error(f"[LLMProcessingObserver] Error processing batch for {source}: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _process_batch(self, source, batch):
+        forwarded = set()
+
+        async def forward(prop):
+            # Property đã enrich xong trong stream -> chuyển tiếp ngay cho downstream
+            forwarded.add(id(prop))
+            await self._notify_downstream(prop, source)
+
+        enriched = await self.llm_service.process_batch(batch, on_enriched=forward)
+        for prop in enriched:
+            if id(prop) in forwarded:
+                continue
+            if isinstance(prop, dict):
+                try:
+                    prop = RealEstateProperty(**prop)
+                except Exception as e:
+                    logger.error(f"[LLM SERVICE] Error creating RealEstateProperty: {e}, data={prop}")
+                    continue
+            await self._notify_downstream(prop, source)
+
+    async def _notify_downstream(self, prop, source):
+        metrics.inc(metrics.PROPERTIES, source, "enriched")
+        for obs in self.downstream_observers:
+            if obs.blocking_io:
+                await asyncio.to_thread(obs.notify, "property_enriched", prop, source)
+            else:
+                obs.notify("property_enriched", prop, source)
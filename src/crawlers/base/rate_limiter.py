@@ -0,0 +1,44 @@
+import asyncio
+import time
+from typing import Dict
+from urllib.parse import urlparse
+
+from src.config.settings import config
+
+
+class DomainRateLimiter:
+    """
+    Giãn cách request theo domain, dùng chung cho mọi shard (và mọi crawler) trong cùng tiến trình:
+    mỗi request giữ một khe thời gian min_interval giây, các shard chạy song song của cùng
+    một site vì vậy không làm tăng tốc độ gọi vào site đó.
+    """
+
+    def __init__(self, min_interval: float = None):
+        self.min_interval = config.DOMAIN_MIN_INTERVAL if min_interval is None else min_interval
+        self._next_slot: Dict[str, float] = {}
+
+    @staticmethod
+    def domain(url: str) -> str:
+        return urlparse(url).netloc.lower().removeprefix("www.")
+
+    async def acquire(self, url: str, requests: int = 1):
+        """Chờ tới lượt cho `requests` request liên tiếp tới domain của url (vd: một lô arun_many)"""
+        if self.min_interval <= 0:
+            return
+        key = self.domain(url)
+        now = time.monotonic()
+        start = max(now, self._next_slot.get(key, now))
+        # Đặt chỗ trước khi await nên các coroutine khác xếp hàng phía sau, không tranh nhau
+        self._next_slot[key] = start + self.min_interval * requests
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+_limiter = None
+
+
+def get_rate_limiter() -> DomainRateLimiter:
+    global _limiter
+    if _limiter is None:
+        _limiter = DomainRateLimiter()
+    return _limiter
@@ -0,0 +1,18 @@
+from typing import List, NamedTuple
+
+
+class Shard(NamedTuple):
+    """Một phần việc của site: một search URL, các trang first_page..last_page (tính cả hai đầu)"""
+    search_url: str
+    first_page: int
+    last_page: int
+
+
+def plan_shards(search_urls: List[str], pages: int, shard_pages: int = None) -> List[Shard]:
+    """Chia search URL × khoảng trang; shard_pages rỗng thì mỗi search URL là một shard"""
+    shard_pages = max(1, shard_pages or pages)
+    return [
+        Shard(search_url, first, min(first + shard_pages - 1, pages))
+        for search_url in search_urls
+        for first in range(1, pages + 1, shard_pages)
+    ]
@@ -5,6 +5,7 @@ from urllib.parse import urljoin
 from bs4 import BeautifulSoup
 from bson import ObjectId
 
+from src.crawlers.authentication.batdongsan_strategy import PHONE_SELECTORS
 from src.crawlers.base.base_crawler import BaseCrawler
 from src.utils.text_processing import extract_price, extract_area, clean_text, extract_rooms, extract_bathrooms, \
     parse_date, extract_frontage, extract_city_from_address
@@ -13,6 +14,8 @@ from src.utils.text_processing import extract_price, extract_area, clean_text, e
 class BatDongSanCrawler(BaseCrawler):
     """Crawler for batdongsan.com.vn"""
 
+    phone_selectors = PHONE_SELECTORS
+
     def build_pagination_url(self, base_url: str, page: int) -> str:
         """Build pagination url for batdongsan.com.vn"""
         if page == 1:
@@ -190,8 +193,7 @@ class BatDongSanCrawler(BaseCrawler):
         data['city'] = extract_city_from_address(data['address']) if data.get('address') else None
 
         # NumberPhone (số điện thoại)
-        from src.utils.text_processing import extract_phone
-        data['numberphone'] = extract_phone(soup.get_text())
+        data['numberPhone'] = self.extract_phone_from_soup(soup, data.get('description'))
         if "id" not in data or not data["id"]:
             data["id"] = str(ObjectId())
 
@@ -135,9 +135,8 @@ class BDS123Crawler(BaseCrawler):
             "city": {
                 "custom": lambda soup, data: extract_city_from_address(data.get('address', ''))
             },
-            "numberphone": {
-                "custom": lambda soup: __import__('src.utils.text_processing',
-                                                  fromlist=['extract_phone']).extract_phone(soup.get_text())
+            "numberPhone": {
+                "custom": lambda soup, data: self.extract_phone_from_soup(soup, data.get('description'))
             },
             "link": {
                 "value": url,
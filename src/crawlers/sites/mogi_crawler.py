@@ -144,6 +144,7 @@ class MogiCrawler(BaseCrawler):
 
 
             # 15. NumberPhone
+            data['numberPhone'] = self.extract_phone_from_soup(soup, data.get('description'))
 
         except Exception as e:
             self.logger.error(f"Error extracting property details: {e}")
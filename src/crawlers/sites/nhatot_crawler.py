@@ -167,6 +167,7 @@ class NhaTotCrawler(BaseCrawler):
             data['city'] = clean_text(city)
 
             # 15. NumberPhone
+            data['numberPhone'] = self.extract_phone_from_soup(soup, data.get('description'))
 
         except Exception as e:
             self.logger.error(f"Error extracting property details: {e}")
@@ -1,7 +1,9 @@
+import logging
 from typing import Optional, Dict, Any
 
-from pymongo import MongoClient
+from pymongo import AsyncMongoClient, MongoClient
 from pymongo.errors import ServerSelectionTimeoutError, DuplicateKeyError
+from pymongo.asynchronous.database import AsyncDatabase
 from pymongo.synchronous.database import Database
 
 
@@ -20,6 +22,8 @@ class DatabaseManager:
 
         self.client: Optional[MongoClient] = None
         self.db: Optional[Database] = None
+        self.async_client: Optional[AsyncMongoClient] = None
+        self.async_db: Optional[AsyncDatabase] = None
         self.connected = False
         self._init = True
 
@@ -40,18 +44,33 @@ class DatabaseManager:
         except Exception as e:
             return False
 
+    def connect_async(self, uri) -> bool:
+        """
+        Client async cho các handler FastAPI (không chiếm thread của threadpool khi chờ Mongo).
+        Phải gọi trong event loop sẽ dùng client (vd: sự kiện startup); kết nối thật mở ở truy vấn đầu.
+        """
+        if self.async_db is not None:
+            return True
+        try:
+            self.async_client = AsyncMongoClient(uri, serverSelectionTimeoutMS=3000)
+            self.async_db = self.async_client.real_estate_db
+            return True
+        except Exception as e:
+            return False
+
     def _setup_indexes(self):
         if not self.connected:
             return
+        # Import muộn: indexes.py import các model, tránh vòng import khi model cần tới db
+        from src.config.settings import config
+        from src.data.database.indexes import IndexManager
+
         try:
-            collection = self.db.properties
-            collection.create_index('link', unique=True)
-            collection.create_index('thanh_pho')
-            collection.create_index('gia')
-            collection.create_index('dien_tich')
-            collection.create_index('loai_hinh')
+            if config.INDEX_AUTO_CREATE:
+                # Chỉ tạo index thiếu; drop/tạo lại index là việc của --action indexes
+                IndexManager(self.db).ensure()
         except Exception as e:
-            print(e)
+            logging.error(f"Cannot create indexes: {e}")
 
     def save(self, data: Dict[str, Any]):
         if not self.connected:
@@ -90,6 +109,16 @@ class DatabaseManager:
             self.client.close()
             self.connected = False
 
+    async def close_async(self):
+        if self.async_client:
+            await self.async_client.close()
+            self.async_client, self.async_db = None, None
+
+    def get_async_collection(self, name: str):
+        if self.async_db is None:
+            return None
+        return self.async_db[name]
+
     def get_collection(self, name: str):
         """Get collection"""
         if not self.connected:
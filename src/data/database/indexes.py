@@ -0,0 +1,133 @@
+from typing import Any, Dict, List
+
+from pymongo import IndexModel
+from pymongo.errors import OperationFailure
+
+from src.data.models.CrawlJobModel import CrawlJob
+from src.data.models.CrawlStatsModel import CrawlStats
+from src.data.models.RealEstateModel import RealEstateProperty
+from src.data.models.WebsiteStatesModel import WebsiteState
+from src.utils.logging import get_logger
+
+logger = get_logger("index_manager")
+
+# Model khai báo COLLECTION + INDEXES
+INDEXED_MODELS = [RealEstateProperty, CrawlStats, WebsiteState, CrawlJob]
+
+# Option của index được so sánh khi sync (khác nhau thì tạo lại)
+INDEX_OPTIONS = ("unique", "partialFilterExpression")
+
+# Collection phụ không có model
+EXTRA_INDEXES: Dict[str, List[Dict[str, Any]]] = {
+    "sellers": [
+        {"keys": [("listing_count", -1)]},  # top người bán
+    ],
+    "market_stats": [
+        {"keys": [("city", 1), ("type", 1), ("day", -1)]},
+        {"keys": [("source", 1), ("day", -1)]},
+    ],
+}
+
+# Index cũ luôn bị xóa khi sync (không cần INDEX_DROP_STALE): schema tiếng Việt cũ
+# và các index đã được thay bằng phiên bản có thêm _id để phân trang keyset
+LEGACY_INDEXES: Dict[str, List[str]] = {
+    RealEstateProperty.COLLECTION: [
+        "thanh_pho_1", "gia_1", "dien_tich_1", "loai_hinh_1",
+        "source_1_crawled_at_-1", "city_1_type_1_price_1",
+    ],
+}
+
+
+def index_name(keys: List[tuple]) -> str:
+    """Tên index theo quy ước mặc định của MongoDB (vd: source_1_crawled_at_-1)"""
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+
+class IndexManager:
+    """
+    Đồng bộ index của các collection với danh sách khai báo:
+    tạo index còn thiếu, tạo lại index khác option, luôn xóa index cũ trong LEGACY_INDEXES;
+    index lạ khác (không khai báo, không có trong LEGACY_INDEXES) chỉ bị xóa khi drop_stale.
+
+    sync() có thể drop index nên chỉ chạy tường minh (--action indexes);
+    khi kết nối chỉ gọi ensure(): tạo index còn thiếu, không drop gì.
+    """
+
+    def __init__(self, database, drop_stale: bool = False):
+        self.db = database
+        self.drop_stale = drop_stale
+        self.specs: Dict[str, List[Dict[str, Any]]] = {model.COLLECTION: model.INDEXES for model in INDEXED_MODELS}
+        for collection, specs in EXTRA_INDEXES.items():
+            self.specs.setdefault(collection, []).extend(specs)
+
+    def sync(self) -> Dict[str, Dict[str, List[str]]]:
+        report = {}
+        for collection_name, specs in self.specs.items():
+            report[collection_name] = self._sync_collection(
+                self.db[collection_name], specs, LEGACY_INDEXES.get(collection_name, []))
+        return report
+
+    def ensure(self) -> Dict[str, Dict[str, List[str]]]:
+        """Chỉ tạo index còn thiếu (an toàn khi gọi mỗi lần kết nối)"""
+        report = {}
+        for collection_name, specs in self.specs.items():
+            result = {"created": [], "dropped": [], "failed": []}
+            self._create_missing(self.db[collection_name], {index_name(spec["keys"]): spec for spec in specs}, result)
+            report[collection_name] = result
+        return report
+
+    def _sync_collection(self, collection, specs: List[Dict[str, Any]], legacy: List[str]) -> Dict[str, List[str]]:
+        result = {"created": [], "dropped": [], "failed": []}
+        existing = collection.index_information()
+        declared = {}
+        for spec in specs:
+            declared[index_name(spec["keys"])] = spec
+
+        for name, info in existing.items():
+            if name == "_id_":
+                continue
+            spec = declared.get(name)
+            stale = spec is None and (name in legacy or self.drop_stale)
+            changed = spec is not None and (list(info["key"]) != list(spec["keys"]) or any(
+                (info.get(option) or None) != (spec.get(option) or None) for option in INDEX_OPTIONS))
+            if stale or changed:
+                collection.drop_index(name)
+                result["dropped"].append(name)
+                logger.info(f"Dropped index {collection.name}.{name}")
+
+        self._create_missing(collection, declared, result)
+        return result
+
+    @staticmethod
+    def _create_missing(collection, declared: Dict[str, Dict[str, Any]], result: Dict[str, List[str]]):
+        existing = collection.index_information()
+        missing = [
+            IndexModel(spec["keys"], name=name, **{option: spec[option] for option in INDEX_OPTIONS if option in spec})
+            for name, spec in declared.items() if name not in existing
+        ]
+        for model in missing:
+            try:
+                collection.create_indexes([model])
+                result["created"].append(model.document["name"])
+                logger.info(f"Created index {collection.name}.{model.document['name']}")
+            except OperationFailure as e:
+                # vd: dữ liệu cũ bị trùng nên không tạo được unique index
+                result["failed"].append(model.document["name"])
+                logger.error(f"Failed to create index {collection.name}.{model.document['name']}: {e}")
+
+    def usage(self) -> List[Dict[str, Any]]:
+        """Số lần mỗi index được dùng kể từ lần khởi động mongod ($indexStats), ít dùng nhất lên đầu"""
+        rows = []
+        for collection_name, specs in self.specs.items():
+            declared = {index_name(spec["keys"]) for spec in specs} | {"_id_"}
+            for stat in self.db[collection_name].aggregate([{"$indexStats": {}}]):
+                rows.append({
+                    "collection": collection_name,
+                    "name": stat["name"],
+                    "key": dict(stat["key"]),
+                    "ops": stat["accesses"]["ops"],
+                    "since": stat["accesses"]["since"],
+                    "declared": stat["name"] in declared,
+                })
+        rows.sort(key=lambda row: (row["ops"], row["collection"], row["name"]))
+        return rows
@@ -0,0 +1,46 @@
+from datetime import datetime, timezone
+from typing import Any, ClassVar, Dict, List, Optional
+
+from bson import ObjectId
+from pydantic import BaseModel, Field, ConfigDict
+
+from src.data.models.CrawlStatsModel import PyObjectId
+
+
+class CrawlJob(BaseModel):
+    """Một shard crawl (search URL × khoảng trang) trong hàng đợi dùng chung giữa các node"""
+
+    COLLECTION: ClassVar[str] = "crawl_jobs"
+    INDEXES: ClassVar[List[Dict[str, Any]]] = [
+        {"keys": [("status", 1), ("created_at", 1)]},  # claim job cũ nhất
+        {"keys": [("run_id", 1)]},
+        # Mỗi shard chỉ có một job đang hoạt động (chờ/chạy): hai node không enqueue/crawl trùng
+        {"keys": [("website", 1), ("search_url", 1), ("page_start", 1)], "unique": True,
+         "partialFilterExpression": {"active": True}},
+    ]
+
+    id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
+    run_id: str = Field(..., description="Lần enqueue (các shard của cùng một lần crawl site)")
+    website: str = Field(..., description="Tên website")
+    search_url: str = Field(..., description="Search URL của shard")
+    page_start: int = Field(..., description="Trang đầu")
+    page_end: int = Field(..., description="Trang cuối (tính cả)")
+    status: str = Field(default="pending", description="pending, running, done, cancelled, failed")
+    active: Optional[bool] = Field(default=True, description="True khi đang chờ/chạy, bị xóa khi kết thúc")
+    attempts: int = Field(default=0, description="Số lần đã claim")
+    max_attempts: int = Field(default=3, description="Số lần thử tối đa")
+    worker_id: Optional[str] = Field(None, description="Worker đang giữ lease")
+    lease_expires_at: Optional[datetime] = Field(None, description="Hết hạn lease nếu không heartbeat")
+    heartbeat_at: Optional[datetime] = Field(None, description="Heartbeat gần nhất")
+    cancel_requested: bool = Field(default=False, description="Yêu cầu worker dừng hợp tác")
+    result: Optional[Dict[str, Any]] = Field(None, description="Thống kê của shard khi xong")
+    error: Optional[str] = Field(None, description="Lỗi gần nhất")
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), description="UTC")
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(
+        populate_by_name=True,
+        arbitrary_types_allowed=True,
+        json_encoders={ObjectId: str}
+    )
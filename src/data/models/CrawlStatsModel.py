@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Annotated, Optional
+from typing import Annotated, Any, ClassVar, Dict, List, Optional
 
 from bson import ObjectId
 from pydantic import BaseModel, BeforeValidator, Field, ConfigDict
@@ -18,6 +18,12 @@ PyObjectId = Annotated[ObjectId, BeforeValidator(validate_object_id)]
 class CrawlStats(BaseModel):
     """Model thống kê quá trình crawl"""
 
+    COLLECTION: ClassVar[str] = "crawl_stats"
+    INDEXES: ClassVar[List[Dict[str, Any]]] = [
+        {"keys": [("start_time", -1)]},  # các phiên gần nhất
+        {"keys": [("source", 1), ("start_time", -1)]},
+    ]
+
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
     source: str = Field(..., description="Nguồn crawl")
     start_time: datetime = Field(..., description="Thời gian bắt đầu")
@@ -27,8 +33,12 @@ class CrawlStats(BaseModel):
     successful_items: int = Field(default=0, description="Số items thành công")
     failed_items: int = Field(default=0, description="Số items thất bại")
     duplicate_items: int = Field(default=0, description="Số items trùng lặp")
-    status: str = Field(default="running", description="Trạng thái: running, completed, failed")
+    status: str = Field(default="running", description="Trạng thái: running, completed, cancelled, failed")
     error_message: Optional[str] = Field(None, description="Thông báo lỗi")
+    timings: Dict[str, Any] = Field(
+        default_factory=dict,
+        description="Theo pha: {phases: {fetch_detail: {count, p50_ms, p95_ms, p99_ms...}}, counters: {bytes_downloaded...}}"
+    )
 
     model_config = ConfigDict(
         populate_by_name=True,
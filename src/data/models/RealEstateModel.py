@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Annotated, Optional, List
+from typing import Annotated, Any, ClassVar, Dict, Optional, List
 
 from bson import ObjectId
 from pydantic import BeforeValidator, BaseModel, Field, ConfigDict, field_validator
@@ -19,14 +19,29 @@ PyObjectId = Annotated[ObjectId, BeforeValidator(validate_object_id)]
 class RealEstateProperty(BaseModel):
     """Model cho thông tin bất động sản"""
 
+    # Collection và index theo các truy vấn thực tế (IndexManager tạo/xóa theo danh sách này)
+    COLLECTION: ClassVar[str] = "properties"
+    INDEXES: ClassVar[List[Dict[str, Any]]] = [
+        {"keys": [("link", 1)], "unique": True},  # chống trùng + upsert theo link
+        # tin mới nhất theo nguồn, thống kê theo nguồn; _id cuối để keyset /properties không phải SORT
+        {"keys": [("source", 1), ("crawled_at", -1), ("_id", -1)]},
+        {"keys": [("crawled_at", 1), ("_id", 1)]},  # keyset /properties lọc theo crawled_at
+        {"keys": [("updated_at", 1), ("_id", 1)]},  # export incremental theo watermark (thời điểm ghi)
+        {"keys": [("city", 1), ("type", 1), ("price", 1), ("_id", 1)]},  # lọc khu vực/loại hình, khoảng giá
+        {"keys": [("cluster_id", 1)]},  # gom tin trùng
+        {"keys": [("lsh_bands", 1)]},  # tìm ứng viên trùng (multikey)
+    ]
+
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
 
     # Core fields theo yêu cầu
     title: Optional[str] = Field(None, description="Tên bất động sản")
     address: Optional[str] = Field(None, description="Địa chỉ")
     city: Optional[str] = Field(None, description="Thành phố")
+    district: Optional[str] = Field(None, description="Quận/huyện")
+    ward: Optional[str] = Field(None, description="Phường/xã")
     seller: Optional[str] = Field(None, description="Người bán")
-    numberPhone: Optional[str] = Field(None, description="Số điện thoại")
+    numberPhone: Optional[str] = Field(None, description="Số điện thoại (E.164, vd: +84909123456)")
     price: Optional[float] = Field(None, description="Giá (chuỗi gốc)")
     area: Optional[float] = Field(None, description="Diện tích (m²)")
     unit_price: Optional[float] = Field(None, description="Đơn giá (VND/m²)")
@@ -43,6 +58,9 @@ class RealEstateProperty(BaseModel):
     type: Optional[str] = Field(None,
                                 description="Loại hình: căn hộ, nhà phố, đất nền, biệt thự, shophouse, kho xưởng (LLM)")
 
+    # Tin gần trùng (giữa các nguồn) dùng chung cluster_id
+    cluster_id: Optional[str] = Field(None, description="Cụm tin trùng lặp")
+
     # Metadata
     source: str = Field(..., description="Nguồn crawl")
     crawled_at: datetime = Field(default_factory=datetime.now, description="Thời điểm crawl")
@@ -1,6 +1,6 @@
 
 from datetime import datetime
-from typing import Optional, Annotated
+from typing import Any, ClassVar, Dict, List, Optional, Annotated
 
 from bson import ObjectId
 from pydantic import BaseModel, BeforeValidator, Field
@@ -16,9 +16,18 @@ def validate_object_id(v):
 PyObjectId = Annotated[ObjectId, BeforeValidator(validate_object_id)]
 
 class WebsiteState(BaseModel):
+    COLLECTION: ClassVar[str] = "website_states"
+    INDEXES: ClassVar[List[Dict[str, Any]]] = [
+        {"keys": [("name", 1)], "unique": True},
+    ]
+
     id: Optional[str] = Field(default=None, alias="_id")
     name: str = Field(..., description="Tên website")
     enabled: bool = Field(default=True, description="Trạng thái bật/tắt crawler")
+    schedule: Optional[str] = Field(default=None, description="Lịch crawl dạng cron 5 trường (vd: '0 2 * * *')")
+    priority: int = Field(default=0, description="Ưu tiên khi bị admission controller hoãn (lớn hơn chạy trước)")
+    max_runtime_minutes: Optional[int] = Field(default=None, description="Quá thời gian này thì dừng hợp tác")
+    jitter_seconds: Optional[int] = Field(default=None, description="Lệch ngẫu nhiên giờ bắt đầu (mặc định theo config)")
     updated_at: datetime = Field(default_factory=datetime.now, description="Thời điểm cập nhật")
 
     class Config:
@@ -0,0 +1,159 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+
+from src.crawlers.base.shards import Shard
+from src.data.database.connection import db
+from src.data.models.CrawlJobModel import CrawlJob
+
+PENDING, RUNNING, DONE, CANCELLED, FAILED = "pending", "running", "done", "cancelled", "failed"
+
+
+def utcnow() -> datetime:
+    """Mốc thời gian của hàng đợi: UTC có múi giờ, các node khác múi giờ vẫn so sánh lease đúng"""
+    return datetime.now(timezone.utc)
+
+
+class CrawlJobRepository:
+    """
+    Hàng đợi job crawl trên MongoDB, dùng chung giữa nhiều node:
+    - claim: find_one_and_update nguyên tử (job pending, hoặc running nhưng lease đã hết hạn);
+    - worker heartbeat để gia hạn lease; mất lease thì job được node khác claim lại;
+    - lỗi thì thử lại tới max_attempts;
+    - mọi mốc thời gian (created_at, lease, heartbeat...) là UTC (utcnow), không dùng giờ địa phương.
+    """
+    COLLECTION = CrawlJob.COLLECTION
+
+    @staticmethod
+    def _collection():
+        return db.get_collection(CrawlJobRepository.COLLECTION)
+
+    @staticmethod
+    def enqueue(website: str, shards: List[Shard], max_attempts: int = 3) -> Dict[str, Any]:
+        """Thêm các shard của một lần crawl site; shard đang chờ/chạy sẵn thì bỏ qua"""
+        run_id = str(ObjectId())
+        docs = [
+            CrawlJob(run_id=run_id, website=website, search_url=shard.search_url, page_start=shard.first_page,
+                     page_end=shard.last_page, max_attempts=max_attempts).model_dump(by_alias=True)
+            for shard in shards
+        ]
+        if not docs:
+            return {"run_id": run_id, "queued": 0, "skipped": 0}
+        try:
+            inserted = len(CrawlJobRepository._collection().insert_many(docs, ordered=False).inserted_ids)
+        except BulkWriteError as e:
+            # Vi phạm unique index (website, search_url, page_start) với active=True
+            inserted = e.details.get("nInserted", 0)
+        return {"run_id": run_id, "queued": inserted, "skipped": len(docs) - inserted}
+
+    @staticmethod
+    def claim(worker_id: str, lease_seconds: int) -> Optional[Dict[str, Any]]:
+        now = utcnow()
+        return CrawlJobRepository._collection().find_one_and_update(
+            {
+                "$or": [
+                    {"status": PENDING},
+                    {"status": RUNNING, "lease_expires_at": {"$lt": now}},
+                ],
+                "cancel_requested": False,
+                "$expr": {"$lt": ["$attempts", "$max_attempts"]},
+            },
+            {
+                "$set": {"status": RUNNING, "worker_id": worker_id, "started_at": now, "heartbeat_at": now,
+                         "lease_expires_at": now + timedelta(seconds=lease_seconds)},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("created_at", 1), ("_id", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    @staticmethod
+    def heartbeat(job_id, worker_id: str, lease_seconds: int) -> Optional[Dict[str, Any]]:
+        """Gia hạn lease; None nếu worker đã mất lease (job bị node khác claim hoặc đã kết thúc)"""
+        now = utcnow()
+        return CrawlJobRepository._collection().find_one_and_update(
+            {"_id": job_id, "worker_id": worker_id, "status": RUNNING},
+            {"$set": {"heartbeat_at": now, "lease_expires_at": now + timedelta(seconds=lease_seconds)}},
+            projection={"cancel_requested": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    @staticmethod
+    def complete(job_id, worker_id: str, result: Dict[str, Any], cancelled: bool = False) -> bool:
+        updated = CrawlJobRepository._collection().update_one(
+            {"_id": job_id, "worker_id": worker_id, "status": RUNNING},
+            {"$set": {"status": CANCELLED if cancelled else DONE, "result": result, "finished_at": utcnow()},
+             "$unset": {"active": "", "lease_expires_at": ""}},
+        )
+        return updated.modified_count == 1
+
+    @staticmethod
+    def fail(job: Dict[str, Any], worker_id: str, error: str) -> bool:
+        """Trả job về pending để thử lại, hoặc failed nếu đã hết số lần thử"""
+        if job["attempts"] < job["max_attempts"]:
+            update = {"$set": {"status": PENDING, "worker_id": None, "error": error},
+                      "$unset": {"lease_expires_at": ""}}
+        else:
+            update = {"$set": {"status": FAILED, "error": error, "finished_at": utcnow()},
+                      "$unset": {"active": "", "lease_expires_at": ""}}
+        updated = CrawlJobRepository._collection().update_one(
+            {"_id": job["_id"], "worker_id": worker_id, "status": RUNNING}, update)
+        return updated.modified_count == 1
+
+    @staticmethod
+    def reap_expired() -> int:
+        """Job mất lease mà không claim lại được nữa: đã bị hủy -> cancelled, hết số lần thử -> failed"""
+        now = utcnow()
+        collection = CrawlJobRepository._collection()
+        expired = {"status": RUNNING, "lease_expires_at": {"$lt": now}}
+        cancelled = collection.update_many(
+            {**expired, "cancel_requested": True},
+            {"$set": {"status": CANCELLED, "finished_at": now}, "$unset": {"active": "", "lease_expires_at": ""}},
+        )
+        exhausted = collection.update_many(
+            {**expired, "$expr": {"$gte": ["$attempts", "$max_attempts"]}},
+            {"$set": {"status": FAILED, "error": "lease expired", "finished_at": now},
+             "$unset": {"active": "", "lease_expires_at": ""}},
+        )
+        return cancelled.modified_count + exhausted.modified_count
+
+    @staticmethod
+    def cancel(websites: List[str] = None) -> Dict[str, int]:
+        """Job đang chờ -> cancelled; job đang chạy -> cancel_requested (worker dừng ở heartbeat kế tiếp)"""
+        scope = {"website": {"$in": websites}} if websites else {}
+        collection = CrawlJobRepository._collection()
+        pending = collection.update_many(
+            {**scope, "status": PENDING},
+            {"$set": {"status": CANCELLED, "finished_at": utcnow()}, "$unset": {"active": ""}},
+        )
+        running = collection.update_many({**scope, "status": RUNNING}, {"$set": {"cancel_requested": True}})
+        return {"cancelled": pending.modified_count, "stopping": running.modified_count}
+
+    @staticmethod
+    def has_active(website: str) -> bool:
+        """Site còn shard đang chờ/chạy trên hàng đợi chung"""
+        return CrawlJobRepository._collection().find_one({"website": website, "active": True}, {"_id": 1}) is not None
+
+    @staticmethod
+    def list_jobs(website: str = None, status: str = None, run_id: str = None, limit: int = 200) -> List[Dict[str, Any]]:
+        query = {}
+        if website:
+            query["website"] = website
+        if status:
+            query["status"] = status
+        if run_id:
+            query["run_id"] = run_id
+        cursor = CrawlJobRepository._collection().find(query).sort("created_at", -1).limit(limit)
+        jobs = []
+        for doc in cursor:
+            doc["_id"] = str(doc["_id"])
+            jobs.append(doc)
+        return jobs
+
+    @staticmethod
+    def count_by_status() -> Dict[str, int]:
+        pipeline = [{"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+        return {row["_id"]: row["count"] for row in CrawlJobRepository._collection().aggregate(pipeline)}
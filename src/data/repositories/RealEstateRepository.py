@@ -1,10 +1,19 @@
+import base64
 import logging
-from typing import Dict, Any, List
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from bson import ObjectId, json_util
 
 from ..database.connection import db
 from ..models.CrawlStatsModel import CrawlStats
 from ..models.RealEstateModel import RealEstateProperty
 from ...config.settings import Config
+from ...utils import timing
+
+
+# Không trả về mặc định khi search: mô tả dài và các trường nội bộ của dedup
+DEFAULT_EXCLUDED_FIELDS = ("description", "minhash", "lsh_bands")
 
 
 class RealEstateRepository:
@@ -16,31 +25,40 @@ class RealEstateRepository:
             config = Config()
             success = db.connect(config.MONGODB_URI)
             if not success:
-                print(f"❌ Failed to connect to MongoDB: {config.MONGODB_URI}")
+                logging.error(f"Failed to connect to MongoDB: {config.MONGODB_URI}")
             else:
-                print(f"✅ Connected to MongoDB: {config.MONGODB_DATABASE}")
+                logging.info(f"Connected to MongoDB: {config.MONGODB_DATABASE}")
 
     def save_property(self, property_data: RealEstateProperty) -> str:
+        source = property_data.source
+        timing.count(source, "db_round_trips", 2)  # find_one + insert/update
         try:
-            data_dict = property_data.model_dump(by_alias=True)
-            existing = db.db.properties.find_one({"link": property_data.link})
-            if existing:
-                data_dict.pop('_id', None)
-                db.db.properties.update_one(
-                    {"link": property_data.link},
-                    {"$set": data_dict}
-                )
-                logging.info(f"Updated property: {property_data.link}")
-                return str(existing["_id"])
-            else:
-                result = db.db.properties.insert_one(data_dict)
-                logging.info(f"Inserted property: {property_data.link}")
-                return str(result.inserted_id)
+            with timing.timed(source, "db_save"):
+                return self._upsert_property(property_data)
         except Exception as e:
-            logging.error(f"Error saving property: {e}")
-            print("❌ Error saving property:", property_data.link, e)
+            logging.error(f"Error saving property {property_data.link}: {e}")
             return ""
 
+    @staticmethod
+    def _upsert_property(property_data: RealEstateProperty) -> str:
+        data_dict = property_data.model_dump(by_alias=True)
+        # Thời điểm ghi thật (crawled_at gán trước hàng đợi LLM): watermark của export incremental
+        data_dict['updated_at'] = datetime.now()
+        existing = db.db.properties.find_one({"link": property_data.link})
+        if existing:
+            data_dict.pop('_id', None)
+            if data_dict.get('cluster_id') is None:
+                data_dict.pop('cluster_id', None)  # giữ cluster đã gán khi cập nhật lại tin
+            db.db.properties.update_one(
+                {"link": property_data.link},
+                {"$set": data_dict}
+            )
+            logging.debug("Updated property: %s", property_data.link)
+            return str(existing["_id"])
+        result = db.db.properties.insert_one(data_dict)
+        logging.debug("Inserted property: %s", property_data.link)
+        return str(result.inserted_id)
+
     def save_crawl_stats(self, stats: CrawlStats) -> str:
         """Lưu thống kê crawl session"""
         try:
@@ -48,9 +66,23 @@ class RealEstateRepository:
             result = db.db.crawl_stats.insert_one(data_dict)
             return str(result.inserted_id)
         except Exception as e:
-            print(f"Error saving crawl stats: {e}")
+            logging.error(f"Error saving crawl stats: {e}")
             return ""
 
+    def update_crawl_stats(self, stats: CrawlStats) -> bool:
+        """Ghi đè thống kê của phiên (vd: sau khi drain, kèm timings); chưa có thì tạo mới"""
+        try:
+            data_dict = stats.model_dump(by_alias=True)
+            stats_id = data_dict.pop("_id")
+            db.db.crawl_stats.update_one({"_id": stats_id}, {"$set": data_dict}, upsert=True)
+            return True
+        except Exception as e:
+            logging.error(f"Error updating crawl stats: {e}")
+            return False
+
+    def get_crawl_stats(self, stats_id: ObjectId) -> Optional[Dict[str, Any]]:
+        return db.db.crawl_stats.find_one({"_id": stats_id})
+
     def count_total(self) -> int:
         """Đếm tổng số properties đã crawl"""
         try:
@@ -84,9 +116,110 @@ class RealEstateRepository:
         except:
             return []
 
+    @staticmethod
+    def build_search_filter(city: str = None, prop_type: str = None, source: str = None,
+                            min_price: float = None, max_price: float = None,
+                            min_area: float = None, max_area: float = None,
+                            crawled_from: datetime = None, crawled_to: datetime = None) -> Dict[str, Any]:
+        """Điều kiện lọc properties; thứ tự field khớp các index (city, type, price) và (source, crawled_at)"""
+        query: Dict[str, Any] = {}
+        if city:
+            query["city"] = city
+        if prop_type:
+            query["type"] = prop_type
+        if source:
+            query["source"] = source
+        for field, low, high in (("price", min_price, max_price), ("area", min_area, max_area),
+                                 ("crawled_at", crawled_from, crawled_to)):
+            bounds = {}
+            if low is not None:
+                bounds["$gte"] = low
+            if high is not None:
+                bounds["$lte"] = high
+            if bounds:
+                query[field] = bounds
+        return query
+
+    @staticmethod
+    def search_sort_key(query: Dict[str, Any]) -> Optional[str]:
+        """
+        Field sort đứng trước _id, chọn theo index khớp filter để MongoDB đọc theo thứ tự index
+        thay vì SORT trong bộ nhớ:
+        - lọc city/type: index (city, type, price, _id) -> sort (price, _id)
+        - lọc source/crawled_at: index (source, crawled_at, _id) hoặc (crawled_at, _id) -> sort (crawled_at, _id)
+        - không lọc: chỉ _id
+        """
+        if "city" in query or "type" in query:
+            return "price"
+        if "source" in query or "crawled_at" in query:
+            return "crawled_at"
+        return None
+
+    @staticmethod
+    def encode_cursor(doc: Dict[str, Any], sort_key: Optional[str]) -> str:
+        """Cursor của trang tiếp theo: (field sort, giá trị, _id) của tin cuối, dạng base64 url-safe"""
+        payload = {"k": sort_key, "v": doc.get(sort_key) if sort_key else None, "id": doc["_id"]}
+        return base64.urlsafe_b64encode(json_util.dumps(payload).encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(token: str) -> Tuple[Optional[str], Any, ObjectId]:
+        """Ngược lại với encode_cursor; cursor hỏng thì ValueError"""
+        try:
+            payload = json_util.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+            sort_key, value, last_id = payload["k"], payload["v"], payload["id"]
+        except Exception as e:
+            raise ValueError(f"Invalid cursor: {token}") from e
+        if not isinstance(last_id, ObjectId):
+            raise ValueError(f"Invalid cursor: {token}")
+        return sort_key, value, last_id
+
+    @staticmethod
+    def _after_filter(sort_key: Optional[str], value: Any, last_id: ObjectId) -> Dict[str, Any]:
+        """Điều kiện (sort_key, _id) > (value, last_id) theo thứ tự sort của MongoDB"""
+        if sort_key is None:
+            return {"_id": {"$gt": last_id}}
+        if value is None:
+            # null/thiếu field đứng đầu thứ tự sort
+            return {"$or": [{sort_key: None, "_id": {"$gt": last_id}}, {sort_key: {"$ne": None}}]}
+        return {"$or": [{sort_key: {"$gt": value}}, {sort_key: value, "_id": {"$gt": last_id}}]}
+
+    def search(self, query: Dict[str, Any], after: Optional[Tuple[Any, ObjectId]] = None,
+               limit: Optional[int] = None, fields: Optional[List[str]] = None, batch_size: int = 500):
+        """
+        Cursor properties theo keyset pagination trên (search_sort_key, _id) (không dùng skip):
+        trang tiếp theo truyền after = (giá trị field sort, _id) của tin cuối trang trước (xem decode_cursor).
+        fields: chỉ lấy các field này (luôn kèm _id và field sort); mặc định bỏ DEFAULT_EXCLUDED_FIELDS.
+        """
+        sort_key = self.search_sort_key(query)
+        if after is not None:
+            query = {**query, **self._after_filter(sort_key, *after)}
+        if fields:
+            projection = {field: 1 for field in [*fields, *([sort_key] if sort_key else [])]}
+        else:
+            projection = {field: 0 for field in DEFAULT_EXCLUDED_FIELDS}
+        sort = [(sort_key, 1), ("_id", 1)] if sort_key else [("_id", 1)]
+        cursor = db.db.properties.find(query, projection, batch_size=batch_size).sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        return cursor
+
     def exists_by_link(self, link: str) -> bool:
         return db.db.properties.find_one({"link": link}) is not None
 
 
-# Global instances cho crawler sử dụng
-real_estate_repo = RealEstateRepository()
+_real_estate_repo: Optional[RealEstateRepository] = None
+
+
+def get_real_estate_repo() -> RealEstateRepository:
+    """Instance dùng chung, chỉ tạo (và kết nối MongoDB) ở lần gọi đầu thay vì lúc import module"""
+    global _real_estate_repo
+    if _real_estate_repo is None:
+        _real_estate_repo = RealEstateRepository()
+    return _real_estate_repo
+
+
+def __getattr__(name):
+    # Tương thích code cũ: `from ...RealEstateRepository import real_estate_repo`
+    if name == "real_estate_repo":
+        return get_real_estate_repo()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
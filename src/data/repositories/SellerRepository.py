@@ -0,0 +1,63 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from src.data.database.connection import db
+from src.data.models.RealEstateModel import RealEstateProperty
+
+
+class SellerRepository:
+    """
+    Chỉ mục người bán theo số điện thoại (E.164), cập nhật dần mỗi khi lưu tin.
+
+    sellers:          {_id: phone, name, listing_count, sources: {<source>: n}, first_seen, last_seen}
+    seller_listings:  {_id: link, phone, source} - tin nào đang được tính cho số nào,
+                      để lưu lại cùng một tin không bị đếm hai lần
+    """
+    COLLECTION = "sellers"
+    LISTINGS_COLLECTION = "seller_listings"
+
+    @staticmethod
+    def _source_key(source: str) -> str:
+        # Tên field MongoDB không được chứa dấu chấm
+        return f"sources.{source.replace('.', '_')}"
+
+    @staticmethod
+    def record_listing(prop: RealEstateProperty):
+        if not prop.numberPhone:
+            return
+        now = datetime.now()
+        listings = db.get_collection(SellerRepository.LISTINGS_COLLECTION)
+        sellers = db.get_collection(SellerRepository.COLLECTION)
+
+        # Trả về document cũ (trước khi cập nhật) nên biết được tin này đã được tính cho số nào
+        previous = listings.find_one_and_update(
+            {"_id": prop.link},
+            {"$set": {"phone": prop.numberPhone, "source": prop.source}},
+            upsert=True
+        )
+        update: Dict[str, Any] = {
+            "$set": {"last_seen": now},
+            "$setOnInsert": {"first_seen": now},
+        }
+        if prop.seller:
+            update["$set"]["name"] = prop.seller
+        if not previous or previous.get("phone") != prop.numberPhone:
+            update["$inc"] = {"listing_count": 1, SellerRepository._source_key(prop.source): 1}
+            if previous and previous.get("phone"):
+                # Tin đổi số điện thoại: chuyển lượt đếm sang số mới
+                sellers.update_one(
+                    {"_id": previous["phone"]},
+                    {"$inc": {"listing_count": -1, SellerRepository._source_key(previous["source"]): -1}}
+                )
+        sellers.update_one({"_id": prop.numberPhone}, update, upsert=True)
+
+    @staticmethod
+    def get_by_phone(phone: str) -> Optional[Dict[str, Any]]:
+        return db.get_collection(SellerRepository.COLLECTION).find_one({"_id": phone})
+
+    @staticmethod
+    def get_top(limit: int = 20, min_listings: int = 1) -> List[Dict[str, Any]]:
+        """Người bán có nhiều tin nhất (dùng index listing_count)"""
+        collection = db.get_collection(SellerRepository.COLLECTION)
+        cursor = collection.find({"listing_count": {"$gte": min_listings}}).sort("listing_count", -1).limit(limit)
+        return list(cursor)
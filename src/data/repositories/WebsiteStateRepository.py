@@ -1,30 +1,54 @@
+import time
 from typing import Optional, List
 from datetime import datetime
+from src.config.settings import config
 from src.data.database.connection import db
 from src.data.models.WebsiteStatesModel import WebsiteState
 
 
+class _StateCache:
+    """Cache ngắn hạn toàn bộ website_states (vài chục doc) cho API; mọi lần ghi qua repository đều xóa cache"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._states: Optional[List[WebsiteState]] = None
+        self._expires_at = 0.0
+
+    def get(self) -> Optional[List[WebsiteState]]:
+        if self._states is None or time.monotonic() >= self._expires_at:
+            return None
+        return list(self._states)
+
+    def set(self, states: List[WebsiteState]):
+        if self.ttl > 0:
+            self._states, self._expires_at = list(states), time.monotonic() + self.ttl
+
+    def invalidate(self):
+        self._states = None
+
+
+_state_cache = _StateCache(config.WEBSITE_STATE_CACHE_TTL)
+
+
+def _to_state(doc: dict) -> WebsiteState:
+    if "_id" in doc:
+        doc["_id"] = str(doc["_id"])
+    return WebsiteState(**doc)
+
+
 class WebsiteStateRepository:
     COLLECTION = "website_states"
 
     @staticmethod
     def get_all():
         collection = db.get_collection("website_states")
-        docs = collection.find({})
-        result = []
-        for doc in docs:
-            if "_id" in doc:
-                doc["_id"] = str(doc["_id"])
-            result.append(WebsiteState(**doc))
-        return result
+        return [_to_state(doc) for doc in collection.find({})]
 
     @staticmethod
     def get_by_name(name: str):
         collection = db.get_collection("website_states")
         doc = collection.find_one({"name": name})
-        if doc and "_id" in doc:
-            doc["_id"] = str(doc["_id"])
-        return WebsiteState(**doc) if doc else None
+        return _to_state(doc) if doc else None
 
     @staticmethod
     def set_state(name: str, enabled: bool):
@@ -34,14 +58,33 @@ class WebsiteStateRepository:
             {"$set": {"enabled": enabled, "updated_at": datetime.now()}},
             upsert=True
         )
+        _state_cache.invalidate()
+
+    @staticmethod
+    def set_schedule(name: str, schedule: Optional[str], priority: int = 0, max_runtime_minutes: int = None,
+                     jitter_seconds: int = None):
+        """Lịch crawl riêng của site; schedule=None để bỏ lịch"""
+        collection = db.get_collection(WebsiteStateRepository.COLLECTION)
+        collection.update_one(
+            {"name": name},
+            {"$set": {
+                "schedule": schedule,
+                "priority": priority,
+                "max_runtime_minutes": max_runtime_minutes,
+                "jitter_seconds": jitter_seconds,
+                "updated_at": datetime.now()
+            }},
+            upsert=True
+        )
+        _state_cache.invalidate()
 
     @staticmethod
     def get_enabled_websites() -> list:
         """
         Lấy danh sách tên các website đang enabled từ MongoDB
         """
-        all_states = WebsiteStateRepository.get_all()
-        return [ws.name for ws in all_states if ws.enabled]
+        collection = db.get_collection(WebsiteStateRepository.COLLECTION)
+        return [doc["name"] for doc in collection.find({"enabled": True}, {"name": 1, "_id": 0})]
 
     @staticmethod
     def init_states(websites: dict):
@@ -53,4 +96,47 @@ class WebsiteStateRepository:
                     "name": name,
                     "enabled": info.get("enabled", True),
                     "updated_at": datetime.now()
-                })
\ No newline at end of file
+                })
+        _state_cache.invalidate()
+
+
+class AsyncWebsiteStateRepository:
+    """
+    Bản async của WebsiteStateRepository (AsyncMongoClient) cho handler FastAPI: không giữ thread
+    trong lúc chờ Mongo, đọc qua cache TTL, bật/tắt nhiều site bằng một update_many
+    """
+    COLLECTION = WebsiteStateRepository.COLLECTION
+
+    @staticmethod
+    def _collection():
+        return db.get_async_collection(AsyncWebsiteStateRepository.COLLECTION)
+
+    @staticmethod
+    async def get_all() -> List[WebsiteState]:
+        states = _state_cache.get()
+        if states is None:
+            states = [_to_state(doc) async for doc in AsyncWebsiteStateRepository._collection().find({})]
+            _state_cache.set(states)
+        return states
+
+    @staticmethod
+    async def get_names(enabled: bool = None) -> List[str]:
+        states = _state_cache.get()
+        if states is not None:
+            return [ws.name for ws in states if enabled is None or ws.enabled == enabled]
+        query = {} if enabled is None else {"enabled": enabled}
+        cursor = AsyncWebsiteStateRepository._collection().find(query, {"name": 1, "_id": 0})
+        return [doc["name"] async for doc in cursor]
+
+    @staticmethod
+    async def set_enabled(names: List[str], enabled: bool) -> List[str]:
+        """Bật/tắt các site đã có trong website_states; trả về tên các site được cập nhật"""
+        collection = AsyncWebsiteStateRepository._collection()
+        existing = set(await collection.distinct("name", {"name": {"$in": names}}))
+        if existing:
+            await collection.update_many(
+                {"name": {"$in": list(existing)}},
+                {"$set": {"enabled": enabled, "updated_at": datetime.now()}}
+            )
+            _state_cache.invalidate()
+        return [name for name in names if name in existing]
\ No newline at end of file
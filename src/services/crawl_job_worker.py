@@ -0,0 +1,128 @@
+"""
+Worker của hàng đợi crawl_jobs trên MongoDB: chạy được nhiều tiến trình/nhiều node cùng lúc.
+
+Mỗi worker giữ một browser và kết nối DB suốt vòng đời, lần lượt claim từng shard
+(search URL × khoảng trang), heartbeat để giữ lease trong lúc crawl. Khi job bị hủy
+hoặc worker mất lease (node khác đã claim lại), crawler được yêu cầu dừng hợp tác.
+"""
+import asyncio
+import os
+import socket
+from typing import Any, Dict
+
+from src.config.settings import Config
+from src.crawlers.base.shards import Shard
+from src.data.database.connection import db
+from src.data.repositories.CrawlJobRepository import CrawlJobRepository
+from src.utils import metrics
+from src.utils.logging import get_logger, log_context
+
+
+class CrawlJobWorker:
+
+    def __init__(self, worker_id: str = None, config: Config = None):
+        self.config = config or Config()
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.logger = get_logger(f"crawl_job_worker.{self.worker_id}")
+
+    async def run(self, max_jobs: int = None, exit_when_idle: bool = False) -> int:
+        """Claim và chạy job tới khi đủ max_jobs (hoặc hết job nếu exit_when_idle); trả về số job đã chạy"""
+        if not db.connected and not db.connect(self.config.MONGODB_URI):
+            raise RuntimeError(f"Failed to connect to MongoDB: {self.config.MONGODB_URI}")
+
+        from crawl4ai import AsyncWebCrawler
+
+        from src.crawlers.crawlconfig.crawl_config import browserConfig, strategyConfig
+        from src.data.repositories.RealEstateRepository import RealEstateRepository
+        from src.services.llm_service import LLMService
+
+        repository = RealEstateRepository()
+        llm_service = LLMService()
+        processed = 0
+        if self.config.METRICS_PORT:
+            metrics.start_metrics_server(self.config.METRICS_PORT)
+            self.logger.info(f"Metrics exposed on :{self.config.METRICS_PORT}/metrics")
+        self.logger.info(f"Worker {self.worker_id} started")
+        async with AsyncWebCrawler(config=browserConfig(), crawler_strategy=strategyConfig()) as browser:
+            while max_jobs is None or processed < max_jobs:
+                await asyncio.to_thread(CrawlJobRepository.reap_expired)
+                job = await asyncio.to_thread(CrawlJobRepository.claim, self.worker_id, self.config.JOB_LEASE_SECONDS)
+                if job is None:
+                    if exit_when_idle:
+                        break
+                    await asyncio.sleep(self.config.JOB_POLL_SECONDS)
+                    continue
+                with log_context(job_id=str(job["_id"]), site=job["website"]):
+                    await self.run_job(job, browser, repository, llm_service)
+                processed += 1
+                await self._push_metrics()
+        self.logger.info(f"Worker {self.worker_id} stopped after {processed} jobs")
+        return processed
+
+    async def run_job(self, job: Dict[str, Any], browser, repository, llm_service):
+        from src.crawlers.base.factory import CrawlerFactory
+        from src.services.crawl_pipeline import CrawlPipeline
+
+        shard = Shard(job["search_url"], job["page_start"], job["page_end"])
+        self.logger.info(f"Claimed job {job['_id']} ({job['website']} {shard.search_url} "
+                         f"pages {shard.first_page}-{shard.last_page}, attempt {job['attempts']})")
+        try:
+            crawler = CrawlerFactory.create_crawler(job["website"], self.config.WEBSITES[job["website"]])
+        except Exception as e:
+            self.logger.error(f"Cannot create crawler for job {job['_id']}: {e}")
+            await asyncio.to_thread(CrawlJobRepository.fail, job, self.worker_id, str(e))
+            return
+        pipeline = CrawlPipeline(repository, llm_service, self.logger, self.config)
+        pipeline.attach(crawler)
+
+        lease = {"lost": False}
+        heartbeat = asyncio.create_task(self._heartbeat(job, crawler, lease))
+        try:
+            properties = await crawler.crawl_all(crawler=browser, shards=[shard])
+            await pipeline.drain()
+        except Exception as e:
+            properties = []
+            crawler.crawl_stats.status = "failed"
+            crawler.crawl_stats.error_message = str(e)
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+
+        stats = crawler.crawl_stats
+        if lease["lost"]:
+            self.logger.warning(f"Lost lease on job {job['_id']}, result discarded")
+        elif stats.status == "failed":
+            await asyncio.to_thread(CrawlJobRepository.fail, job, self.worker_id, stats.error_message or "failed")
+        else:
+            result = {
+                "properties": len(properties),
+                "pages": stats.total_pages,
+                "failed_items": stats.failed_items,
+                "duplicate_items": stats.duplicate_items,
+            }
+            await asyncio.to_thread(CrawlJobRepository.complete, job["_id"], self.worker_id, result,
+                                    stats.status == "cancelled")
+
+    async def _push_metrics(self):
+        if not self.config.METRICS_PUSHGATEWAY:
+            return
+        try:
+            await asyncio.to_thread(metrics.push, self.config.METRICS_PUSHGATEWAY, "crawl_worker", self.worker_id)
+        except Exception as e:
+            self.logger.warning(f"Cannot push metrics to {self.config.METRICS_PUSHGATEWAY}: {e}")
+
+    async def _heartbeat(self, job: Dict[str, Any], crawler, lease: Dict[str, bool]):
+        while True:
+            await asyncio.sleep(self.config.JOB_HEARTBEAT_SECONDS)
+            try:
+                state = await asyncio.to_thread(CrawlJobRepository.heartbeat, job["_id"], self.worker_id,
+                                                self.config.JOB_LEASE_SECONDS)
+            except Exception as e:
+                self.logger.warning(f"Heartbeat failed for job {job['_id']}: {e}")
+                continue
+            if state is None:
+                lease["lost"] = True
+                crawler.request_stop()
+                return
+            if state.get("cancel_requested"):
+                crawler.request_stop()
@@ -0,0 +1,60 @@
+import asyncio
+
+from src.config.settings import Config
+from src.crawlers.base.observer import (
+    DataSaveObserver, LLMProcessingObserver, LoggingObserver, MarketStatsObserver, ProgressObserver
+)
+from src.data.repositories.SellerRepository import SellerRepository
+from src.services.dedup_service import DedupService
+from src.services.market_stats_service import MarketStatsService
+from src.utils import timing
+
+
+class CrawlPipeline:
+    """
+    Chuỗi observer cho một lần crawl: log, tiến độ, enrich bằng LLM rồi lưu DB
+    (kèm dedup, chỉ mục người bán, market stats theo cấu hình).
+    """
+
+    def __init__(self, repository, llm_service, logger, config: Config = None):
+        config = config or Config()
+        self.repository = repository
+        self.crawlers = []
+        self.progress_observer = ProgressObserver()
+        dedup_service = DedupService(config) if config.DEDUP_ENABLED else None
+        self.market_stats_observer = MarketStatsObserver(MarketStatsService(config)) \
+            if config.MARKET_STATS_ENABLED else None
+        save_downstream = [self.progress_observer] + ([self.market_stats_observer] if self.market_stats_observer else [])
+        self.data_save_observer = DataSaveObserver(repository, downstream_observers=save_downstream,
+                                                   dedup_service=dedup_service, seller_repository=SellerRepository)
+        self.llm_observer = LLMProcessingObserver(llm_service,
+                                                  downstream_observers=[self.data_save_observer, self.progress_observer])
+        self.observers = [
+            LoggingObserver(logger),
+            self.progress_observer,
+            self.llm_observer,
+            self.data_save_observer
+        ]
+
+    def attach(self, crawler):
+        for observer in self.observers:
+            crawler.add_observer(observer)
+        self.crawlers.append(crawler)
+
+    async def drain(self):
+        """
+        Chờ hàng đợi enrich xử lý hết rồi ghi nốt tiến độ và market stats, sau đó ghi lại CrawlStats
+        của từng crawler kèm timings (gồm cả phần enrich/lưu DB chạy sau khi crawl xong)
+        """
+        await self.llm_observer.drain()
+        for crawler in self.crawlers:
+            self.progress_observer.flush(crawler.website_name)
+        if self.market_stats_observer:
+            self.market_stats_observer.flush()
+        for crawler in self.crawlers:
+            run = timing.finish_run(crawler.website_name)
+            if crawler.crawl_stats is None or run is None:
+                continue
+            crawler.crawl_stats.timings = run.summary()
+            await asyncio.to_thread(self.repository.update_crawl_stats, crawler.crawl_stats)
+        self.crawlers = []
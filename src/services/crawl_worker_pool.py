@@ -0,0 +1,273 @@
+"""
+Pool tiến trình crawl chạy lâu dài, thay cho việc mở một subprocess `main.py --action test` cho mỗi site.
+
+Mỗi worker import crawl4ai/pymongo, kết nối MongoDB, tạo LLMService và khởi động Chromium
+đúng một lần, sau đó nhận job (tên website) qua hàng đợi multiprocessing. Mỗi job chỉ còn
+tạo crawler + chuỗi observer, dùng lại browser đang mở.
+
+Dừng job là dừng hợp tác: pool ghi id của job cần dừng vào ô stop của worker đang chạy nó,
+crawler kết thúc ở lô trang/tin kế tiếp, dữ liệu đã lấy vẫn được enrich và lưu, CrawlStats ghi
+status "cancelled". Ô stop mang id job nên yêu cầu dừng gửi trễ cho job trước không dừng nhầm job sau.
+
+Listener đồng thời giám sát worker: tiến trình chết (OOM, Chromium segfault...) thì job nó đang
+chạy bị đánh dấu failed và worker được khởi động lại.
+"""
+import asyncio
+import itertools
+import multiprocessing as mp
+import queue
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from src.config.settings import Config
+from src.utils import metrics
+from src.utils.logging import get_logger, log_context
+
+logger = get_logger("crawl_worker_pool")
+
+# Trạng thái job
+QUEUED, RUNNING, COMPLETED, CANCELLED, FAILED = "queued", "running", "completed", "cancelled", "failed"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+MAX_FINISHED_JOBS = 200  # số job đã xong giữ lại để xem trạng thái
+SUPERVISE_INTERVAL = 1.0  # giây, chu kỳ kiểm tra worker còn sống khi không có message
+
+
+class _JobStopSignal:
+    """stop_event của crawler cho một job: chỉ bật khi ô stop của worker mang đúng id job này"""
+
+    def __init__(self, stop_job, job_id: int):
+        self.stop_job = stop_job
+        self.job_id = job_id
+
+    def is_set(self) -> bool:
+        return self.stop_job.value == self.job_id
+
+
+def _worker_main(index: int, jobs, results, stop_job):
+    from src.utils.logging import setup_logging
+
+    setup_logging()
+    try:
+        asyncio.run(_worker_loop(index, jobs, results, stop_job))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _worker_loop(index: int, jobs, results, stop_job):
+    # Phần khởi động tốn thời gian, chỉ làm một lần cho mỗi worker
+    from crawl4ai import AsyncWebCrawler
+
+    from src.crawlers.base.factory import CrawlerFactory
+    from src.crawlers.crawlconfig.crawl_config import browserConfig, strategyConfig
+    from src.data.repositories.RealEstateRepository import RealEstateRepository
+    from src.services.crawl_pipeline import CrawlPipeline
+    from src.services.llm_service import LLMService
+
+    config = Config()
+    repository = RealEstateRepository()
+    llm_service = LLMService()
+    worker_logger = get_logger(f"crawl_worker.{index}")
+
+    async with AsyncWebCrawler(config=browserConfig(), crawler_strategy=strategyConfig()) as browser:
+        results.put(("ready", None, index, None))
+        while True:
+            job = await asyncio.to_thread(jobs.get)
+            if job is None:
+                break
+            job_id, website_name = job["id"], job["website"]
+            results.put(("started", job_id, index, None))
+            with log_context(job_id=job_id, site=website_name):
+                try:
+                    crawler = CrawlerFactory.create_crawler(website_name, config.WEBSITES[website_name])
+                    crawler.stop_event = _JobStopSignal(stop_job, job_id)
+                    pipeline = CrawlPipeline(repository, llm_service, worker_logger, config)
+                    pipeline.attach(crawler)
+                    properties = await crawler.crawl_all(crawler=browser)
+                    await pipeline.drain()
+                    stats = crawler.crawl_stats
+                    results.put(("finished", job_id, index, {
+                        "status": stats.status if stats else COMPLETED,
+                        "properties": len(properties),
+                        "error": stats.error_message if stats else None,
+                    }))
+                except Exception as e:
+                    worker_logger.error(f"Job {job_id} ({website_name}) failed: {e}")
+                    results.put(("finished", job_id, index, {"status": FAILED, "properties": 0, "error": str(e)}))
+
+
+class CrawlWorkerPool:
+    """N tiến trình crawl giữ sẵn browser và kết nối DB, nhận job qua hàng đợi cục bộ"""
+
+    def __init__(self, num_workers: int = None, config: Config = None):
+        self.config = config or Config()
+        self.num_workers = num_workers or self.config.CRAWL_WORKERS
+        # spawn: Playwright/Chromium và client MongoDB không an toàn khi fork
+        self._ctx = mp.get_context("spawn")
+        self._jobs_queue = None
+        self._results_queue = None
+        self._processes: List[mp.Process] = []
+        self._stop_jobs = []  # mỗi worker một mp.Value: id job được yêu cầu dừng
+        self._closing = False
+        self._listener: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.jobs: Dict[int, Dict[str, Any]] = {}
+        self.ready_workers = set()
+
+    # ---------------------------------------------------------------- lifecycle
+
+    def start(self):
+        if self._processes:
+            return
+        self._closing = False
+        self._jobs_queue = self._ctx.Queue()
+        self._results_queue = self._ctx.Queue()
+        for index in range(self.num_workers):
+            self._stop_jobs.append(self._ctx.Value("q", 0))
+            self._processes.append(self._spawn(index))
+        self._listener = threading.Thread(target=self._listen, name="crawl-pool-listener", daemon=True)
+        self._listener.start()
+        logger.info(f"Started crawl worker pool with {self.num_workers} workers")
+
+    def _spawn(self, index: int) -> mp.Process:
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(index, self._jobs_queue, self._results_queue, self._stop_jobs[index]),
+            name=f"crawl-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        return process
+
+    def shutdown(self, timeout: float = 30):
+        """Dừng hợp tác mọi job đang chạy, chờ worker thoát; quá timeout thì terminate"""
+        if not self._processes:
+            return
+        self._closing = True  # supervisor không khởi động lại worker đang thoát
+        self.cancel()
+        for _ in self._processes:
+            self._jobs_queue.put(None)
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                logger.warning(f"{process.name} did not stop in {timeout}s, terminating")
+                process.terminate()
+            metrics.mark_process_dead(process.pid)
+        self._results_queue.put(None)
+        self._listener.join(timeout=5)
+        self._processes, self._stop_jobs = [], []
+        self.ready_workers.clear()
+
+    # --------------------------------------------------------------------- jobs
+
+    def submit(self, website_name: str) -> int:
+        """Đưa một site vào hàng đợi; site đang chờ/chạy thì trả về job hiện có (không crawl trùng)"""
+        if website_name not in self.config.WEBSITES:
+            raise ValueError(f"Unknown website: {website_name}")
+        with self._lock:
+            for job in self.jobs.values():
+                if job["website"] == website_name and job["status"] in ACTIVE_STATUSES:
+                    return job["id"]
+            job_id = next(self._ids)
+            self.jobs[job_id] = {
+                "id": job_id, "website": website_name, "status": QUEUED, "worker": None,
+                "submitted_at": datetime.now(), "started_at": None, "finished_at": None,
+                "properties": None, "error": None, "cancel_requested": False,
+            }
+        self._jobs_queue.put({"id": job_id, "website": website_name})
+        return job_id
+
+    def cancel(self, websites: List[str] = None) -> List[str]:
+        """Yêu cầu dừng các job đang chờ/chạy (của các site cho trước, mặc định tất cả)"""
+        cancelled = []
+        with self._lock:
+            for job in self.jobs.values():
+                if job["status"] not in ACTIVE_STATUSES or (websites and job["website"] not in websites):
+                    continue
+                job["cancel_requested"] = True
+                if job["status"] == RUNNING:
+                    self._request_stop(job)
+                cancelled.append(job["website"])
+        return cancelled
+
+    def cancel_job(self, job_id: int) -> bool:
+        """Dừng một job cụ thể (vd: quá max_runtime); False nếu job đã kết thúc"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job["status"] not in ACTIVE_STATUSES:
+                return False
+            job["cancel_requested"] = True
+            if job["status"] == RUNNING:
+                self._request_stop(job)
+            return True
+
+    def _request_stop(self, job: Dict[str, Any]):
+        # Trạng thái RUNNING có thể đã cũ (message "finished" chưa xử lý): worker chỉ dừng nếu
+        # đang chạy đúng job có id này, job kế tiếp trên cùng worker không bị ảnh hưởng
+        self._stop_jobs[job["worker"]].value = job["id"]
+
+    def active_job(self, website_name: str) -> Optional[int]:
+        with self._lock:
+            for job in self.jobs.values():
+                if job["website"] == website_name and job["status"] in ACTIVE_STATUSES:
+                    return job["id"]
+        return None
+
+    def active_count(self) -> int:
+        with self._lock:
+            return sum(1 for job in self.jobs.values() if job["status"] in ACTIVE_STATUSES)
+
+    def status(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(job) for job in self.jobs.values()]
+
+    def _listen(self):
+        while True:
+            try:
+                message = self._results_queue.get(timeout=SUPERVISE_INTERVAL)
+            except queue.Empty:
+                self._supervise()
+                continue
+            if message is None:
+                break
+            self._handle(message)
+            self._supervise()
+
+    def _supervise(self):
+        """Worker đã chết: job nó đang chạy -> failed (site không bị coi là bận mãi), khởi động lại worker"""
+        if self._closing:
+            return
+        for index, process in enumerate(self._processes):
+            if process.exitcode is None:
+                continue
+            error = f"Crawl worker {index} exited unexpectedly (exit code {process.exitcode})"
+            logger.error(error)
+            metrics.mark_process_dead(process.pid)
+            with self._lock:
+                self.ready_workers.discard(index)
+                for job in self.jobs.values():
+                    if job["status"] == RUNNING and job["worker"] == index:
+                        job.update(status=FAILED, finished_at=datetime.now(), properties=0, error=error)
+            self._processes[index] = self._spawn(index)
+
+    def _handle(self, message):
+        kind, job_id, worker, payload = message
+        with self._lock:
+            if kind == "ready":
+                self.ready_workers.add(worker)
+                return
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            if kind == "started":
+                job.update(status=RUNNING, worker=worker, started_at=datetime.now())
+                if job["cancel_requested"]:
+                    # Bị hủy khi còn trong hàng đợi: dừng ngay ở lần kiểm tra đầu tiên
+                    self._request_stop(job)
+            elif kind == "finished":
+                job.update(status=payload["status"], finished_at=datetime.now(),
+                           properties=payload["properties"], error=payload["error"])
+                finished = [key for key, value in self.jobs.items() if value["status"] not in ACTIVE_STATUSES]
+                for key in finished[:-MAX_FINISHED_JOBS]:
+                    del self.jobs[key]
@@ -0,0 +1,211 @@
+"""
+Phát hiện tin đăng gần trùng nhau giữa các nguồn bằng MinHash + LSH.
+
+Mỗi property có chữ ký MinHash tính trên shingle 3 từ của title + description
+(đã làm sạch, bỏ dấu, chữ thường), kèm token bucket giá/diện tích. Chữ ký được chia
+thành các band; hai tin chung ít nhất một band là ứng viên, sau đó mới kiểm tra
+độ tương đồng ước lượng và độ lệch giá/diện tích. Các tin trùng nhau dùng chung cluster_id.
+
+Chữ ký (minhash) và khóa band (lsh_bands, có index multikey) được lưu ngay trong
+document nên chế độ incremental chỉ cần một truy vấn $in cho mỗi tin mới.
+"""
+import math
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+from pymongo import UpdateOne
+
+from src.config.settings import Config
+from src.data.database.connection import db
+from src.utils.logging import get_logger
+from src.utils.text_processing import clean_text
+
+_PRIME = (1 << 32) + 15  # số nguyên tố > 2^32: a * x + b vẫn nằm gọn trong uint64
+_SEED = 20240601
+_SHINGLE_SIZE = 3
+_BUCKET_BASE = math.log(1.1)  # bucket giá/diện tích rộng ~10%
+_MAX_CANDIDATES = 50
+
+PROJECTION = {"title": 1, "description": 1, "price": 1, "area": 1, "link": 1}
+
+
+def _bucket(value: Any) -> Optional[int]:
+    if not isinstance(value, (int, float)) or isinstance(value, bool) or value <= 0:
+        return None
+    return int(round(math.log(value) / _BUCKET_BASE))
+
+
+class DedupService:
+    """MinHash/LSH near-duplicate detector, chạy incremental hoặc backfill toàn collection"""
+
+    def __init__(self, config: Config = None, num_perm: int = None, bands: int = None, threshold: float = None):
+        self.config = config or Config()
+        self.num_perm = num_perm or self.config.DEDUP_NUM_PERM
+        self.bands = bands or self.config.DEDUP_BANDS
+        self.threshold = threshold or self.config.DEDUP_THRESHOLD
+        if self.num_perm % self.bands:
+            raise ValueError(f"DEDUP_NUM_PERM ({self.num_perm}) must be divisible by DEDUP_BANDS ({self.bands})")
+        self.rows = self.num_perm // self.bands
+        rng = np.random.default_rng(_SEED)
+        self._a = rng.integers(1, _PRIME, size=(self.num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=(self.num_perm, 1), dtype=np.uint64)
+        self.logger = get_logger("dedup_service")
+
+    # ------------------------------------------------------------- signatures
+
+    @staticmethod
+    def shingles(doc: Dict[str, Any]) -> List[str]:
+        text = clean_text(f"{doc.get('title') or ''} {doc.get('description') or ''}", fold_accents=True)
+        words = (text or "").lower().split()
+        if not words:
+            return []
+        if len(words) < _SHINGLE_SIZE:
+            grams = [" ".join(words)]
+        else:
+            grams = [" ".join(words[i:i + _SHINGLE_SIZE]) for i in range(len(words) - _SHINGLE_SIZE + 1)]
+        for field in ("price", "area"):
+            bucket = _bucket(doc.get(field))
+            if bucket is not None:
+                grams.append(f"#{field}:{bucket}")
+        return grams
+
+    def signature(self, doc: Dict[str, Any]) -> Optional[np.ndarray]:
+        """Chữ ký MinHash (uint32, num_perm phần tử); None nếu không có text"""
+        grams = self.shingles(doc)
+        if not grams:
+            return None
+        hashes = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in set(grams)), dtype=np.uint64)
+        values = (self._a * hashes[np.newaxis, :] + self._b) % _PRIME
+        return (values.min(axis=1) & 0xFFFFFFFF).astype(np.uint32)
+
+    def band_keys(self, signature: np.ndarray) -> List[int]:
+        """Mỗi band -> một khóa int64: (chỉ số band << 32) | crc32(các giá trị trong band)"""
+        rows = signature.reshape(self.bands, self.rows)
+        return [(band << 32) | zlib.crc32(rows[band].tobytes()) for band in range(self.bands)]
+
+    @staticmethod
+    def similarity(left: np.ndarray, right: np.ndarray) -> float:
+        return float(np.mean(left == right))
+
+    def is_duplicate(self, left_sig: np.ndarray, left: Dict[str, Any], right_sig: np.ndarray,
+                     right: Dict[str, Any]) -> bool:
+        if self.similarity(left_sig, right_sig) < self.threshold:
+            return False
+        # Cùng mô tả nhưng giá/diện tích lệch xa (vd: 2 căn khác tầng) thì không coi là trùng
+        for field in ("price", "area"):
+            a, b = _bucket(left.get(field)), _bucket(right.get(field))
+            if a is not None and b is not None and abs(a - b) > 1:
+                return False
+        return True
+
+    # ------------------------------------------------------------ incremental
+
+    def assign(self, prop, property_id: str) -> Optional[str]:
+        """Gán cluster_id cho một property vừa lưu (property_id là _id trong DB)"""
+        doc = prop.model_dump() if hasattr(prop, "model_dump") else dict(prop)
+        signature = self.signature(doc)
+        if signature is None:
+            return None
+        bands = self.band_keys(signature)
+        collection = db.db.properties
+
+        cluster_ids = []
+        candidates = collection.find(
+            {"lsh_bands": {"$in": bands}, "link": {"$ne": doc.get("link")}},
+            {"minhash": 1, "cluster_id": 1, "price": 1, "area": 1}
+        ).limit(_MAX_CANDIDATES)
+        for candidate in candidates:
+            if not candidate.get("minhash"):
+                continue
+            candidate_sig = np.frombuffer(candidate["minhash"], dtype=np.uint32)
+            if len(candidate_sig) == self.num_perm and self.is_duplicate(signature, doc, candidate_sig, candidate):
+                cluster_ids.append(candidate.get("cluster_id") or str(candidate["_id"]))
+
+        cluster_id = min(cluster_ids) if cluster_ids else property_id
+        merged = sorted(set(cluster_ids) - {cluster_id})
+        now = datetime.now()  # cluster_id đổi thì export incremental phải lấy lại bản ghi
+        if merged:
+            # Tin mới nối hai cluster cũ: gộp về cluster nhỏ nhất
+            collection.update_many({"cluster_id": {"$in": merged}},
+                                   {"$set": {"cluster_id": cluster_id, "updated_at": now}})
+        collection.update_one(
+            {"link": doc.get("link")},
+            {"$set": {"cluster_id": cluster_id, "minhash": signature.tobytes(), "lsh_bands": bands,
+                      "updated_at": now}}
+        )
+        if hasattr(prop, "cluster_id"):
+            prop.cluster_id = cluster_id
+        return cluster_id
+
+    # --------------------------------------------------------------- backfill
+
+    def backfill(self, batch_size: int = None, dry_run: bool = False) -> Dict[str, int]:
+        """
+        Tính lại chữ ký và cluster cho toàn bộ collection trong thời gian tuyến tính:
+        mỗi tin chỉ so với phần tử đầu tiên của mỗi bucket LSH nó rơi vào (union-find).
+        """
+        if not db.connected and not db.connect(self.config.MONGODB_URI):
+            raise RuntimeError(f"Failed to connect to MongoDB: {self.config.MONGODB_URI}")
+        batch_size = batch_size or self.config.NORMALIZE_BATCH_SIZE
+        collection = db.db.properties
+
+        ids, docs, signatures, band_lists = [], [], [], []
+        buckets: Dict[int, int] = {}
+        parent: List[int] = []
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for doc in self._iter_docs(collection, batch_size):
+            signature = self.signature(doc)
+            if signature is None:
+                continue
+            index = len(ids)
+            ids.append(doc["_id"])
+            docs.append({"price": doc.get("price"), "area": doc.get("area")})
+            signatures.append(signature)
+            parent.append(index)
+            bands = self.band_keys(signature)
+            band_lists.append(bands)
+            for key in bands:
+                other = buckets.setdefault(key, index)
+                if other != index and self.is_duplicate(signature, docs[index], signatures[other], docs[other]):
+                    root_a, root_b = find(index), find(other)
+                    if root_a != root_b:
+                        parent[max(root_a, root_b)] = min(root_a, root_b)
+
+        roots = [find(i) for i in range(len(ids))]
+        totals = {"scanned": len(ids), "clusters": len(set(roots)),
+                  "duplicates": len(ids) - len(set(roots)), "modified": 0}
+
+        if not dry_run:
+            now = datetime.now()
+            updates = []
+            for index, root in enumerate(roots):
+                updates.append(UpdateOne({"_id": ids[index]}, {"$set": {
+                    "cluster_id": str(ids[root]),
+                    "minhash": signatures[index].tobytes(),
+                    "lsh_bands": band_lists[index],
+                    "updated_at": now,
+                }}))
+                if len(updates) >= batch_size:
+                    totals["modified"] += collection.bulk_write(updates, ordered=False).modified_count
+                    updates = []
+            if updates:
+                totals["modified"] += collection.bulk_write(updates, ordered=False).modified_count
+
+        self.logger.info(f"Dedup backfill finished: {totals}")
+        return totals
+
+    @staticmethod
+    def _iter_docs(collection, batch_size: int) -> Iterator[Dict[str, Any]]:
+        cursor = collection.find({}, PROJECTION, batch_size=batch_size).sort("_id", 1)
+        try:
+            yield from cursor
+        finally:
+            cursor.close()
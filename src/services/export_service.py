@@ -0,0 +1,241 @@
+"""
+Xuất collection properties cho phía phân tích, bộ nhớ giới hạn theo batch của cursor.
+
+- parquet: mỗi batch được chia theo source/tháng crawl và ghi thêm một row group vào file
+  <output_dir>/source=<source>/month=<YYYY-MM>/part-<run>.parquet (nén zstd, cần pyarrow);
+- csv: một file gzip, nén dần từng batch, cũng dùng để stream qua API.
+
+Chế độ incremental chỉ lấy các tin có updated_at (thời điểm ghi vào DB, không phải crawled_at
+vốn gán trước hàng đợi LLM) sau watermark của lần xuất trước (collection export_watermarks),
+và chưa tới now - EXPORT_WATERMARK_LAG để tin đang ghi dở ở tiến trình khác không bị nhảy qua;
+watermark chỉ được ghi khi lần xuất chạy hết.
+"""
+import csv
+import io
+import os
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.config.settings import Config
+from src.data.database.connection import db
+from src.utils.logging import get_logger
+
+WATERMARK_COLLECTION = "export_watermarks"
+
+# Cột xuất ra và kiểu dữ liệu (dữ liệu cũ có thể lệch kiểu nên luôn ép lại)
+COLUMNS = {
+    "id": "string",
+    "title": "string",
+    "address": "string",
+    "city": "string",
+    "district": "string",
+    "ward": "string",
+    "seller": "string",
+    "numberPhone": "string",
+    "price": "float",
+    "area": "float",
+    "unit_price": "float",
+    "link": "string",
+    "postedDate": "timestamp",
+    "bedroom": "int",
+    "bathroom": "int",
+    "legal": "string",
+    "frontage": "float",
+    "description": "string",
+    "amenityLocation": "string",
+    "type": "string",
+    "cluster_id": "string",
+    "source": "string",
+    "crawled_at": "timestamp",
+    "updated_at": "timestamp",
+}
+PROJECTION = {column: 1 for column in COLUMNS if column != "id"}
+
+
+def _coerce(value: Any, kind: str) -> Any:
+    if value is None:
+        return None
+    try:
+        if kind == "string":
+            return str(value)
+        if kind == "float":
+            return float(value) if not isinstance(value, bool) else None
+        if kind == "int":
+            return int(value) if not isinstance(value, bool) else None
+        if kind == "timestamp":
+            return value if isinstance(value, datetime) else None
+    except (TypeError, ValueError):
+        return None
+    return value
+
+
+def to_row(doc: Dict[str, Any]) -> Dict[str, Any]:
+    doc = {**doc, "id": doc.get("_id")}
+    return {column: _coerce(doc.get(column), kind) for column, kind in COLUMNS.items()}
+
+
+def _arrow_schema():
+    import pyarrow as pa
+
+    # source đã nằm trong đường dẫn phân vùng (source=...), không lặp lại trong file
+    types = {"string": pa.string(), "float": pa.float64(), "int": pa.int64(), "timestamp": pa.timestamp("ms")}
+    return pa.schema([(column, types[kind]) for column, kind in COLUMNS.items() if column != "source"])
+
+
+class ExportService:
+    """Stream properties ra Parquet (phân vùng source/tháng) hoặc CSV gzip"""
+
+    def __init__(self, config: Config = None, batch_size: int = None):
+        self.config = config or Config()
+        self.batch_size = batch_size or self.config.EXPORT_BATCH_SIZE
+        self.logger = get_logger("export_service")
+
+    # -------------------------------------------------------------- watermark
+
+    @staticmethod
+    def get_watermark(name: str) -> Optional[datetime]:
+        doc = db.get_collection(WATERMARK_COLLECTION).find_one({"_id": name})
+        # Watermark cũ lưu theo crawled_at: vẫn dùng được, cùng lắm xuất lại vài tin
+        return (doc.get("updated_at") or doc.get("crawled_at")) if doc else None
+
+    @staticmethod
+    def set_watermark(name: str, updated_at: datetime):
+        db.get_collection(WATERMARK_COLLECTION).update_one(
+            {"_id": name},
+            {"$set": {"updated_at": updated_at, "exported_at": datetime.now()}, "$unset": {"crawled_at": ""}},
+            upsert=True
+        )
+
+    # ----------------------------------------------------------------- source
+
+    def _until(self) -> datetime:
+        """Mốc trên của lần xuất incremental: tin ghi gần hơn EXPORT_WATERMARK_LAG để lần sau"""
+        return datetime.now() - timedelta(seconds=self.config.EXPORT_WATERMARK_LAG)
+
+    def _connect(self):
+        if not db.connected and not db.connect(self.config.MONGODB_URI):
+            raise RuntimeError(f"Failed to connect to MongoDB: {self.config.MONGODB_URI}")
+
+    def iter_batches(self, since: Optional[datetime] = None,
+                     until: Optional[datetime] = None) -> Iterator[List[Dict[str, Any]]]:
+        """Các lô row đã ép kiểu, tăng dần theo updated_at (index updated_at) để watermark là max đã xuất"""
+        bounds = {}
+        if since:
+            bounds["$gt"] = since
+        if until:
+            bounds["$lte"] = until
+        query = {"updated_at": bounds} if bounds else {}
+        cursor = db.db.properties.find(query, PROJECTION, batch_size=self.batch_size).sort(
+            [("updated_at", 1), ("_id", 1)])
+        batch = []
+        try:
+            for doc in cursor:
+                batch.append(to_row(doc))
+                if len(batch) >= self.batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        finally:
+            cursor.close()
+
+    # ---------------------------------------------------------------- writers
+
+    def iter_csv_gzip(self, batches: Iterator[List[Dict[str, Any]]]) -> Iterator[bytes]:
+        """CSV nén gzip theo từng batch (dùng cho file và cho StreamingResponse)"""
+        compressor = zlib.compressobj(wbits=31)  # 31 = định dạng gzip
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=list(COLUMNS))
+        writer.writeheader()
+        for batch in batches:
+            writer.writerows(batch)
+            chunk = compressor.compress(buffer.getvalue().encode("utf-8"))
+            buffer.seek(0)
+            buffer.truncate()
+            if chunk:
+                yield chunk
+        yield compressor.compress(buffer.getvalue().encode("utf-8")) + compressor.flush()
+
+    def write_parquet(self, batches: Iterator[List[Dict[str, Any]]], output_dir: str, run_id: str) -> List[str]:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+
+        schema = _arrow_schema()
+        writers: Dict[tuple, Any] = {}
+        try:
+            for batch in batches:
+                partitions: Dict[tuple, List[Dict[str, Any]]] = {}
+                for row in batch:
+                    month = row["crawled_at"].strftime("%Y-%m") if row["crawled_at"] else "unknown"
+                    partitions.setdefault((row["source"] or "unknown", month), []).append(row)
+                for key, rows in partitions.items():
+                    writer = writers.get(key)
+                    if writer is None:
+                        source, month = key
+                        directory = os.path.join(output_dir, f"source={source}", f"month={month}")
+                        os.makedirs(directory, exist_ok=True)
+                        writer = pq.ParquetWriter(os.path.join(directory, f"part-{run_id}.parquet"),
+                                                  schema, compression="zstd")
+                        writers[key] = writer
+                    writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+        finally:
+            for writer in writers.values():
+                writer.close()
+        return sorted(writer.where for writer in writers.values())
+
+    # -------------------------------------------------------------------- run
+
+    def export(self, fmt: str = "parquet", output_dir: str = None, incremental: bool = False) -> Dict[str, Any]:
+        """Xuất ra output_dir; trả về số dòng, các file đã ghi và watermark mới"""
+        if fmt not in ("parquet", "csv"):
+            raise ValueError(f"Unsupported export format: {fmt}")
+        self._connect()
+        output_dir = output_dir or self.config.EXPORT_DIR
+        os.makedirs(output_dir, exist_ok=True)
+        run_id = datetime.now().strftime("%Y%m%d-%H%M%S")
+        since = self.get_watermark(fmt) if incremental else None
+        tracker = _WatermarkTracker(self.iter_batches(since, self._until() if incremental else None))
+
+        if fmt == "parquet":
+            files = self.write_parquet(tracker, output_dir, run_id)
+        else:
+            path = os.path.join(output_dir, f"properties-{run_id}.csv.gz")
+            with open(path, "wb") as f:
+                for chunk in self.iter_csv_gzip(tracker):
+                    f.write(chunk)
+            files = [path]
+
+        if incremental and tracker.latest:
+            self.set_watermark(fmt, tracker.latest)
+        result = {"rows": tracker.rows, "files": files, "since": since, "watermark": tracker.latest or since}
+        self.logger.info(f"Export finished: {tracker.rows} rows, {len(files)} files")
+        return result
+
+    def stream_csv(self, incremental: bool = False, name: str = "csv") -> Iterator[bytes]:
+        """CSV gzip cho HTTP; watermark chỉ cập nhật khi client đã nhận hết dữ liệu"""
+        self._connect()
+        since = self.get_watermark(name) if incremental else None
+        tracker = _WatermarkTracker(self.iter_batches(since, self._until() if incremental else None))
+        yield from self.iter_csv_gzip(tracker)
+        if incremental and tracker.latest:
+            self.set_watermark(name, tracker.latest)
+
+
+class _WatermarkTracker:
+    """Bọc iterator các batch, ghi nhận số dòng và updated_at lớn nhất đã đi qua"""
+
+    def __init__(self, batches: Iterator[List[Dict[str, Any]]]):
+        self.batches = batches
+        self.rows = 0
+        self.latest: Optional[datetime] = None
+
+    def __iter__(self):
+        for batch in self.batches:
+            self.rows += len(batch)
+            if batch[-1]["updated_at"]:
+                self.latest = batch[-1]["updated_at"]
+            yield batch
@@ -0,0 +1,348 @@
+import asyncio
+import json
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Dict, Any, AsyncIterator, Optional
+
+import aiohttp
+
+from src.config.settings import Config
+from src.services.local_enrichment import LOCAL_FIELDS, classify_batch
+from src.utils.json_stream import JsonArrayStreamParser
+from src.utils.logging import get_logger
+
+# Kiểu dữ liệu JSON của từng trường trong response (mặc định là string)
+FIELD_TYPES = {
+    "price": "number",
+    "area": "number",
+    "unit_price": "number",
+    "frontage": "number",
+    "bedroom": "integer",
+    "bathroom": "integer",
+}
+
+
+def build_response_schema(fields: List[str]) -> Dict[str, Any]:
+    """JSON Schema cho response: array các object gồm id và các trường còn thiếu"""
+    properties = {"id": {"type": "string"}}
+    for field in fields:
+        properties[field] = {"type": [FIELD_TYPES.get(field, "string"), "null"]}
+    return {
+        "type": "array",
+        "items": {
+            "type": "object",
+            "properties": properties,
+            "required": ["id"]
+        }
+    }
+
+
+def build_gemini_schema(fields: List[str]) -> Dict[str, Any]:
+    """Schema theo định dạng OpenAPI mà Gemini responseSchema yêu cầu"""
+    properties = {"id": {"type": "STRING"}}
+    for field in fields:
+        properties[field] = {"type": FIELD_TYPES.get(field, "string").upper(), "nullable": True}
+    return {
+        "type": "ARRAY",
+        "items": {
+            "type": "OBJECT",
+            "properties": properties,
+            "required": ["id"]
+        }
+    }
+
+
+class EnrichmentBackend(ABC):
+    """
+    Interface cho backend enrich dữ liệu.
+    enrich() nhận các dict mô tả property (có 'id') và danh sách trường cần điền,
+    trả về dần từng object {"id": ..., <field>: ...} theo thứ tự hoàn thành.
+    """
+
+    name = "base"
+
+    def __init__(self, config: Config = None):
+        self.config = config or Config()
+        self.logger = get_logger(f"llm_backend.{self.name}")
+
+    @abstractmethod
+    def enrich(self, descriptions: List[Dict[str, Any]], fields: List[str]) -> AsyncIterator[Dict[str, Any]]:
+        pass
+
+    async def close(self):
+        return None
+
+
+class RemoteLLMBackend(EnrichmentBackend):
+    """Backend gọi LLM qua HTTP, dùng prompt chung và JSON output có schema"""
+
+    async def enrich(self, descriptions: List[Dict[str, Any]], fields: List[str],
+                     usage: Optional[Dict[str, int]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """usage (nếu có) được cộng prompt_tokens/completion_tokens mà API báo về"""
+        prompt = self.create_prompt(descriptions, fields)
+        try:
+            async for item in self.stream(prompt, fields, usage):
+                yield item
+        except Exception as e:
+            self.logger.error(f"Error calling LLM API: {e}")
+
+    @abstractmethod
+    def stream(self, prompt: str, fields: List[str],
+               usage: Optional[Dict[str, int]] = None) -> AsyncIterator[Dict[str, Any]]:
+        pass
+
+    @staticmethod
+    def _add_usage(usage: Optional[Dict[str, int]], prompt_tokens: Optional[int], completion_tokens: Optional[int]):
+        if usage is None:
+            return
+        usage["prompt_tokens"] = usage.get("prompt_tokens", 0) + (prompt_tokens or 0)
+        usage["completion_tokens"] = usage.get("completion_tokens", 0) + (completion_tokens or 0)
+
+    @staticmethod
+    def create_prompt(descriptions: List[Dict[str, Any]], missing_fields: List[str]) -> str:
+        prompt = f"""
+    Bạn là chuyên gia bất động sản.
+    Dưới đây là thông tin về một số bất động sản, mỗi bất động sản có 16 trường. Một số trường đã có giá trị, một số trường còn thiếu (giá trị là null hoặc rỗng).
+
+    Hãy phân tích mô tả và điền giá trị cho các trường còn thiếu (giá trị là null hoặc rỗng) trong danh sách sau:
+    {missing_fields}
+
+    **YÊU CẦU:**
+    - Chỉ trả về kết quả dưới dạng JSON array.
+    - Mỗi object trong array BẮT BUỘC phải có trường "id" (giá trị giống như đầu vào).
+    - Mỗi object chỉ gồm các trường còn thiếu (và id), không thêm text khác, không trả về các trường đã có giá trị, không tự ý thêm trường không có trong mục description, không tự suy diễn, không bịa hoặc dự đoán.
+    - Nếu không thể xác định giá trị cho trường nào, hãy để giá trị là null( không trả về chuỗi rỗng)
+
+    Quy tắc trích xuất legal:
+    - Chỉ điền giá trị nếu thông tin pháp lý (sổ đỏ, sổ hồng, hợp đồng mua bán, giấy tờ tay, ...) thực sự xuất hiện trong mô tả.
+    - Không tự suy diễn, không dự đoán, không bịa thông tin pháp lý nếu mô tả không đề cập.
+    - Nếu không có thông tin pháp lý trong mô tả, hãy để giá trị là null (không trả về chuỗi rỗng).
+    - Chỉ lấy đúng cụm từ xuất hiện trong mô tả, không dịch, không rút gọn.
+
+    Quy tắc trích xuất amenityLocation:
+    - Lấy những thông tin về tiện ích xung quanh bất động sản như trường học, bệnh viện, trung tâm thương mại, công viên, giao thông công cộng, khu dân cư đông đúc, những lợi ích khi ở đây ...
+    - Trích xuất nguyên văn cụm từ xuất hiện trong mô tả.
+    - Không tự suy diễn, không dự đoán, không bịa thông tin pháp lý nếu mô tả không đề cập.
+
+    Quy tắc phân loại type:
+    - căn hộ: chung cư, apartment, căn hộ cao cấp
+    - nhà phố: nhà riêng, nhà phố, townhouse
+    - đất nền: đất thổ cư, đất nền, lô đất
+    - biệt thự: villa, biệt thự, nhà vườn lớn
+    - shophouse: nhà mặt phố kinh doanh, shophouse
+    - kho xưởng: nhà xưởng, kho bãi, đất công nghiệp
+
+    Dữ liệu đầu vào:
+    """
+        for i, desc in enumerate(descriptions, 1):
+            prompt += f"""
+    {i}. ID: {desc['id']}
+    """
+            for field, value in desc.items():
+                if field != 'id':
+                    prompt += f"{field}: {value}\n"
+        return prompt
+
+    @staticmethod
+    async def _iter_sse_data(response: aiohttp.ClientResponse) -> AsyncIterator[str]:
+        """Đọc từng dòng 'data: ...' của response Server-Sent Events"""
+        async for raw_line in response.content:
+            line = raw_line.decode('utf-8', errors='ignore').strip()
+            if line.startswith('data:'):
+                yield line[5:].strip()
+
+
+class OpenAICompatibleBackend(RemoteLLMBackend):
+    """Call OpenAI-compatible API (Ollama, LM Studio, etc.)"""
+
+    name = "openai"
+
+    async def stream(self, prompt: str, fields: List[str],
+                     usage: Optional[Dict[str, int]] = None) -> AsyncIterator[Dict[str, Any]]:
+        url = f"{self.config.LLM_API_BASE_URL}/chat/completions"
+        headers = {"Content-Type": "application/json"}
+        if self.config.LLM_API_TOKEN:
+            headers["Authorization"] = f"Bearer {self.config.LLM_API_TOKEN}"
+        # response_format json_schema yêu cầu root là object nên bọc array trong "items"
+        payload = {
+            "model": self.config.LLM_MODEL,
+            "messages": [
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.1,
+            "max_tokens": 2048,
+            "stream": True,
+            "stream_options": {"include_usage": True},  # chunk cuối mang usage (token)
+            "response_format": {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "properties",
+                    "schema": {
+                        "type": "object",
+                        "properties": {"items": build_response_schema(fields)},
+                        "required": ["items"]
+                    }
+                }
+            }
+        }
+        parser = JsonArrayStreamParser()
+        timeout = aiohttp.ClientTimeout(total=120)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with session.post(url, headers=headers, json=payload) as response:
+                if response.status != 200:
+                    self.logger.error(f"OpenAI API error: {response.status}")
+                    if response.status == 429:
+                        await asyncio.sleep(10)
+                    return
+
+                if 'text/event-stream' not in response.headers.get('Content-Type', ''):
+                    # Server không hỗ trợ stream: parse một lần
+                    result = await response.json(content_type=None)
+                    result_usage = result.get("usage") or {}
+                    self._add_usage(usage, result_usage.get("prompt_tokens"), result_usage.get("completion_tokens"))
+                    content = result["choices"][0]["message"]["content"] or ""
+                    for item in parser.feed(content):
+                        yield item
+                    return
+
+                async for data in self._iter_sse_data(response):
+                    if data == '[DONE]':
+                        break
+                    try:
+                        chunk = json.loads(data)
+                    except ValueError:
+                        continue
+                    if chunk.get("usage"):
+                        self._add_usage(usage, chunk["usage"].get("prompt_tokens"),
+                                        chunk["usage"].get("completion_tokens"))
+                    if parser.finished:
+                        continue  # JSON đã đủ, chỉ đọc tiếp tới chunk usage cuối
+                    try:
+                        delta = chunk["choices"][0].get("delta", {}).get("content") or ""
+                    except (KeyError, IndexError, TypeError):
+                        continue
+                    for item in parser.feed(delta):
+                        yield item
+
+
+class GeminiBackend(RemoteLLMBackend):
+    """Call Gemini streamGenerateContent với responseSchema"""
+
+    name = "gemini"
+
+    def __init__(self, config: Config = None):
+        super().__init__(config)
+        self.semaphore = asyncio.Semaphore(1)  # Limit concurrent Gemini requests
+
+    def _stream_url(self) -> str:
+        url = self.config.LLM_API_BASE_URL
+        if ':generateContent' in url:
+            url = url.replace(':generateContent', ':streamGenerateContent')
+        separator = "&" if "?" in url else "?"
+        return f"{url}{separator}alt=sse"
+
+    async def stream(self, prompt: str, fields: List[str],
+                     usage: Optional[Dict[str, int]] = None) -> AsyncIterator[Dict[str, Any]]:
+        headers = {
+            "Content-Type": "application/json",
+            "x-goog-api-key": self.config.LLM_API_TOKEN
+        }
+        payload = {
+            "contents": [{
+                "parts": [{
+                    "text": prompt
+                }]
+            }],
+            "generationConfig": {
+                "temperature": 0.1,
+                "maxOutputTokens": 8192,
+                "responseMimeType": "application/json",
+                "responseSchema": build_gemini_schema(fields)
+            }
+        }
+        parser = JsonArrayStreamParser()
+        timeout = aiohttp.ClientTimeout(total=120)
+        async with self.semaphore:
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with session.post(self._stream_url(), headers=headers, json=payload) as response:
+                    if response.status != 200:
+                        self.logger.error(f"Gemini API error: {response.status}")
+                        return
+                    # usageMetadata của mỗi chunk là số cộng dồn, lấy của chunk cuối cùng đọc được
+                    usage_metadata = {}
+                    try:
+                        async for data in self._iter_sse_data(response):
+                            try:
+                                chunk = json.loads(data)
+                                usage_metadata = chunk.get("usageMetadata") or usage_metadata
+                                parts = chunk["candidates"][0]["content"]["parts"]
+                            except (ValueError, KeyError, IndexError):
+                                continue
+                            text = "".join(part.get("text", "") for part in parts)
+                            for item in parser.feed(text):
+                                yield item
+                            if parser.finished:
+                                break
+                    finally:
+                        self._add_usage(usage, usage_metadata.get("promptTokenCount"),
+                                        usage_metadata.get("candidatesTokenCount"))
+
+
+class LocalEnrichmentBackend(EnrichmentBackend):
+    """
+    Backend chạy trong tiến trình: bộ phân loại từ khóa cho type, legal, amenityLocation.
+    Batch được chia nhỏ và chạy song song trên CPU qua thread/process pool.
+    Mỗi object trả về có thêm '_confidence' {field: 0..1} để quyết định có cần gọi LLM hay không.
+    """
+
+    name = "local"
+
+    def __init__(self, config: Config = None, executor: Optional[Executor] = None):
+        super().__init__(config)
+        self.workers = max(1, self.config.LLM_LOCAL_WORKERS)
+        self._executor = executor
+        self._own_executor = executor is None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.config.LLM_LOCAL_EXECUTOR == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="local-enrich")
+        return self._executor
+
+    async def enrich(self, descriptions: List[Dict[str, Any]], fields: List[str]) -> AsyncIterator[Dict[str, Any]]:
+        local_fields = [field for field in fields if field in LOCAL_FIELDS]
+        if not descriptions or not local_fields:
+            return
+        loop = asyncio.get_running_loop()
+        chunk_size = max(1, -(-len(descriptions) // self.workers))
+        futures = [
+            loop.run_in_executor(self.executor, classify_batch, descriptions[i:i + chunk_size], local_fields)
+            for i in range(0, len(descriptions), chunk_size)
+        ]
+        for future in asyncio.as_completed(futures):
+            try:
+                results = await future
+            except Exception as e:
+                self.logger.error(f"Local enrichment failed: {e}")
+                continue
+            for item in results:
+                yield item
+
+    async def close(self):
+        if self._executor is not None and self._own_executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+def create_remote_backend(config: Config) -> Optional[RemoteLLMBackend]:
+    """Chọn remote backend theo LLM_PROVIDER"""
+    provider = config.LLM_PROVIDER.lower()
+    if 'gemini' in provider:
+        return GeminiBackend(config)
+    if 'openai' in provider:
+        return OpenAICompatibleBackend(config)
+    get_logger("llm_backend").warning(f"Unsupported LLM provider: {config.LLM_PROVIDER}")
+    return None
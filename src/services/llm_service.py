@@ -1,15 +1,46 @@
 import asyncio
-import json
-import re
-import traceback
-from typing import List, Dict, Any, Optional
-import aiohttp
-import requests
+import time
+from collections import Counter
+from typing import List, Dict, Any, Optional, Callable
 from src.config.settings import Config
 from src.data.models.RealEstateModel import RealEstateProperty
+from src.services.llm_backends import LocalEnrichmentBackend, create_remote_backend
+from src.utils import metrics, timing
 from src.utils.logging import get_logger
 from src.utils.text_processing import clean_text, extract_area, extract_bathrooms, extract_city_from_address, \
-    extract_frontage, extract_price, extract_rooms, parse_date
+    extract_frontage, extract_price, extract_rooms, normalize_property_type, parse_date, PROPERTY_TYPES
+
+# Các trường gửi cho LLM
+FIELDS = [
+    "title", "address", "price", "area", "unit_price", "seller", "bedroom", "bathroom",
+    "frontage", "legal", "postedDate", "description", "link", "city", "amenityLocation", "type"
+]
+
+
+def _format_posted_date(value: Any) -> Optional[str]:
+    date_obj = parse_date(value)
+    return date_obj.strftime('%d/%m/%Y') if date_obj else None
+
+
+# Trường -> hàm chuẩn hóa giá trị backend trả về (None = bỏ qua, không ghi đè)
+FIELD_PARSERS: Dict[str, Callable[[Any], Any]] = {
+    'title': clean_text,
+    'address': clean_text,
+    'area': lambda value: extract_area(str(value)),
+    'price': lambda value: extract_price(str(value)),
+    'unit_price': lambda value: extract_price(str(value)),
+    'seller': clean_text,
+    'bedroom': lambda value: extract_rooms(str(value)),
+    'bathroom': lambda value: extract_bathrooms(str(value)),
+    'frontage': lambda value: extract_frontage(str(value)),
+    'legal': clean_text,
+    'postedDate': _format_posted_date,
+    'description': clean_text,
+    'link': clean_text,
+    'city': extract_city_from_address,
+    'amenityLocation': clean_text,
+    'type': lambda value: normalize_property_type(value, default="căn hộ"),
+}
 
 
 class LLMService:
@@ -23,16 +54,23 @@ class LLMService:
         self.batch_size = self.config.LLM_BATCH_SIZE
         self.enabled = self.config.LLM_ENABLED
 
-        self.gemini_semaphore = asyncio.Semaphore(1)  # Limit concurrent Gemini requests
+        # Backend: remote (chỉ LLM), local (chỉ bộ phân loại cục bộ),
+        # hybrid (cục bộ trước, item độ tin cậy thấp mới gửi LLM)
+        self.mode = self.config.LLM_BACKEND
+        self.min_confidence = self.config.LLM_LOCAL_MIN_CONFIDENCE
+        self.local_backend = LocalEnrichmentBackend(self.config) if self.mode in ('local', 'hybrid') else None
+        self.remote_backend = create_remote_backend(self.config) if self.mode in ('remote', 'hybrid') else None
         # Property types mapping
-        self.property_types = [
-            "căn hộ", "nhà phố", "đất nền",
-            "biệt thự", "shophouse", "kho xưởng"
-        ]
-
-    async def process_batch(self, properties: List[RealEstateProperty]) -> List[RealEstateProperty]:
-        """Process a batch of properties with LLM"""
-        print(">>> CALL LLM process_batch")
+        self.property_types = list(PROPERTY_TYPES)
+
+    async def process_batch(self, properties: List[RealEstateProperty],
+                            on_enriched: Optional[Callable[[RealEstateProperty], Any]] = None
+                            ) -> List[RealEstateProperty]:
+        """
+        Process a batch of properties with LLM.
+        on_enriched (nếu có) được gọi ngay khi từng property được cập nhật từ response stream.
+        """
+        self.logger.debug("LLM process_batch: {} properties", len(properties))
         if not self.enabled:
             self.logger.warning("LLM processing disabled or no API token")
             return properties
@@ -43,7 +81,7 @@ class LLMService:
 
             for i in range(0, len(properties), self.batch_size):
                 batch = properties[i:i + self.batch_size]
-                processed_batch = await self._process_single_batch(batch)
+                processed_batch = await self._process_single_batch(batch, on_enriched)
                 processed_properties.extend(processed_batch)
 
                 # Small delay between batches
@@ -55,41 +93,78 @@ class LLMService:
             self.logger.error(f"Error processing batch with LLM: {e}")
             return properties
 
-    async def _process_single_batch(self, properties: List[RealEstateProperty]) -> List[RealEstateProperty]:
+    async def _process_single_batch(self, properties: List[RealEstateProperty],
+                                    on_enriched: Optional[Callable[[RealEstateProperty], Any]] = None
+                                    ) -> List[RealEstateProperty]:
         """Process a single batch of properties"""
-        FIELDS = [
-            "title", "address", "price", "area", "unit_price", "seller", "bedroom", "bathroom",
-            "frontage", "legal", "postedDate", "description", "link", "city", "amenityLocation", "type"
-        ]
+        started = time.perf_counter()
+        usage = {}
+        status = "error"
         try:
             # Prepare batch request
             batch_descriptions = []
-            missing_fields_set = set()
+            missing_by_id = {}  # id -> các trường còn thiếu của riêng tin đó
             for prop in properties:
                 desc = {field: getattr(prop, field, None) for field in FIELDS}
                 desc['id'] = str(prop.id)
                 batch_descriptions.append(desc)
-                for field in FIELDS:
-                    if not desc.get(field):
-                        missing_fields_set.add(field)
-            missing_fields = list(missing_fields_set)
-            prompt = self._create_batch_prompt(batch_descriptions, missing_fields)
-
-            # Call LLM API
-
-            llm_response = await self._call_llm_api(prompt)
-
-            if llm_response is not None:
-                print(json.dumps(llm_response, ensure_ascii=False, indent=2))
-            else:
-                print("LLM RESPONSE IS NONE")
-
-            if isinstance(llm_response, list) and len(llm_response) > 0:
-                #     print(">>> [DEBUG] llm_response type:", type(llm_response), "length:", len(llm_response) if isinstance(llm_response, list) else "N/A")
-                #     print(">>> [DEBUG] CALLING _update_properties_from_response")
-                #     # Chỉ gọi update nếu là list và có phần tử
-                self._update_properties_from_response(properties, llm_response)
-
+                missing_by_id[desc['id']] = {field for field in FIELDS if not desc.get(field)}
+            # Schema/prompt dùng hợp các trường thiếu của cả batch, nhưng mỗi tin chỉ nhận trường nó thiếu
+            missing_fields = [field for field in FIELDS if any(field in missing for missing in missing_by_id.values())]
+
+            prop_map = {str(prop.id): prop for prop in properties}
+            desc_by_id = {desc['id']: desc for desc in batch_descriptions}
+            enriched_count = 0
+
+            def only_missing(item):
+                missing = missing_by_id.get(str(item.get('id')), ())
+                return {field: value for field, value in item.items() if field == 'id' or field in missing}
+
+            async def apply(prop, item):
+                self._update_properties_from_response([prop], [only_missing(item)])
+                if on_enriched:
+                    result = on_enriched(prop)
+                    if asyncio.iscoroutine(result):
+                        await result
+
+            # Backend cục bộ: chỉ giữ các trường đủ độ tin cậy
+            if self.local_backend:
+                async for item in self.local_backend.enrich(batch_descriptions, missing_fields):
+                    confidence = item.pop('_confidence', {})
+                    prop = prop_map.get(str(item.get('id')))
+                    if prop is None:
+                        continue
+                    confident = {field: value for field, value in item.items()
+                                 if field == 'id' or confidence.get(field, 0) >= self.min_confidence}
+                    if len(confident) == len(item):
+                        prop_map.pop(str(item['id']))
+                        await apply(prop, confident)
+                        enriched_count += 1
+                    else:
+                        self._update_properties_from_response([prop], [only_missing(confident)])
+                        # Trường cục bộ đã điền chắc chắn: không còn thiếu, remote không được ghi đè
+                        missing = missing_by_id[str(item['id'])]
+                        for field in list(missing):
+                            if field in confident and getattr(prop, field, None):
+                                missing.discard(field)
+                                desc_by_id[str(item['id'])][field] = getattr(prop, field)
+
+            # Remote LLM cho các property còn lại, cập nhật ngay khi object tương ứng về tới
+            if self.remote_backend and prop_map:
+                remote_descriptions = [desc for desc in batch_descriptions if desc['id'] in prop_map]
+                remote_fields = [field for field in missing_fields
+                                 if any(field in missing_by_id[desc['id']] for desc in remote_descriptions)]
+                async for item in self.remote_backend.enrich(remote_descriptions, remote_fields, usage):
+                    if not isinstance(item, dict) or 'id' not in item:
+                        continue
+                    prop = prop_map.pop(str(item['id']), None)
+                    if prop is None:
+                        continue
+                    await apply(prop, item)
+                    enriched_count += 1
+
+            self.logger.debug("LLM enriched {}/{} properties", enriched_count, len(properties))
+            status = "ok"
             return properties
 
         except Exception as e:
@@ -97,161 +172,23 @@ class LLMService:
             self.logger.error(f"Error processing single batch: {e}")
             return properties
 
-    def _create_batch_prompt(self, descriptions: List[Dict[str, Any]], missing_fields: List[str]) -> str:
-        property_types_str = ", ".join(self.property_types)
-        prompt = f"""
-    Bạn là chuyên gia bất động sản.
-    Dưới đây là thông tin về một số bất động sản, mỗi bất động sản có 16 trường. Một số trường đã có giá trị, một số trường còn thiếu (giá trị là null hoặc rỗng).
-
-    Hãy phân tích mô tả và điền giá trị cho các trường còn thiếu (giá trị là null hoặc rỗng) trong danh sách sau:
-    {missing_fields}
-
-    **YÊU CẦU:**
-    - Chỉ trả về kết quả dưới dạng JSON array.
-    - Mỗi object trong array BẮT BUỘC phải có trường "id" (giá trị giống như đầu vào).
-    - Mỗi object chỉ gồm các trường còn thiếu (và id), không thêm text khác, không trả về các trường đã có giá trị, không tự ý thêm trường không có trong mục description, không tự suy diễn, không bịa hoặc dự đoán.
-    - Nếu không thể xác định giá trị cho trường nào, hãy để giá trị là null( không trả về chuỗi rỗng)
-
-    Quy tắc trích xuất legal:
-    - Chỉ điền giá trị nếu thông tin pháp lý (sổ đỏ, sổ hồng, hợp đồng mua bán, giấy tờ tay, ...) thực sự xuất hiện trong mô tả.
-    - Không tự suy diễn, không dự đoán, không bịa thông tin pháp lý nếu mô tả không đề cập.
-    - Nếu không có thông tin pháp lý trong mô tả, hãy để giá trị là null (không trả về chuỗi rỗng).
-    - Chỉ lấy đúng cụm từ xuất hiện trong mô tả, không dịch, không rút gọn.
-
-    Quy tắc trích xuất amenityLocation:
-    - Lấy những thông tin về tiện ích xung quanh bất động sản như trường học, bệnh viện, trung tâm thương mại, công viên, giao thông công cộng, khu dân cư đông đúc, những lợi ích khi ở đây ...
-    - Trích xuất nguyên văn cụm từ xuất hiện trong mô tả.
-    - Không tự suy diễn, không dự đoán, không bịa thông tin pháp lý nếu mô tả không đề cập.
-
-    Quy tắc phân loại type:
-    - căn hộ: chung cư, apartment, căn hộ cao cấp
-    - nhà phố: nhà riêng, nhà phố, townhouse  
-    - đất nền: đất thổ cư, đất nền, lô đất
-    - biệt thự: villa, biệt thự, nhà vườn lớn
-    - shophouse: nhà mặt phố kinh doanh, shophouse
-    - kho xưởng: nhà xưởng, kho bãi, đất công nghiệp
-
-    Dữ liệu đầu vào:
-    """
-        for i, desc in enumerate(descriptions, 1):
-            prompt += f"""
-    {i}. ID: {desc['id']}
-    """
-            for field, value in desc.items():
-                if field != 'id':
-                    prompt += f"{field}: {value}\n"
-        return prompt
-
-    async def _call_llm_api(self, prompt: str) -> Optional[Dict[str, Any]]:
-
-        try:
-            if 'gemini' in self.provider.lower():
-
-                return await self._call_gemini_api(prompt)
-            elif 'openai' in self.provider.lower():
-
-                return await self._call_openai_api(prompt)
-            else:
-                self.logger.warning(f"Unsupported LLM provider: {self.provider}")
-                return None
-        except Exception as e:
-            self.logger.error(f"Error calling LLM API: {e}")
-            return None
-
-    async def _call_openai_api(self, prompt: str) -> Optional[Dict[str, Any]]:
-        """Call OpenAI-compatible API (Ollama, LM Studio, etc.)"""
-        try:
-            url = f"{self.config.LLM_API_BASE_URL}/chat/completions"
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.api_token}" if self.api_token else None
-            }
-            payload = {
-                "model": "mistral",  # hoặc "phi", "llama3", ... tùy model bạn chạy
-                "messages": [
-                    {"role": "user", "content": prompt}
-                ],
-                "temperature": 0.1,
-                "max_tokens": 2048
-            }
-            # Xóa header Authorization nếu không có token
-            if not self.api_token:
-                headers.pop("Authorization")
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, headers=headers, json=payload) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        # Ollama/LM Studio trả về kết quả trong choices[0].message.content
-                        content = result["choices"][0]["message"]["content"]
-                        try:
-                            start = content.find('[')
-                            end = content.rfind(']') + 1
-                            if start >= 0 and end > start:
-                                json_str = content[start:end]
-                                return json.loads(json_str)
-                        except Exception as e:
-                            self.logger.error(f"Error parsing JSON from LLM response: {e}")
-                    else:
-                        self.logger.error(f"OpenAI API error: {response.status}")
-                        if response.status == 429:
-                            await asyncio.sleep(10)
-        except Exception as e:
-            self.logger.error(f"Error calling OpenAI API: {e}")
-        return None
-
-    async def _call_gemini_api(self, prompt: str) -> Optional[Dict[str, Any]]:
-        url = self.config.LLM_API_BASE_URL
-        headers = {
-            "Content-Type": "application/json",
-            "x-goog-api-key": self.api_token
-        }
-        payload = {
-            "contents": [{
-                "parts": [{
-                    "text": prompt
-                }]
-            }],
-            "generationConfig": {
-                "temperature": 0.1,
-                "maxOutputTokens": 8192
-            }
-        }
-
-        def sync_post():
-            try:
-                resp = requests.post(url, headers=headers, json=payload, timeout=30)
-
-                if resp.status_code == 200:
-                    result = resp.json()
-                    if 'candidates' in result and result['candidates']:
-                        text = result['candidates'][0]['content']['parts'][0]['text']
-
-                        # Loại bỏ markdown code block nếu có
-                        if text.strip().startswith("```"):
-                            text = re.sub(r"^```[a-zA-Z]*\n?", "", text.strip())
-                            text = re.sub(r"\n?```$", "", text.strip())
-
-                        # Tìm JSON array trong text
-                        matches = re.findall(r"\[.*\]", text, re.DOTALL)
-
-                        if matches:
-                            json_str = matches[0]
-                            try:
-
-                                return json.loads(json_str)
-                            except Exception as e:
-                                print("Exception parsing JSON from Gemini response:", e)
-
-                        else:
-                            print("NO JSON ARRAY FOUND IN TEXT:", text)
-            except Exception as e:
-                print("Exception in requests.post:", e)
-                traceback.print_exc()
-            return None
-
-        result = sync_post()
-        print(">>> [DEBUG] sync_post result:", result)
-        return result
+        finally:
+            self._record_timing(properties, time.perf_counter() - started, usage, status)
+
+    def _record_timing(self, properties: List[RealEstateProperty], elapsed: float, usage: Dict[str, int],
+                       status: str):
+        """Ghi latency/token của batch vào CrawlStats.timings của từng source (token chia theo số tin)"""
+        metrics.inc(metrics.LLM_CALLS, self.mode, status)
+        for key in ("prompt_tokens", "completion_tokens"):
+            if usage.get(key):
+                metrics.inc(metrics.LLM_TOKENS, self.mode, key.split("_")[0], amount=usage[key])
+        sources = Counter(prop.source for prop in properties)
+        for source, items in sources.items():
+            timing.observe(source, "llm_batch", elapsed)
+            timing.count(source, "llm_items", items)
+            for key in ("prompt_tokens", "completion_tokens"):
+                if usage.get(key):
+                    timing.count(source, f"llm_{key}", round(usage[key] * items / len(properties)))
 
     def _update_properties_from_response(self, properties: List[RealEstateProperty],
                                          llm_response: List[Dict[str, Any]]):
@@ -261,61 +198,40 @@ class LLMService:
                 prop_id = str(prop.id)
                 if prop_id in response_map:
                     llm_data = response_map[prop_id]
-                    # Luôn cập nhật các trường enrich từ LLM (không kiểm tra and not prop.xxx)
-                    if 'title' in llm_data:
-                        prop.title = clean_text(llm_data['title'])
-                    if 'address' in llm_data:
-                        prop.address = clean_text(llm_data['address'])
-                    if 'area' in llm_data:
-                        prop.area = extract_area(str(llm_data['area']))
-                    if 'price' in llm_data:
-                        prop.price = extract_price(str(llm_data['price']))
-                    if 'unit_price' in llm_data:
-                        prop.unit_price = extract_price(str(llm_data['unit_price']))
+                    for field, parse in FIELD_PARSERS.items():
+                        value = llm_data.get(field)
+                        if value is None or value == "":
+                            continue
+                        try:
+                            parsed = parse(value)
+                        except Exception:
+                            parsed = None
+                        # null hoặc giá trị không parse được: giữ nguyên dữ liệu đang có
+                        if parsed is None or parsed == "":
+                            continue
+                        setattr(prop, field, parsed)
                     if (not prop.unit_price or prop.unit_price == 0) and prop.price and prop.area:
                         try:
                             prop.unit_price = round(prop.price / prop.area, 2)
                         except Exception:
                             prop.unit_price = None
-                    if 'seller' in llm_data:
-                        prop.seller = clean_text(llm_data['seller'])
-                    if 'bedroom' in llm_data:
-                        prop.bedroom = extract_rooms(str(llm_data['bedroom']))
-                    if 'bathroom' in llm_data:
-                        prop.bathroom = extract_bathrooms(str(llm_data['bathroom']))
-                    if 'frontage' in llm_data:
-                        prop.frontage = extract_frontage(str(llm_data['frontage']))
-                    if 'legal' in llm_data:
-                        prop.legal = clean_text(llm_data['legal'])
-                    if 'postedDate' in llm_data:
-                        date_obj = parse_date(llm_data['postedDate'])
-                        prop.postedDate = date_obj.strftime('%d/%m/%Y') if date_obj else None
-                    if 'description' in llm_data:
-                        prop.description = clean_text(llm_data['description'])
-                    if 'link' in llm_data:
-                        prop.link = clean_text(llm_data['link'])
-                    if 'city' in llm_data:
-                        prop.city = extract_city_from_address(llm_data['city']) if llm_data['city'] else None
-                    if 'amenityLocation' in llm_data:
-                        prop.amenityLocation = clean_text(llm_data['amenityLocation'])
-                    if 'type' in llm_data:
-                        prop_type = llm_data['type']
-                        if prop_type:
-                            prop_type = prop_type.lower()
-                            if prop_type in self.property_types:
-                                prop.type = prop_type
-                            else:
-                                for allowed_type in self.property_types:
-                                    if allowed_type in prop_type or prop_type in allowed_type:
-                                        prop.type = allowed_type
-                                        break
-                                else:
-                                    prop.type = "căn hộ"
-                        else:
-                            prop.type = None
         except Exception as e:
             self.logger.error(f"Error updating properties from LLM response: {e}")
 
 
-# Global instance
-llm_service = LLMService()
\ No newline at end of file
+_llm_service: Optional[LLMService] = None
+
+
+def get_llm_service() -> LLMService:
+    """Instance dùng chung, tạo backend ở lần gọi đầu thay vì lúc import module"""
+    global _llm_service
+    if _llm_service is None:
+        _llm_service = LLMService()
+    return _llm_service
+
+
+def __getattr__(name):
+    # Tương thích code cũ: `from src.services.llm_service import llm_service`
+    if name == "llm_service":
+        return get_llm_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,121 @@
+"""
+Bộ enrich cục bộ (không cần mạng) cho các trường type, legal, amenityLocation.
+
+Các hàm ở đây là hàm thuần ở mức module để chạy được trong ProcessPoolExecutor.
+Mỗi kết quả kèm độ tin cậy '_confidence' để LLMService chỉ gửi các item
+không chắc chắn lên remote LLM.
+"""
+import re
+from typing import List, Dict, Any, Optional, Tuple
+
+from src.utils.text_processing import strip_accents
+
+LOCAL_FIELDS = ("type", "legal", "amenityLocation")
+
+# Từ khóa (không dấu, chữ thường) cho từng loại hình
+TYPE_KEYWORDS = {
+    "căn hộ": ["can ho", "chung cu", "apartment", "penthouse", "duplex", "studio", "officetel", "condotel"],
+    "nhà phố": ["nha rieng", "nha pho", "townhouse", "nha hem", "nha ngo", "nha mat ngo", "nha kiet"],
+    "đất nền": ["dat nen", "dat tho cu", "lo dat", "ban dat", "dat o", "tho cu"],
+    "biệt thự": ["biet thu", "villa", "nha vuon"],
+    "shophouse": ["shophouse", "nha mat pho", "mat tien kinh doanh", "nha pho thuong mai"],
+    "kho xưởng": ["nha xuong", "kho bai", "kho xuong", "dat cong nghiep", "cho thue kho", "xuong san xuat"],
+}
+
+_TYPE_PATTERNS = [
+    (prop_type, re.compile(r'\b(?:' + '|'.join(re.escape(k) for k in keywords) + r')\b'))
+    for prop_type, keywords in TYPE_KEYWORDS.items()
+]
+
+# Cụm từ pháp lý, lấy nguyên văn từ mô tả
+_LEGAL_PATTERN = re.compile(
+    r'(?:sổ\s*(?:đỏ|hồng|riêng|chung)(?:\s*(?:riêng|chính\s*chủ|hoàn\s*công|vĩnh\s*viễn|sẵn|lâu\s*dài))*'
+    r'|\bshr\b|\bsđcc\b'
+    r'|hợp\s*đồng\s*mua\s*bán|\bhđmb\b|giấy\s*tờ\s*tay|vi\s*bằng'
+    r'|giấy\s*chứng\s*nhận\s*quyền\s*sử\s*dụng\s*đất|đã\s*có\s*sổ|đang\s*chờ\s*sổ)',
+    re.IGNORECASE
+)
+
+_AMENITY_STRONG = re.compile(
+    r'\b(?:truong (?:hoc|mam non|tieu hoc|thcs|thpt|cap [1-3]|quoc te)|benh vien|(?:gan|canh|sat|ke) cho|'
+    r'cho dan sinh|sieu thi|trung tam thuong mai|tttm|cong vien|vincom|aeon|lotte|coopmart|'
+    r'metro|ben xe|san bay|nha ga|ga (?:tau|metro)|mam non|dai hoc|uy ban|ubnd|khu vui choi|be boi|gym|tien ich)\b'
+)
+# "cho", "ga", "bv" sau khi bỏ dấu trùng với từ thường (cho thuê, ga ra, bảo vệ): chỉ nhận "chợ" có dấu
+# hoặc chợ/ga/BV + tên riêng viết hoa (chợ Bến Thành, ga Sài Gòn, BV Chợ Rẫy)
+_AMENITY_MARKET = re.compile(r'\bchợ\b', re.IGNORECASE)
+_AMENITY_NAMED = re.compile(r'\b(?:chợ|ga|bv)\s+(\w)', re.IGNORECASE)
+_AMENITY_WEAK = re.compile(r'\b(?:gan|cach|ngay|sat|lien ke|ket noi)\b')
+_CLAUSE_SPLIT = re.compile(r'[.;!\n•]+|\s-\s')
+_MAX_AMENITY_LENGTH = 500
+
+
+def classify_type(title: Optional[str], description: Optional[str]) -> Tuple[Optional[str], float]:
+    """Phân loại type theo số lần xuất hiện từ khóa (title nặng gấp 3 lần description)"""
+    title_key = strip_accents(title or "").lower()
+    desc_key = strip_accents(description or "").lower()
+    scores = {}
+    for prop_type, pattern in _TYPE_PATTERNS:
+        score = 3 * len(pattern.findall(title_key)) + len(pattern.findall(desc_key))
+        if score:
+            scores[prop_type] = score
+    if not scores:
+        return None, 0.0
+    best_type = max(scores, key=scores.get)
+    best = scores[best_type]
+    confidence = best / sum(scores.values())
+    if best < 3:
+        confidence *= 0.6
+    return best_type, round(confidence, 3)
+
+
+def extract_legal(description: Optional[str]) -> Tuple[Optional[str], float]:
+    """Lấy cụm pháp lý đầu tiên xuất hiện; không có thì trả None (vẫn khá chắc chắn)"""
+    if not description:
+        return None, 0.5
+    match = _LEGAL_PATTERN.search(description)
+    if match:
+        return match.group(0).strip(), 0.9
+    return None, 0.7
+
+
+def extract_amenities(description: Optional[str]) -> Tuple[Optional[str], float]:
+    """Lấy nguyên văn các mệnh đề có nhắc tới tiện ích xung quanh"""
+    if not description:
+        return None, 0.5
+    strong, weak = [], []
+    for clause in _CLAUSE_SPLIT.split(description):
+        clause = clause.strip(" ,-+*")
+        if not clause:
+            continue
+        key = strip_accents(clause).lower()
+        if _AMENITY_STRONG.search(key) or _AMENITY_MARKET.search(clause) \
+                or any(match.group(1).isupper() for match in _AMENITY_NAMED.finditer(clause)):
+            strong.append(clause)
+        elif _AMENITY_WEAK.search(key):
+            weak.append(clause)
+    if strong:
+        return "; ".join(strong)[:_MAX_AMENITY_LENGTH], 0.8
+    if weak:
+        return "; ".join(weak)[:_MAX_AMENITY_LENGTH], 0.4
+    return None, 0.7
+
+
+def classify_one(description: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    # fields là hợp của cả batch: chỉ điền trường mà tin này còn thiếu
+    fields = [field for field in fields if not description.get(field)]
+    result = {"id": description["id"]}
+    confidence = {}
+    if "type" in fields:
+        result["type"], confidence["type"] = classify_type(description.get("title"), description.get("description"))
+    if "legal" in fields:
+        result["legal"], confidence["legal"] = extract_legal(description.get("description"))
+    if "amenityLocation" in fields:
+        result["amenityLocation"], confidence["amenityLocation"] = extract_amenities(description.get("description"))
+    result["_confidence"] = confidence
+    return result
+
+
+def classify_batch(descriptions: List[Dict[str, Any]], fields: List[str]) -> List[Dict[str, Any]]:
+    """Entry point cho thread/process pool"""
+    return [classify_one(description, fields) for description in descriptions]
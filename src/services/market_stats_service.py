@@ -0,0 +1,125 @@
+"""
+Thống kê thị trường được tính sẵn vào collection market_stats.
+
+Mỗi document là một nhóm city × type × source × ngày (theo crawled_at) gồm số tin,
+đơn giá trung bình/trung vị và các phân vị giá. Median/percentile không cộng dồn
+được, nên mỗi lần cập nhật sẽ tính lại trọn vẹn các nhóm vừa có tin mới (lọc theo
+index (source, crawled_at)) rồi $merge vào market_stats; các nhóm khác không bị đụng tới.
+
+$percentile cần MongoDB 7.0 trở lên.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.config.settings import Config
+from src.data.database.connection import db
+from src.utils.logging import get_logger
+
+COLLECTION = "market_stats"
+
+PRICE_PERCENTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+# (city, type, source, day) - day là 00:00 của ngày crawl
+GroupKey = Tuple[Optional[str], Optional[str], Optional[str], datetime]
+
+
+def _day(value: datetime) -> datetime:
+    return datetime(value.year, value.month, value.day)
+
+
+class MarketStatsService:
+    """Cập nhật market_stats theo nhóm (incremental) hoặc tính lại toàn bộ"""
+
+    def __init__(self, config: Config = None):
+        self.config = config or Config()
+        self.logger = get_logger("market_stats_service")
+
+    @staticmethod
+    def group_key(prop) -> GroupKey:
+        crawled_at = getattr(prop, "crawled_at", None) or datetime.now()
+        return prop.city, prop.type, prop.source, _day(crawled_at)
+
+    @staticmethod
+    def build_pipeline(match: Dict[str, Any]) -> List[Dict[str, Any]]:
+        # crawled_at lưu bằng datetime.now() (giờ địa phương, không tz) nên cắt ngày theo UTC
+        # trong MongoDB cũng chính là ngày địa phương
+        return [
+            {"$match": match},
+            {"$group": {
+                "_id": {
+                    "city": "$city",
+                    "type": "$type",
+                    "source": "$source",
+                    "day": {"$dateTrunc": {"date": "$crawled_at", "unit": "day"}},
+                },
+                "count": {"$sum": 1},
+                "mean_price": {"$avg": "$price"},
+                "mean_unit_price": {"$avg": "$unit_price"},
+                "unit_price_median": {"$percentile": {"input": "$unit_price", "p": [0.5], "method": "approximate"}},
+                "price_percentiles": {"$percentile": {
+                    "input": "$price", "p": list(PRICE_PERCENTILES), "method": "approximate"
+                }},
+            }},
+            {"$set": {
+                "city": "$_id.city",
+                "type": "$_id.type",
+                "source": "$_id.source",
+                "day": "$_id.day",
+                "median_unit_price": {"$arrayElemAt": ["$unit_price_median", 0]},
+                "price_percentiles": {
+                    f"p{int(p * 100)}": {"$arrayElemAt": ["$price_percentiles", i]}
+                    for i, p in enumerate(PRICE_PERCENTILES)
+                },
+                "updated_at": "$$NOW",
+            }},
+            {"$unset": "unit_price_median"},
+            {"$merge": {"into": COLLECTION, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}},
+        ]
+
+    def refresh(self, groups: Iterable[GroupKey]) -> int:
+        """Tính lại các nhóm đã cho; trả về số nhóm được cập nhật"""
+        groups = set(groups)
+        if not groups:
+            return 0
+        if not db.connected and not db.connect(self.config.MONGODB_URI):
+            raise RuntimeError(f"Failed to connect to MongoDB: {self.config.MONGODB_URI}")
+        match = {"$or": [
+            {"source": source, "crawled_at": {"$gte": day, "$lt": day + timedelta(days=1)},
+             "city": city, "type": prop_type}
+            for city, prop_type, source, day in groups
+        ]}
+        db.db.properties.aggregate(self.build_pipeline(match))
+        self.logger.debug(f"Refreshed {len(groups)} market stats groups")
+        return len(groups)
+
+    def rebuild(self) -> int:
+        """Tính lại toàn bộ market_stats, xóa các nhóm không còn tin nào"""
+        if not db.connected and not db.connect(self.config.MONGODB_URI):
+            raise RuntimeError(f"Failed to connect to MongoDB: {self.config.MONGODB_URI}")
+        started = datetime.utcnow()
+        db.db.properties.aggregate(self.build_pipeline({}))
+        collection = db.get_collection(COLLECTION)
+        collection.delete_many({"updated_at": {"$lt": started}})
+        total = collection.count_documents({})
+        self.logger.info(f"Market stats rebuilt: {total} groups")
+        return total
+
+    @staticmethod
+    def query(city: str = None, prop_type: str = None, source: str = None,
+              day_from: datetime = None, day_to: datetime = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Đọc trực tiếp các nhóm đã tính sẵn (index city, type, day)"""
+        query: Dict[str, Any] = {}
+        if city:
+            query["city"] = city
+        if prop_type:
+            query["type"] = prop_type
+        if source:
+            query["source"] = source
+        if day_from or day_to:
+            query["day"] = {}
+            if day_from:
+                query["day"]["$gte"] = _day(day_from)
+            if day_to:
+                query["day"]["$lte"] = _day(day_to)
+        cursor = db.get_collection(COLLECTION).find(query, {"_id": 0}).sort("day", -1).limit(limit)
+        return list(cursor)
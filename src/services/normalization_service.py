@@ -0,0 +1,163 @@
+"""
+Chuẩn hóa lại toàn bộ collection properties theo lô lớn.
+
+Mỗi lô được đọc bằng cursor (chỉ lấy các trường cần thiết) vào một frame dạng cột
+(dict tên cột -> numpy array). Các cột số được tính vector hóa; các cột chuỗi như
+city/type chỉ chuẩn hóa trên tập giá trị duy nhất rồi ánh xạ ngược lại. Chỉ những
+bản ghi thực sự thay đổi mới được ghi lại bằng một lệnh bulk_write.
+"""
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+from pymongo import UpdateOne
+
+from src.config.settings import Config
+from src.data.database.connection import db
+from src.utils.gazetteer import resolve_addresses
+from src.utils.logging import get_logger
+from src.utils.text_processing import extract_area, extract_city_from_address, extract_price, \
+    normalize_property_type
+
+PROJECTION = {"price": 1, "area": 1, "unit_price": 1, "address": 1, "city": 1, "district": 1, "ward": 1, "type": 1}
+
+
+def _to_float(value: Any, parser: Callable[[str], Optional[float]]) -> float:
+    """Giá trị số giữ nguyên; chuỗi (dữ liệu cũ) parse lại bằng parser; còn lại là NaN"""
+    if isinstance(value, bool) or value is None:
+        return np.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        parsed = parser(value)
+        return float(parsed) if parsed is not None else np.nan
+    return np.nan
+
+
+def _canonicalize(values: np.ndarray, func: Callable[[str], Optional[str]]) -> np.ndarray:
+    """Gọi func một lần cho mỗi giá trị duy nhất rồi ánh xạ lại theo inverse index"""
+    uniques, inverse = np.unique(values, return_inverse=True)
+    mapped = np.array([func(value) if value else None for value in uniques], dtype=object)
+    return mapped[inverse]
+
+
+class NormalizationService:
+    """Batch job chuẩn hóa unit_price, price/area dạng chuỗi, city/district/ward và type"""
+
+    def __init__(self, config: Config = None, batch_size: int = None):
+        self.config = config or Config()
+        self.batch_size = batch_size or self.config.NORMALIZE_BATCH_SIZE
+        self.logger = get_logger("normalization_service")
+
+    def run(self, query: Dict[str, Any] = None, dry_run: bool = False) -> Dict[str, int]:
+        if not db.connected and not db.connect(self.config.MONGODB_URI):
+            raise RuntimeError(f"Failed to connect to MongoDB: {self.config.MONGODB_URI}")
+
+        collection = db.db.properties
+        totals = {"scanned": 0, "changed": 0, "modified": 0}
+        for docs in self._iter_batches(collection, query or {}):
+            updates = self.normalize_batch(docs)
+            totals["scanned"] += len(docs)
+            totals["changed"] += len(updates)
+            if updates and not dry_run:
+                result = collection.bulk_write(updates, ordered=False)
+                totals["modified"] += result.modified_count
+            self.logger.info(f"Normalized batch: {len(docs)} scanned, {len(updates)} changed")
+
+        self.logger.info(f"Normalization finished: {totals}")
+        return totals
+
+    def _iter_batches(self, collection, query: Dict[str, Any]) -> Iterator[List[Dict[str, Any]]]:
+        cursor = collection.find(query, PROJECTION, batch_size=self.batch_size).sort("_id", 1)
+        batch = []
+        try:
+            for doc in cursor:
+                batch.append(doc)
+                if len(batch) >= self.batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def build_frame(docs: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """Chuyển một lô document thành các cột numpy"""
+        return {
+            "_id": np.array([doc["_id"] for doc in docs], dtype=object),
+            "price_raw": np.array([doc.get("price") for doc in docs], dtype=object),
+            "area_raw": np.array([doc.get("area") for doc in docs], dtype=object),
+            "price": np.array([_to_float(doc.get("price"), extract_price) for doc in docs], dtype=float),
+            "area": np.array([_to_float(doc.get("area"), extract_area) for doc in docs], dtype=float),
+            "unit_price": np.array([_to_float(doc.get("unit_price"), extract_price) for doc in docs], dtype=float),
+            "address": np.array([doc.get("address") or "" for doc in docs], dtype=object),
+            "city": np.array([doc.get("city") or "" for doc in docs], dtype=object),
+            "district": np.array([doc.get("district") or "" for doc in docs], dtype=object),
+            "ward": np.array([doc.get("ward") or "" for doc in docs], dtype=object),
+            "type": np.array([doc.get("type") or "" for doc in docs], dtype=object),
+        }
+
+    def normalize_batch(self, docs: List[Dict[str, Any]]) -> List[UpdateOne]:
+        """Tính lại các cột chuẩn hóa, trả về UpdateOne cho các bản ghi có thay đổi"""
+        if not docs:
+            return []
+        frame = self.build_frame(docs)
+        price, area = frame["price"], frame["area"]
+
+        # Đơn giá = giá / diện tích, chỉ khi cả hai hợp lệ (giống RealEstateProperty.calculate_unit_price)
+        valid = (price > 0) & (area > 0)
+        unit_price = np.full(len(docs), np.nan)
+        np.divide(price, area, out=unit_price, where=valid)
+        unit_price = np.where(valid, unit_price, frame["unit_price"])
+
+        # City/district/ward: resolve mỗi address duy nhất một lần qua gazetteer;
+        # address không resolve được thì chuẩn hóa lại giá trị city hiện tại
+        addresses, inverse = np.unique(frame["address"], return_inverse=True)
+        locations = resolve_addresses(list(addresses))
+        city_from_address, district, ward = (
+            np.array([location[key] for location in locations], dtype=object)[inverse]
+            for key in ("city", "district", "ward")
+        )
+        city_from_city = _canonicalize(frame["city"], extract_city_from_address)
+        city = np.where(city_from_address != None, city_from_address, city_from_city)  # noqa: E711
+
+        prop_type = _canonicalize(frame["type"], normalize_property_type)
+        # Giá trị type cũ không khớp loại nào thì giữ nguyên, không tự gán mặc định
+        prop_type = np.where(prop_type != None, prop_type, frame["type"])  # noqa: E711
+
+        changes = {
+            # price/area chuỗi đã parse được thì ghi lại thành số
+            "price": self._string_parsed(frame["price_raw"], price),
+            "area": self._string_parsed(frame["area_raw"], area),
+            "unit_price": ~self._same_float(unit_price, frame["unit_price"]),
+            "city": (city != None) & (city != frame["city"]),  # noqa: E711
+            "district": (district != None) & (district != frame["district"]),  # noqa: E711
+            "ward": (ward != None) & (ward != frame["ward"]),  # noqa: E711
+            "type": (prop_type != "") & (prop_type != frame["type"]),
+        }
+        columns = {"price": price, "area": area, "unit_price": unit_price, "city": city,
+                   "district": district, "ward": ward, "type": prop_type}
+
+        changed_rows = np.flatnonzero(np.logical_or.reduce(list(changes.values())))
+        now = datetime.now()  # updated_at: để export incremental lấy lại các bản ghi vừa chuẩn hóa
+        updates = []
+        for row in changed_rows:
+            fields = {}
+            for name, mask in changes.items():
+                if mask[row]:
+                    value = columns[name][row]
+                    fields[name] = float(value) if isinstance(value, (float, np.floating)) else value
+            fields["updated_at"] = now
+            updates.append(UpdateOne({"_id": frame["_id"][row]}, {"$set": fields}))
+        return updates
+
+    @staticmethod
+    def _string_parsed(raw: np.ndarray, parsed: np.ndarray) -> np.ndarray:
+        is_string = np.array([isinstance(value, str) for value in raw], dtype=bool)
+        return is_string & ~np.isnan(parsed)
+
+    @staticmethod
+    def _same_float(new: np.ndarray, old: np.ndarray) -> np.ndarray:
+        # Giá trị mới là NaN thì coi như không đổi (không ghi đè bằng null)
+        return np.isnan(new) | np.isclose(new, old, rtol=1e-9, equal_nan=True)
@@ -0,0 +1,87 @@
+"""
+Lịch crawl theo từng site và kiểm soát tải khi bắt đầu một lần crawl.
+
+- cron_trigger: cron 5 trường + jitter, để các site cùng giờ không khởi động browser cùng lúc;
+- AdmissionController: hoãn job khi CPU/bộ nhớ của máy hoặc số lần crawl đang chạy vượt ngưỡng;
+  khi nhiều site cùng chờ, site có priority cao hơn được nhận trước.
+"""
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import psutil
+from apscheduler.triggers.cron import CronTrigger
+
+from src.config.settings import Config
+from src.utils.logging import get_logger
+
+logger = get_logger("scheduling")
+
+
+def cron_trigger(expression: str, jitter: int = None, timezone: str = None) -> CronTrigger:
+    """CronTrigger từ biểu thức crontab 5 trường (phút giờ ngày tháng thứ), kèm jitter giây.
+    Trường thứ theo APScheduler: 0 = thứ Hai (nên dùng tên: mon-fri)."""
+    fields = expression.split()
+    if len(fields) != 5:
+        raise ValueError(f"Cron expression must have 5 fields: {expression!r}")
+    minute, hour, day, month, day_of_week = fields
+    return CronTrigger(minute=minute, hour=hour, day=day, month=month, day_of_week=day_of_week,
+                       jitter=jitter or None, timezone=timezone)
+
+
+class AdmissionController:
+
+    def __init__(self, config: Config = None):
+        self.config = config or Config()
+        self.max_cpu = self.config.ADMISSION_MAX_CPU_PERCENT
+        self.max_memory = self.config.ADMISSION_MAX_MEMORY_PERCENT
+        self.max_rss_mb = self.config.ADMISSION_MAX_RSS_MB
+        self.max_concurrent = self.config.ADMISSION_MAX_CONCURRENT or self.config.CRAWL_WORKERS
+        self.waiting: Dict[str, Tuple[int, float]] = {}  # site -> (priority, lần hoãn gần nhất)
+        self._lock = threading.Lock()  # admit() được gọi từ nhiều thread của scheduler
+        psutil.cpu_percent(interval=None)  # lần gọi đầu luôn trả 0.0, gọi trước để có mốc
+
+    @staticmethod
+    def crawl_rss_mb() -> float:
+        """RSS của tiến trình hiện tại và toàn bộ tiến trình con (worker crawl, Chromium)"""
+        process = psutil.Process()
+        total = 0
+        for proc in [process, *process.children(recursive=True)]:
+            try:
+                total += proc.memory_info().rss
+            except psutil.Error:
+                continue
+        return total / (1024 * 1024)
+
+    def overload_reason(self, running: int) -> Optional[str]:
+        if running >= self.max_concurrent:
+            return f"{running} crawls running (max {self.max_concurrent})"
+        cpu = psutil.cpu_percent(interval=None)
+        if cpu >= self.max_cpu:
+            return f"CPU {cpu:.0f}% >= {self.max_cpu:.0f}%"
+        memory = psutil.virtual_memory().percent
+        if memory >= self.max_memory:
+            return f"memory {memory:.0f}% >= {self.max_memory:.0f}%"
+        if self.max_rss_mb:
+            rss = self.crawl_rss_mb()
+            if rss >= self.max_rss_mb:
+                return f"crawl RSS {rss:.0f}MB >= {self.max_rss_mb}MB"
+        return None
+
+    def admit(self, site: str, priority: int, running: int) -> Optional[str]:
+        """None nếu được chạy ngay; ngược lại là lý do hoãn (site được ghi vào danh sách chờ)"""
+        with self._lock:
+            now = time.monotonic()
+            # Site chờ quá lâu mà không thử lại (lịch bị xóa...) thì bỏ khỏi danh sách
+            stale = 3 * self.config.ADMISSION_RETRY_SECONDS
+            self.waiting = {name: value for name, value in self.waiting.items() if now - value[1] < stale}
+            self.waiting[site] = (priority, now)
+
+            reason = self.overload_reason(running)
+            if reason is None:
+                ahead = [name for name, (other, _) in self.waiting.items() if name != site and other > priority]
+                if ahead:
+                    reason = f"waiting for higher priority sites: {ahead}"
+            if reason is None:
+                self.waiting.pop(site, None)
+            return reason
@@ -0,0 +1,297 @@
+"""
+Gazetteer địa danh Việt Nam: tách city / district / ward từ địa chỉ tự do.
+
+Mọi alias (không dấu, chữ thường) được biên dịch một lần vào automaton Aho-Corasick,
+nên mỗi địa chỉ chỉ cần quét một lượt bất kể có bao nhiêu alias.
+
+Quy tắc chấp nhận một match:
+- có tiền tố hành chính (quận/q./tp/huyện...) hoặc chiếm trọn một đoạn giữa hai dấu phẩy
+  -> match "mạnh";
+- tên tỉnh/thành đứng lẫn trong đoạn (vd: "phố Huế") chỉ là match "yếu", dùng khi không còn gì khác;
+- tên quận/huyện/phường không tiền tố và không đứng riêng bị bỏ qua (thường là tên đường).
+
+Giới hạn: dữ liệu dựng sẵn không có tên phường/xã. Khi không cấu hình GAZETTEER_FILE,
+ward chỉ được điền từ đoạn có tiền tố (Phường/P./Xã/Thị trấn), lấy nguyên văn và không
+đối chiếu danh mục; tắt hẳn bằng GAZETTEER_PREFIX_WARDS=False. Phường không ghi tiền tố
+(vd: "Lộc Thọ, Nha Trang") cho ward = None.
+
+City của Nha Trang, Biên Hòa, Vũng Tàu giữ giá trị cũ (LEGACY_CITIES), không đổi thành tên tỉnh.
+"""
+import json
+import os
+import re
+from bisect import bisect_right
+from collections import deque
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from src.utils.gazetteer_data import DISTRICTS, DISTRICT_PREFIXES, LEGACY_CITIES, PROVINCES, PROVINCE_PREFIXES, \
+    WARD_PREFIXES
+from src.utils.logging import get_logger
+from src.utils.text_processing import strip_accents
+
+logger = get_logger("gazetteer")
+
+CITY, DISTRICT, WARD, WARD_PREFIX = "city", "district", "ward", "ward_prefix"
+
+_NON_ALNUM = re.compile(r'[^0-9a-z,]+')
+_WARD_PREFIX_RE = re.compile(r'^\s*(?:phường|p\.?|xã|thị\s*trấn|tt\.?)\s*', re.IGNORECASE)
+
+
+class Entry(NamedTuple):
+    kind: str
+    name: str
+    city: Optional[str]
+    district: Optional[str]
+    prefixed: bool
+
+
+def fold(text: str) -> str:
+    """Chữ thường, không dấu, mọi ký tự khác chữ/số/dấu phẩy gộp thành một khoảng trắng"""
+    return _NON_ALNUM.sub(' ', strip_accents(text).lower())
+
+
+class AhoCorasick:
+    """Automaton Aho-Corasick thuần Python; payload của pattern trùng nhau được gộp lại"""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, Any]]] = [[]]
+        self._built = False
+
+    def add(self, pattern: str, payload: Any):
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        if (len(pattern), payload) not in self._out[node]:
+            self._out[node].append((len(pattern), payload))
+        self._built = False
+
+    def build(self):
+        # BFS từ các node con của root (fail = root), gộp output theo fail link
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+                queue.append(child)
+        self._built = True
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, Any]]:
+        """Sinh (start, end, payload) cho mọi pattern xuất hiện trong text"""
+        if not self._built:
+            self.build()
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for length, payload in out[node]:
+                yield i + 1 - length, i + 1, payload
+
+
+def _split_prefix(name: str, prefixes: Dict[str, List[str]]) -> Tuple[Optional[str], str]:
+    for prefix in prefixes:
+        if name.startswith(prefix + " "):
+            return prefix, name[len(prefix) + 1:]
+    return None, name
+
+
+class Gazetteer:
+
+    def __init__(self, prefix_wards: bool = True):
+        self._automaton = AhoCorasick()
+        self._district_cities: Dict[str, set] = {}
+        self.prefix_wards = prefix_wards
+        self.has_wards = False
+        self.size = 0
+
+    # ------------------------------------------------------------------ build
+
+    def _add(self, alias: str, entry: Entry):
+        alias = fold(alias).strip()
+        if alias:
+            self._automaton.add(alias, entry)
+            self.size += 1
+
+    def _add_prefixed(self, base: str, variants: List[str], entry: Entry):
+        for variant in variants:
+            self._add(f"{variant} {base}", entry)
+            if base.isdigit():
+                self._add(f"{variant}{base}", entry)  # q1, p12
+
+    def add_city(self, name: str, aliases: List[str] = ()):
+        bare = Entry(CITY, name, name, None, False)
+        strong = bare._replace(prefixed=True)
+        for alias in [name, *aliases]:
+            self._add(alias, bare)
+            self._add_prefixed(fold(alias).strip(), PROVINCE_PREFIXES, strong)
+
+    def add_district(self, city: str, name: str, aliases: List[str] = ()):
+        self._district_cities.setdefault(name, set()).add(city)
+        bare = Entry(DISTRICT, name, city, name, False)
+        strong = bare._replace(prefixed=True)
+        prefix, base = _split_prefix(name, DISTRICT_PREFIXES)
+        if not base.isdigit():
+            self._add(base, bare)
+        if prefix:
+            self._add_prefixed(fold(base).strip(), DISTRICT_PREFIXES[prefix], strong)
+        for alias in aliases:
+            folded = fold(alias).strip()
+            is_prefixed = any(folded.startswith(v + " ") for vs in DISTRICT_PREFIXES.values() for v in vs)
+            self._add(folded, strong if is_prefixed else bare)
+
+    def add_ward(self, city: str, district: Optional[str], name: str, aliases: List[str] = ()):
+        self.has_wards = True
+        bare = Entry(WARD, name, city, district, False)
+        strong = bare._replace(prefixed=True)
+        prefix, base = _split_prefix(name, WARD_PREFIXES)
+        if not base.isdigit():
+            self._add(base, bare)
+        if prefix:
+            self._add_prefixed(fold(base).strip(), WARD_PREFIXES[prefix], strong)
+        for alias in aliases:
+            self._add(alias, bare)
+
+    def add_builtin(self):
+        for name, aliases in PROVINCES.items():
+            self.add_city(name, aliases)
+        for city, districts in DISTRICTS.items():
+            for name, aliases in districts.items():
+                self.add_district(city, name, aliases)
+        for canonical, variants in WARD_PREFIXES.items():
+            for variant in variants:
+                self._add(variant, Entry(WARD_PREFIX, canonical, None, None, True))
+
+    def load_file(self, path: str):
+        """
+        Nạp dữ liệu mở rộng dạng:
+        {"<tỉnh>": {"aliases": [...], "districts": {"<quận>": {"aliases": [...], "wards": ["<phường>", ...]}}}}
+        """
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        for city, city_data in data.items():
+            self.add_city(city, city_data.get("aliases", []))
+            for district, district_data in city_data.get("districts", {}).items():
+                self.add_district(city, district, district_data.get("aliases", []))
+                for ward in district_data.get("wards", []):
+                    self.add_ward(city, district, ward)
+
+    # ---------------------------------------------------------------- resolve
+
+    def resolve(self, address: str) -> Dict[str, Optional[str]]:
+        """Tách {"city", "district", "ward"} từ một địa chỉ (không tìm thấy thì None)"""
+        result = {"city": None, "district": None, "ward": None}
+        if not address:
+            return result
+
+        text = fold(address)
+        segments = text.split(',')
+        seg_starts, pos = [], 0
+        for segment in segments:
+            seg_starts.append(pos)
+            pos += len(segment) + 1
+
+        strong_cities, weak_cities, districts, wards, ward_prefix = [], [], [], [], None
+        for start, end, entry in self._automaton.iter_matches(text):
+            if (start > 0 and text[start - 1].isalnum()) or (end < len(text) and text[end].isalnum()
+                                                             and not (entry.kind == WARD_PREFIX and text[end].isdigit())):
+                continue
+            seg = bisect_right(seg_starts, start) - 1
+            segment = segments[seg]
+            whole = text[start:end] == segment.strip()
+            if entry.kind == WARD_PREFIX:
+                if segment[:start - seg_starts[seg]].strip() == "" and end - seg_starts[seg] < len(segment):
+                    ward_prefix = (seg, entry.name)
+            elif entry.kind == CITY:
+                (strong_cities if entry.prefixed or whole else weak_cities).append((seg, entry))
+            elif entry.prefixed or whole:
+                (districts if entry.kind == DISTRICT else wards).append((seg, entry))
+
+        city = strong_cities[-1][1].city if strong_cities else None
+        district = self._pick(districts, city)
+        if district:
+            if city is None and len(self._district_cities.get(district.name, ())) == 1:
+                city = district.city
+            if district.city == city:
+                result["district"] = district.name
+        if city is None and weak_cities:
+            city = weak_cities[-1][1].city
+        result["city"] = city
+
+        ward = self._pick([w for w in wards if result["district"] in (None, w[1].district)], city)
+        if ward and result["city"] in (None, ward.city):
+            result["ward"] = ward.name
+            result["district"] = result["district"] or ward.district
+            result["city"] = result["city"] or ward.city
+        elif ward_prefix is not None and self.prefix_wards:
+            seg, canonical = ward_prefix
+            rest = _WARD_PREFIX_RE.sub('', address.split(',')[seg]).strip()
+            result["ward"] = f"{canonical} {rest}" if rest else None
+
+        # Giữ city như mapping cũ, tránh đổi nhóm của dữ liệu đã lưu
+        result["city"] = LEGACY_CITIES.get(result["district"]) or LEGACY_CITIES.get(result["city"], result["city"])
+        return result
+
+    @staticmethod
+    def _pick(candidates: List[Tuple[int, Entry]], city: Optional[str]) -> Optional[Entry]:
+        """Ưu tiên match nằm bên phải nhất và thuộc đúng city (nếu đã biết city)"""
+        if not candidates:
+            return None
+        if city:
+            matching = [entry for _, entry in candidates if entry.city == city]
+            if matching:
+                return matching[-1]
+        return candidates[-1][1]
+
+    def resolve_many(self, addresses: List[str]) -> List[Dict[str, Optional[str]]]:
+        """Batch API: địa chỉ trùng nhau chỉ resolve một lần"""
+        cache: Dict[str, Dict[str, Optional[str]]] = {}
+        results = []
+        for address in addresses:
+            key = address or ""
+            if key not in cache:
+                cache[key] = self.resolve(key)
+            results.append(dict(cache[key]))
+        return results
+
+
+@lru_cache(maxsize=1)
+def get_gazetteer() -> Gazetteer:
+    """Gazetteer dùng chung, build một lần cho mỗi tiến trình"""
+    from src.config.settings import config
+
+    gazetteer = Gazetteer(prefix_wards=config.GAZETTEER_PREFIX_WARDS)
+    gazetteer.add_builtin()
+    if config.GAZETTEER_FILE:
+        if os.path.exists(config.GAZETTEER_FILE):
+            gazetteer.load_file(config.GAZETTEER_FILE)
+        else:
+            logger.warning(f"Gazetteer file not found: {config.GAZETTEER_FILE}")
+    gazetteer._automaton.build()
+    logger.debug(f"Gazetteer built with {gazetteer.size} aliases")
+    if not gazetteer.has_wards:
+        logger.info("Gazetteer has no ward data (set GAZETTEER_FILE); ward only comes from prefixed segments"
+                    if gazetteer.prefix_wards else "Gazetteer has no ward data (set GAZETTEER_FILE); ward disabled")
+    return gazetteer
+
+
+def resolve_address(address: str) -> Dict[str, Optional[str]]:
+    return get_gazetteer().resolve(address)
+
+
+def resolve_addresses(addresses: List[str]) -> List[Dict[str, Optional[str]]]:
+    return get_gazetteer().resolve_many(addresses)
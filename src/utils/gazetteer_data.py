@@ -0,0 +1,212 @@
+"""
+Dữ liệu địa danh dựng sẵn cho gazetteer.
+
+PROVINCES: 63 tỉnh/thành (tên chuẩn -> alias bổ sung). Alias không dấu của tên chuẩn
+và các dạng có tiền tố (tp, tỉnh, ...) được sinh tự động, ở đây chỉ cần liệt kê
+viết tắt và cách viết khác.
+
+DISTRICTS: quận/huyện của các thành phố lớn và một số thành phố thuộc tỉnh
+(tên chuẩn kèm tiền tố -> alias bổ sung). Dữ liệu đầy đủ tới phường/xã nạp thêm từ
+file JSON qua GAZETTEER_FILE.
+
+Không có sẵn danh sách phường/xã: nếu không có GAZETTEER_FILE, ward chỉ lấy được khi
+địa chỉ ghi rõ tiền tố (Phường 12, P. Tân Định, Xã Phước An) và giữ nguyên tên như trong tin.
+
+LEGACY_CITIES: giá trị city mà extract_city_from_address cũ trả về cho một số thành phố
+thuộc tỉnh, giữ nguyên để city đã lưu và nhóm market_stats không đổi.
+"""
+
+PROVINCES = {
+    "An Giang": [],
+    "Bà Rịa - Vũng Tàu": ["ba ria vung tau", "brvt", "vung tau", "ba ria"],
+    "Bắc Giang": [],
+    "Bắc Kạn": ["bac can"],
+    "Bạc Liêu": [],
+    "Bắc Ninh": [],
+    "Bến Tre": [],
+    "Bình Định": [],
+    "Bình Dương": [],
+    "Bình Phước": [],
+    "Bình Thuận": [],
+    "Cà Mau": [],
+    "Cần Thơ": ["cantho"],
+    "Cao Bằng": [],
+    "Đà Nẵng": ["danang"],
+    "Đắk Lắk": ["dak lak", "dac lac", "daklak"],
+    "Đắk Nông": ["dak nong", "dac nong"],
+    "Điện Biên": [],
+    "Đồng Nai": [],
+    "Đồng Tháp": [],
+    "Gia Lai": [],
+    "Hà Giang": [],
+    "Hà Nam": [],
+    "Hà Nội": ["hanoi", "hn"],
+    "Hà Tĩnh": [],
+    "Hải Dương": [],
+    "Hải Phòng": ["haiphong"],
+    "Hậu Giang": [],
+    "Hòa Bình": [],
+    "Hồ Chí Minh": ["hcm", "tphcm", "tp hcm", "hochiminh", "sai gon", "saigon", "hcmc"],
+    "Hưng Yên": [],
+    "Khánh Hòa": [],
+    "Kiên Giang": [],
+    "Kon Tum": ["kontum"],
+    "Lai Châu": [],
+    "Lâm Đồng": [],
+    "Lạng Sơn": [],
+    "Lào Cai": [],
+    "Long An": [],
+    "Nam Định": [],
+    "Nghệ An": [],
+    "Ninh Bình": [],
+    "Ninh Thuận": [],
+    "Phú Thọ": [],
+    "Phú Yên": [],
+    "Quảng Bình": [],
+    "Quảng Nam": [],
+    "Quảng Ngãi": [],
+    "Quảng Ninh": [],
+    "Quảng Trị": [],
+    "Sóc Trăng": [],
+    "Sơn La": [],
+    "Tây Ninh": [],
+    "Thái Bình": [],
+    "Thái Nguyên": [],
+    "Thanh Hóa": [],
+    "Huế": ["thua thien hue"],
+    "Tiền Giang": [],
+    "Trà Vinh": [],
+    "Tuyên Quang": [],
+    "Vĩnh Long": [],
+    "Vĩnh Phúc": [],
+    "Yên Bái": [],
+}
+
+DISTRICTS = {
+    "Hồ Chí Minh": {
+        **{f"Quận {i}": [] for i in range(1, 13)},
+        "Quận Bình Thạnh": [],
+        "Quận Gò Vấp": [],
+        "Quận Phú Nhuận": [],
+        "Quận Tân Bình": [],
+        "Quận Tân Phú": [],
+        "Quận Bình Tân": [],
+        "Thành phố Thủ Đức": ["quan thu duc"],
+        "Huyện Bình Chánh": [],
+        "Huyện Hóc Môn": [],
+        "Huyện Củ Chi": [],
+        "Huyện Nhà Bè": [],
+        "Huyện Cần Giờ": [],
+    },
+    "Hà Nội": {
+        "Quận Ba Đình": [],
+        "Quận Hoàn Kiếm": [],
+        "Quận Tây Hồ": [],
+        "Quận Long Biên": [],
+        "Quận Cầu Giấy": [],
+        "Quận Đống Đa": [],
+        "Quận Hai Bà Trưng": [],
+        "Quận Hoàng Mai": [],
+        "Quận Thanh Xuân": [],
+        "Quận Nam Từ Liêm": [],
+        "Quận Bắc Từ Liêm": [],
+        "Quận Hà Đông": [],
+        "Thị xã Sơn Tây": [],
+        "Huyện Ba Vì": [],
+        "Huyện Chương Mỹ": [],
+        "Huyện Đan Phượng": [],
+        "Huyện Đông Anh": [],
+        "Huyện Gia Lâm": [],
+        "Huyện Hoài Đức": [],
+        "Huyện Mê Linh": [],
+        "Huyện Mỹ Đức": [],
+        "Huyện Phú Xuyên": [],
+        "Huyện Phúc Thọ": [],
+        "Huyện Quốc Oai": [],
+        "Huyện Sóc Sơn": [],
+        "Huyện Thạch Thất": [],
+        "Huyện Thanh Oai": [],
+        "Huyện Thanh Trì": [],
+        "Huyện Thường Tín": [],
+        "Huyện Ứng Hòa": [],
+    },
+    "Đà Nẵng": {
+        "Quận Hải Châu": [],
+        "Quận Thanh Khê": [],
+        "Quận Sơn Trà": [],
+        "Quận Ngũ Hành Sơn": [],
+        "Quận Liên Chiểu": [],
+        "Quận Cẩm Lệ": [],
+        "Huyện Hòa Vang": [],
+    },
+    "Hải Phòng": {
+        "Quận Hồng Bàng": [],
+        "Quận Ngô Quyền": [],
+        "Quận Lê Chân": [],
+        "Quận Hải An": [],
+        "Quận Kiến An": [],
+        "Quận Đồ Sơn": [],
+        "Quận Dương Kinh": [],
+        "Thành phố Thủy Nguyên": ["huyen thuy nguyen"],
+        "Huyện An Dương": [],
+        "Huyện An Lão": [],
+        "Huyện Kiến Thụy": [],
+        "Huyện Tiên Lãng": [],
+        "Huyện Vĩnh Bảo": [],
+        "Huyện Cát Hải": [],
+    },
+    "Cần Thơ": {
+        "Quận Ninh Kiều": [],
+        "Quận Bình Thủy": [],
+        "Quận Cái Răng": [],
+        "Quận Ô Môn": [],
+        "Quận Thốt Nốt": [],
+        "Huyện Phong Điền": [],
+        "Huyện Cờ Đỏ": [],
+        "Huyện Thới Lai": [],
+        "Huyện Vĩnh Thạnh": [],
+    },
+    "Đồng Nai": {"Thành phố Biên Hòa": [], "Thành phố Long Khánh": []},
+    "Khánh Hòa": {"Thành phố Nha Trang": [], "Thành phố Cam Ranh": []},
+    "Bà Rịa - Vũng Tàu": {"Thành phố Vũng Tàu": []},
+    "Bình Dương": {
+        "Thành phố Thủ Dầu Một": [],
+        "Thành phố Dĩ An": [],
+        "Thành phố Thuận An": [],
+        "Thành phố Bến Cát": [],
+        "Thành phố Tân Uyên": [],
+    },
+    "Lâm Đồng": {"Thành phố Đà Lạt": ["dalat"], "Thành phố Bảo Lộc": []},
+    "Bình Định": {"Thành phố Quy Nhơn": ["qui nhon"]},
+    "Nghệ An": {"Thành phố Vinh": []},
+    "Quảng Ninh": {"Thành phố Hạ Long": [], "Thành phố Cẩm Phả": [], "Thành phố Móng Cái": []},
+    "Đắk Lắk": {"Thành phố Buôn Ma Thuột": ["buon me thuot", "bmt"]},
+    "Bình Thuận": {"Thành phố Phan Thiết": []},
+    "Quảng Nam": {"Thành phố Hội An": [], "Thành phố Tam Kỳ": []},
+    "Kiên Giang": {"Thành phố Rạch Giá": [], "Thành phố Phú Quốc": ["huyen phu quoc"]},
+    "An Giang": {"Thành phố Long Xuyên": []},
+    "Tiền Giang": {"Thành phố Mỹ Tho": []},
+    "Long An": {"Thành phố Tân An": []},
+}
+
+# Quận/huyện hoặc tỉnh -> city như mapping cũ (Nha Trang không thành Khánh Hòa)
+LEGACY_CITIES = {
+    "Thành phố Biên Hòa": "Biên Hòa",
+    "Thành phố Nha Trang": "Nha Trang",
+    "Thành phố Vũng Tàu": "Vũng Tàu",
+    "Bà Rịa - Vũng Tàu": "Vũng Tàu",
+}
+
+# Tiền tố hành chính (không dấu) -> các cách viết tắt hay gặp
+PROVINCE_PREFIXES = ["tp", "thanh pho", "tinh"]
+DISTRICT_PREFIXES = {
+    "Quận": ["quan", "q"],
+    "Huyện": ["huyen", "h"],
+    "Thị xã": ["thi xa", "tx"],
+    "Thành phố": ["thanh pho", "tp"],
+}
+WARD_PREFIXES = {
+    "Phường": ["phuong", "p"],
+    "Xã": ["xa"],
+    "Thị trấn": ["thi tran", "tt"],
+}
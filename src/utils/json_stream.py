@@ -0,0 +1,90 @@
+import json
+from typing import Any, List
+
+from src.utils.logging import get_logger
+
+logger = get_logger("json_stream")
+
+
+class JsonArrayStreamParser:
+    """
+    Tách dần từng phần tử của JSON array đầu tiên trong một luồng text.
+
+    Text có thể đến theo từng chunk (streaming) và có thể bọc ngoài bởi markdown
+    fence hoặc object (vd: {"items": [...]}). Mỗi lần feed() trả về các phần tử
+    đã hoàn chỉnh; phần tử lỗi cú pháp bị bỏ qua mà không làm mất cả batch.
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._in_array = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+    def feed(self, chunk: str) -> List[Any]:
+        items = []
+        if self._finished or not chunk:
+            return items
+
+        for ch in chunk:
+            if self._in_string:
+                if self._in_array:
+                    self._buffer.append(ch)
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if not self._in_array:
+                # Chưa gặp array: bỏ qua mọi thứ, kể cả '[' nằm trong string
+                if ch == '"':
+                    self._in_string = True
+                elif ch == '[':
+                    self._in_array = True
+                continue
+
+            if self._depth == 0 and ch in ',]':
+                self._emit(items)
+                if ch == ']':
+                    self._finished = True
+                    break
+                continue
+
+            if self._depth == 0 and ch.isspace():
+                continue
+
+            self._buffer.append(ch)
+            if ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                self._depth += 1
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._emit(items)
+
+        return items
+
+    def _emit(self, items: List[Any]):
+        text = "".join(self._buffer).strip()
+        self._buffer = []
+        if not text:
+            return
+        try:
+            items.append(json.loads(text))
+        except ValueError as e:
+            logger.warning(f"Bỏ qua phần tử JSON lỗi: {e} | {text[:200]}")
+
+
+def parse_json_array(text: str) -> List[Any]:
+    """Parse toàn bộ text một lần, trả về các phần tử hợp lệ của JSON array đầu tiên"""
+    return JsonArrayStreamParser().feed(text or "")
@@ -1,4 +1,7 @@
+import logging
 import sys
+from typing import Dict
+
 from loguru import logger
 from ..config.settings import config
 
@@ -8,13 +11,20 @@ def setup_logging():
 
     # Remove default handler
     logger.remove()
+    # Trường ngữ cảnh mặc định, được gán lại bằng log_context() trong lần crawl/job
+    logger.configure(extra={"site": None, "run_id": None, "job_id": None, "url": None})
+
+    # enqueue: coroutine crawl chỉ đẩy record vào hàng đợi, thread nền ghi ra stdout/file
+    # LOG_JSON: mỗi dòng là một JSON (message, level, time... và extra: site, run_id, job_id, url)
 
     # Console handler
     logger.add(
         sys.stdout,
         format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
         level=config.LOG_LEVEL,
-        colorize=True
+        colorize=not config.LOG_JSON,
+        serialize=config.LOG_JSON,
+        enqueue=config.LOG_ENQUEUE
     )
 
     # File handler
@@ -24,12 +34,51 @@ def setup_logging():
         level=config.LOG_LEVEL,
         rotation="10 MB",
         retention="30 days",
-        compression="zip"
+        compression="zip",
+        serialize=config.LOG_JSON,
+        enqueue=config.LOG_ENQUEUE
     )
 
+    # Repository/API dùng module logging chuẩn: chuyển sang loguru để cùng sink, cùng JSON và ngữ cảnh
+    logging.basicConfig(handlers=[_InterceptHandler()], level=logging.WARNING, force=True)
+
     logger.info("Logging system initialized")
 
 
+class _InterceptHandler(logging.Handler):
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            level = logger.level(record.levelname).name
+        except ValueError:
+            level = record.levelno
+        # Bỏ qua các frame của module logging để loguru ghi đúng nơi gọi
+        frame, depth = logging.currentframe(), 2
+        while frame and frame.f_code.co_filename == logging.__file__:
+            frame = frame.f_back
+            depth += 1
+        logger.bind(name=record.name).opt(depth=depth, exception=record.exc_info).log(level, record.getMessage())
+
+
 def get_logger(name: str):
     """Lấy logger instance cho module"""
     return logger.bind(name=name)
+
+
+def log_context(**fields):
+    """Gắn trường ngữ cảnh (site, run_id, job_id, url) cho mọi log trong khối with,
+    kể cả task/thread tạo ra bên trong (contextvars)"""
+    return logger.contextualize(**fields)
+
+
+class LogSampler:
+    """Lấy mẫu log theo từng tin trên hot path: cho qua lần đầu rồi 1/every thông điệp cùng key"""
+
+    def __init__(self, every: int = None):
+        self.every = max(1, every or config.LOG_SAMPLE_EVERY)
+        self.counts: Dict[str, int] = {}
+
+    def allow(self, key: str) -> bool:
+        count = self.counts.get(key, 0) + 1
+        self.counts[key] = count
+        return (count - 1) % self.every == 0
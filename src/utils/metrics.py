@@ -0,0 +1,96 @@
+"""
+Metrics Prometheus cho crawler và API.
+
+- API: GET /metrics (kèm metrics của worker pool nếu đặt PROMETHEUS_MULTIPROC_DIR: các tiến trình
+  spawn kế thừa biến môi trường và ghi vào cùng thư mục, /metrics gộp lại);
+- worker hàng đợi (--action worker, có thể ở node khác): mở cổng scrape METRICS_PORT
+  và/hoặc đẩy lên Pushgateway METRICS_PUSHGATEWAY sau mỗi job.
+
+Trên hot path (mỗi trang, mỗi tin) chỉ gọi inc/observe qua child đã cache theo bộ label,
+không tra labels() mỗi lần.
+"""
+import glob
+import os
+from functools import lru_cache
+
+from src.config.settings import config
+
+if config.PROMETHEUS_MULTIPROC_DIR:
+    # prometheus_client chọn kiểu lưu giá trị lúc import, nên phải đặt biến môi trường trước
+    os.makedirs(config.PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", config.PROMETHEUS_MULTIPROC_DIR)
+
+from prometheus_client import (  # noqa: E402
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+    push_to_gateway, start_http_server
+)
+
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+# Media type của render(); API lấy từ đây thay vì import prometheus_client (phải import sau khi đặt biến môi trường)
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+PAGES_FETCHED = Counter("crawler_pages_fetched_total", "Trang đã tải", ["source", "kind", "status"])
+HTTP_RESPONSES = Counter("crawler_http_responses_total", "Mã HTTP của các trang đã tải", ["source", "code"])
+BYTES_DOWNLOADED = Counter("crawler_bytes_downloaded_total", "Số byte HTML đã tải", ["source"])
+PROPERTIES = Counter("crawler_properties_total",
+                     "Tin theo trạng thái: extracted, failed, duplicate, enriched, saved, save_failed",
+                     ["source", "status"])
+PHASE_SECONDS = Histogram("crawler_phase_seconds", "Thời gian theo pha (fetch, parse, db, llm...)",
+                          ["source", "phase"], buckets=LATENCY_BUCKETS)
+CRAWL_RUNS = Counter("crawler_runs_total", "Lần crawl đã kết thúc", ["source", "status"])
+CRAWLS_RUNNING = Gauge("crawler_runs_in_progress", "Lần crawl đang chạy", ["source"], multiprocess_mode="livesum")
+QUEUE_DEPTH = Gauge("crawler_queue_depth", "Số phần tử đang chờ trong hàng đợi", ["queue"],
+                    multiprocess_mode="livesum")
+LLM_CALLS = Counter("llm_calls_total", "Batch gửi tới backend enrich", ["backend", "status"])
+LLM_TOKENS = Counter("llm_tokens_total", "Token LLM theo loại (prompt, completion)", ["backend", "kind"])
+API_REQUESTS = Histogram("api_request_seconds", "Thời gian xử lý request API", ["method", "route", "status"],
+                         buckets=LATENCY_BUCKETS)
+
+
+@lru_cache(maxsize=None)
+def _child(metric, labels: tuple):
+    return metric.labels(*labels)
+
+
+def inc(metric, *labels, amount: float = 1):
+    _child(metric, labels).inc(amount)
+
+
+def observe(metric, value: float, *labels):
+    _child(metric, labels).observe(value)
+
+
+def set_gauge(metric, value: float, *labels):
+    _child(metric, labels).set(value)
+
+
+def render() -> bytes:
+    """Nội dung cho GET /metrics (gộp mọi tiến trình khi chạy multiprocess)"""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def clear_multiprocess_dir():
+    """Xóa file metric của lần chạy trước; gọi ở tiến trình cha trước khi spawn worker"""
+    if MULTIPROCESS:
+        for path in glob.glob(os.path.join(os.environ["PROMETHEUS_MULTIPROC_DIR"], "*.db")):
+            os.remove(path)
+
+
+def mark_process_dead(pid: int):
+    """Bỏ gauge 'live' của tiến trình worker đã thoát"""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(pid)
+
+
+def start_metrics_server(port: int):
+    start_http_server(port)
+
+
+def push(gateway: str, job: str, instance: str):
+    push_to_gateway(gateway, job=job, grouping_key={"instance": instance}, registry=REGISTRY)
+
@@ -0,0 +1,332 @@
+"""
+Profile một lần crawl (main.py --profile): mỗi site ghi một thư mục trong PROFILE_DIR gồm
+
+- report.txt / report.json: thời gian, độ trễ event loop, các lần loop bị chặn kèm stack,
+  hàm tốn thời gian nhất, cấp phát bộ nhớ (tracemalloc) và timings theo pha của CrawlStats;
+- stacks.folded (mode sample): stack dạng "thread;frame;frame count", đưa thẳng vào
+  flamegraph.pl, speedscope hoặc inferno;
+- cprofile.prof (mode cprofile): đọc bằng pstats, snakeviz hoặc flameprof.
+
+Sampler chạy ở thread nền và chụp sys._current_frames() (kiểu py-spy/pyinstrument), không cần
+instrument code. LoopLagMonitor đo độ trễ giữa lúc callback được hẹn và lúc thực chạy; khi loop
+bị chặn quá PROFILE_LOOP_LAG_MS, thread watchdog chụp stack của thread chạy loop để chỉ ra lời
+gọi đồng bộ (requests.post, pymongo...) đang chặn.
+"""
+import asyncio
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import sysconfig
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config.settings import Config
+from src.utils.timing import Histogram
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+# Đường dẫn rút gọn theo thư mục gốc dài nhất chứa file: repo, stdlib, site-packages
+_PREFIXES = sorted({ROOT, *(sysconfig.get_paths()[key] for key in ("stdlib", "purelib", "platlib"))},
+                   key=len, reverse=True)
+_labels: Dict[Any, str] = {}
+
+
+def _short_path(filename: str) -> str:
+    for prefix in _PREFIXES:
+        if filename.startswith(prefix + os.sep):
+            return filename[len(prefix) + 1:]
+    return filename
+
+
+def _label(code) -> str:
+    label = _labels.get(code)
+    if label is None:
+        label = _labels[code] = f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+    return label
+
+
+def _stack(frame) -> Tuple[str, ...]:
+    """Các frame từ gốc tới lá"""
+    labels = []
+    while frame is not None:
+        labels.append(_label(frame.f_code))
+        frame = frame.f_back
+    return tuple(reversed(labels))
+
+
+def _where(frame, depth: int = 40) -> List[str]:
+    """Stack có số dòng hiện tại (phần gần lá nhất), dùng cho báo cáo loop bị chặn"""
+    lines = []
+    while frame is not None and len(lines) < depth:
+        lines.append(f"{frame.f_code.co_name} ({_short_path(frame.f_code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return lines
+
+
+class StackSampler:
+    """Lấy mẫu stack của mọi thread mỗi interval giây"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()  # (tên thread, stack) -> số mẫu
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    self.stacks[(names.get(ident, str(ident)), _stack(frame))] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        return "".join(f"{thread};{';'.join(stack)} {count}\n"
+                       for (thread, stack), count in sorted(self.stacks.items()))
+
+    def top_functions(self, thread_name: str, limit: int = 25) -> List[Dict[str, Any]]:
+        """Hàm có nhiều mẫu nhất trên một thread: self = đang ở lá, total = có mặt trong stack"""
+        own, total, samples = Counter(), Counter(), 0
+        for (thread, stack), count in self.stacks.items():
+            if thread != thread_name or not stack:
+                continue
+            samples += count
+            own[stack[-1]] += count
+            for label in set(stack):
+                total[label] += count
+        return [{"function": label, "self_pct": round(100 * count / samples, 1),
+                 "total_pct": round(100 * total[label] / samples, 1)}
+                for label, count in own.most_common(limit)] if samples else []
+
+
+class LoopLagMonitor:
+    """Độ trễ event loop: hẹn ngủ interval giây rồi đo thời gian thực tế vượt quá"""
+
+    def __init__(self, interval: float, threshold: float):
+        self.interval = interval
+        self.threshold = threshold
+        self.lag = Histogram()
+        self.stalls: List[Dict[str, Any]] = []
+        self._beat = time.monotonic()
+        self._stall_stack: Optional[List[str]] = None
+        self._loop_thread = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self):
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._stop.set()
+        self._watchdog.join()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = loop.time() + self.interval
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - scheduled)
+            self.lag.observe(lag)
+            if lag >= self.threshold:
+                self.stalls.append({
+                    "at": datetime.now().isoformat(timespec="seconds"),
+                    "lag_ms": round(lag * 1000, 1),
+                    "stack": self._stall_stack or [],
+                })
+            self._stall_stack = None
+
+    def _watch(self):
+        # Loop không cập nhật nhịp quá interval + threshold thì thread của loop đang bị chặn
+        while not self._stop.wait(self.threshold / 2):
+            if self._stall_stack is None and time.monotonic() - self._beat > self.interval + self.threshold:
+                frame = sys._current_frames().get(self._loop_thread)
+                if frame is not None:
+                    self._stall_stack = _where(frame)
+
+    def summary(self, limit: int = 20) -> Dict[str, Any]:
+        # Gộp các lần bị chặn theo frame gần lá nhất thuộc code của repo (src/...), vd: lời gọi
+        # requests.post trong llm_backends, để thấy chỗ nào chặn loop nhiều nhất
+        blockers: Dict[str, Dict[str, Any]] = {}
+        for stall in self.stalls:
+            stack = stall["stack"]
+            key = next((frame for frame in stack if f"(src{os.sep}" in frame), stack[0] if stack else
+                       "unknown (stall ended before watchdog sampled)")
+            entry = blockers.setdefault(key, {"where": key, "count": 0, "total_ms": 0.0, "stack": stack})
+            entry["count"] += 1
+            entry["total_ms"] = round(entry["total_ms"] + stall["lag_ms"], 1)
+        return {
+            "lag": self.lag.summary(),
+            "stalls": len(self.stalls),
+            "blockers": sorted(blockers.values(), key=lambda entry: -entry["total_ms"])[:limit],
+            "worst": sorted(self.stalls, key=lambda stall: -stall["lag_ms"])[:limit],
+        }
+
+
+class CrawlProfiler:
+    """
+    async with CrawlProfiler("mogi.vn", mode="sample") as profiler:
+        ...
+        profiler.extra["properties"] = len(properties)
+    Báo cáo được ghi khi thoát khối with; đường dẫn ở profiler.output_path.
+    mode: sample (sampler + flame graph), cprofile, hoặc none (chỉ loop lag + tracemalloc).
+    """
+
+    def __init__(self, name: str, mode: str = "sample", output_dir: str = None, config: Config = None):
+        self.config = config or Config()
+        self.name = name
+        self.mode = mode
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.output_path = os.path.join(output_dir or self.config.PROFILE_DIR, f"{name}-{stamp}")
+        self.extra: Dict[str, Any] = {}
+        self.sampler = StackSampler(self.config.PROFILE_SAMPLE_INTERVAL_MS / 1000) if mode == "sample" else None
+        self.cprofile = cProfile.Profile() if mode == "cprofile" else None
+        self.lag_monitor = LoopLagMonitor(self.config.PROFILE_LOOP_INTERVAL_MS / 1000,
+                                          self.config.PROFILE_LOOP_LAG_MS / 1000)
+        self.tracemalloc_frames = self.config.PROFILE_TRACEMALLOC_FRAMES
+        self._own_tracemalloc = False
+        self._snapshot = None
+        self._started = 0.0
+        self._cpu_started = 0.0
+
+    async def __aenter__(self):
+        if self.tracemalloc_frames > 0:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.tracemalloc_frames)
+                self._own_tracemalloc = True
+            tracemalloc.reset_peak()
+            self._snapshot = tracemalloc.take_snapshot()
+        self.lag_monitor.start()
+        if self.sampler:
+            self.sampler.start()
+        if self.cprofile:
+            self.cprofile.enable()
+        self._started = time.perf_counter()
+        self._cpu_started = time.process_time()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self._started
+        cpu = time.process_time() - self._cpu_started
+        if self.cprofile:
+            self.cprofile.disable()
+        if self.sampler:
+            self.sampler.stop()
+        await self.lag_monitor.stop()
+        memory = None
+        if self._snapshot is not None:
+            memory = self._memory_summary(tracemalloc.take_snapshot())
+            if self._own_tracemalloc:
+                tracemalloc.stop()
+        self.write(wall, cpu, memory)
+        return False
+
+    def _memory_summary(self, snapshot, limit: int = 25) -> Dict[str, Any]:
+        current, peak = tracemalloc.get_traced_memory()
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen *>")]
+        diff = snapshot.filter_traces(ignore).compare_to(self._snapshot.filter_traces(ignore), "lineno")
+        return {
+            "current_mb": round(current / 2 ** 20, 1),
+            "peak_mb": round(peak / 2 ** 20, 1),
+            "top_growth": [{
+                "where": f"{_short_path(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+                "size_diff_kb": round(stat.size_diff / 1024, 1),
+                "size_kb": round(stat.size / 1024, 1),
+                "count_diff": stat.count_diff,
+            } for stat in diff[:limit]],
+        }
+
+    def write(self, wall: float, cpu: float, memory: Optional[Dict[str, Any]]) -> str:
+        os.makedirs(self.output_path, exist_ok=True)
+        report: Dict[str, Any] = {
+            "name": self.name,
+            "mode": self.mode,
+            "wall_s": round(wall, 3),
+            "cpu_s": round(cpu, 3),
+            "loop": self.lag_monitor.summary(),
+            "memory": memory,
+            **self.extra,
+        }
+        if self.sampler:
+            with open(os.path.join(self.output_path, "stacks.folded"), "w", encoding="utf-8") as f:
+                f.write(self.sampler.folded())
+            report["samples"] = self.sampler.samples
+            # Event loop chạy trên MainThread; observer chặn I/O chạy ở thread của asyncio.to_thread
+            report["top_functions"] = self.sampler.top_functions("MainThread")
+        if self.cprofile:
+            self.cprofile.dump_stats(os.path.join(self.output_path, "cprofile.prof"))
+            stream = io.StringIO()
+            pstats.Stats(self.cprofile, stream=stream).sort_stats("cumulative").print_stats(40)
+            report["cprofile_top"] = stream.getvalue()
+
+        with open(os.path.join(self.output_path, "report.json"), "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+        with open(os.path.join(self.output_path, "report.txt"), "w", encoding="utf-8") as f:
+            f.write(format_report(report))
+        return self.output_path
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [f"Profile: {report['name']} (mode {report['mode']})",
+             f"Wall {report['wall_s']}s, CPU {report['cpu_s']}s"]
+    for key in ("properties", "status"):
+        if key in report:
+            lines.append(f"{key}: {report[key]}")
+
+    loop = report["loop"]
+    lag = loop["lag"]
+    lines += ["", "== Event loop lag ==",
+              f"samples {lag['count']}, p50 {lag['p50_ms']}ms, p95 {lag['p95_ms']}ms, "
+              f"p99 {lag['p99_ms']}ms, max {lag['max_ms']}ms, stalls {loop['stalls']}"]
+    for blocker in loop["blockers"]:
+        lines.append(f"  {blocker['total_ms']:>9.1f}ms {blocker['count']:>4}x  {blocker['where']}")
+        if blocker["stack"] and blocker["stack"][0] != blocker["where"]:
+            lines.append(f"{'':>22}in {blocker['stack'][0]}")
+
+    if report.get("top_functions"):
+        lines += ["", f"== Top functions on event loop thread ({report['samples']} samples) ==",
+                  f"{'self%':>7}{'total%':>8}  function"]
+        lines += [f"{row['self_pct']:>7}{row['total_pct']:>8}  {row['function']}" for row in report["top_functions"]]
+    if report.get("cprofile_top"):
+        lines += ["", "== cProfile (cumulative) ==", report["cprofile_top"]]
+
+    memory = report.get("memory")
+    if memory:
+        lines += ["", f"== Memory (tracemalloc): current {memory['current_mb']}MB, peak {memory['peak_mb']}MB ==",
+                  f"{'diff KB':>10}{'size KB':>10}{'count':>8}  where"]
+        lines += [f"{row['size_diff_kb']:>10}{row['size_kb']:>10}{row['count_diff']:>8}  {row['where']}"
+                  for row in memory["top_growth"]]
+
+    timings = report.get("timings")
+    if timings:
+        lines += ["", "== Crawl phases (CrawlStats.timings) ==",
+                  f"{'phase':<22}{'count':>8}{'total s':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}"]
+        for phase, row in timings.get("phases", {}).items():
+            lines.append(f"{phase:<22}{row['count']:>8}{row['total_s']:>10}{row['p50_ms']!s:>10}"
+                         f"{row['p95_ms']!s:>10}{row['max_ms']!s:>10}")
+        for counter, value in timings.get("counters", {}).items():
+            lines.append(f"{counter:<22}{value:>8}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,226 @@
+import mmap
+import os
+import struct
+import time
+from typing import Dict, Any, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: không khóa được, nhận slot trong lúc khởi động thường không tranh chấp
+    fcntl = None
+
+# Layout file: header + MAX_SLOTS slot cố định. Mỗi tiến trình (pid) crawl một site ghi vào slot
+# riêng của cặp (site, pid), nên mỗi slot chỉ có một writer dù nhiều tiến trình crawl shard của cùng site.
+# Mỗi slot có seq (seqlock): writer tăng seq lên số lẻ, ghi dữ liệu, rồi tăng lên số chẵn;
+# reader đọc lại nếu seq lẻ hoặc thay đổi trong lúc đọc.
+MAGIC = b"RECP"
+VERSION = 2
+MAX_SLOTS = 64
+HEADER = struct.Struct("<4sHH")
+SLOT = struct.Struct("<I48sB3xIIIIIIfddI")
+FILE_SIZE = HEADER.size + MAX_SLOTS * SLOT.size
+
+STATUSES = ["idle", "running", "completed", "failed"]
+COUNTERS = ["pages", "links", "extracted", "enriched", "saved", "failed"]
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # tồn tại nhưng không có quyền gửi signal
+    return True
+
+
+class ProgressStore:
+    """
+    Bộ đếm tiến độ theo site trên một file memory-mapped, dùng chung giữa các tiến trình.
+    Mỗi tiến trình crawl ghi slot (site, pid) của mình; API chỉ cần đọc file, không đụng tới crawler,
+    read_all() cộng các slot cùng site thuộc lần crawl gần nhất.
+    """
+
+    def __init__(self, path: str, sites: List[str], pid: int = None):
+        self.path = path
+        self.sites = set(sites)
+        self.pid = pid or os.getpid()
+        self._slots: Dict[str, int] = {}  # site -> slot của tiến trình này
+        self._file = None
+        self._mmap: Optional[mmap.mmap] = None
+
+    def _open(self, create: bool) -> bool:
+        if self._mmap is not None:
+            return True
+        if not os.path.exists(self.path):
+            if not create:
+                return False
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._init_file()
+        elif create and not self._valid_header():
+            self._init_file()  # file của phiên bản cũ (một slot mỗi site): tạo lại
+        if not self._valid_header():
+            return False
+        self._file = open(self.path, "r+b")
+        self._mmap = mmap.mmap(self._file.fileno(), FILE_SIZE)
+        return True
+
+    def _init_file(self):
+        with open(self.path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, MAX_SLOTS))
+            f.write(b"\x00" * (FILE_SIZE - HEADER.size))
+
+    def _valid_header(self) -> bool:
+        with open(self.path, "rb") as f:
+            header = f.read(HEADER.size)
+        if len(header) < HEADER.size or os.path.getsize(self.path) < FILE_SIZE:
+            return False
+        magic, version, _ = HEADER.unpack(header)
+        return magic == MAGIC and version == VERSION
+
+    def _offset(self, slot: int) -> int:
+        return HEADER.size + slot * SLOT.size
+
+    def _slot_for(self, site: str) -> int:
+        """Slot (site, pid) của tiến trình này; lần đầu thì nhận slot trống hoặc slot của tiến trình đã chết"""
+        slot = self._slots.get(site)
+        if slot is not None:
+            return slot
+        if fcntl:
+            fcntl.flock(self._file, fcntl.LOCK_EX)  # chỉ khóa khi nhận slot, không khóa khi ghi
+        try:
+            records = [(index, self._read_slot(index)) for index in range(MAX_SLOTS)]
+            slot = next((index for index, record in records
+                         if record and record["site"] == site and record["pid"] == self.pid), None)
+            if slot is None:
+                # record None: slot trống, hoặc đang bị ghi dở nên đọc không được -> kiểm tra tên trực tiếp
+                slot = next((index for index, record in records if record is None and self._is_free(index)), None)
+            if slot is None:
+                dead = [(record["updated_at"], index) for index, record in records
+                        if record and not _pid_alive(record["pid"])]
+                if not dead:
+                    raise RuntimeError(f"Progress store is full ({MAX_SLOTS} slots): {self.path}")
+                slot = min(dead)[1]
+            # Giữ chỗ ngay (trong lúc còn khóa) để tiến trình khác không nhận trùng
+            self._pack(slot, site, "idle", {}, 0.0, 0)
+        finally:
+            if fcntl:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._slots[site] = slot
+        return slot
+
+    def _is_free(self, slot: int) -> bool:
+        name_offset = self._offset(slot) + 4
+        return self._mmap[name_offset:name_offset + 48].strip(b"\x00") == b""
+
+    def write(self, site: str, status: str, counters: Dict[str, int], throughput: float, start_time: float):
+        """Ghi toàn bộ trạng thái của site trong tiến trình này (gọi theo lô, không phải mỗi sự kiện)"""
+        if site not in self.sites:
+            raise KeyError(f"Unknown site for progress store: {site}")
+        self._open(create=True)
+        self._pack(self._slot_for(site), site, status, counters, throughput, start_time)
+
+    def _pack(self, slot: int, site: str, status: str, counters: Dict[str, int], throughput: float,
+              start_time: float):
+        offset = self._offset(slot)
+        seq = struct.unpack_from("<I", self._mmap, offset)[0]
+        if seq % 2:
+            seq += 1  # writer trước bị dừng giữa chừng
+        struct.pack_into("<I", self._mmap, offset, seq + 1)
+        SLOT.pack_into(
+            self._mmap, offset,
+            seq + 1,
+            site.encode("utf-8")[:48],
+            STATUSES.index(status) if status in STATUSES else 0,
+            *(int(counters.get(name, 0)) for name in COUNTERS),
+            float(throughput),
+            float(start_time or 0),
+            time.time(),
+            self.pid
+        )
+        struct.pack_into("<I", self._mmap, offset, seq + 2)
+
+    def read_all(self) -> Dict[str, Dict[str, Any]]:
+        """Tiến độ theo site: cộng các slot (mỗi tiến trình một slot) của lần crawl gần nhất"""
+        if not self._open(create=False):
+            return {}
+        by_site: Dict[str, List[Dict[str, Any]]] = {}
+        for slot in range(MAX_SLOTS):
+            record = self._read_slot(slot)
+            if record:
+                by_site.setdefault(record["site"], []).append(record)
+        return {site: self._merge(self._latest_run(records)) for site, records in by_site.items()}
+
+    @staticmethod
+    def _latest_run(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Các slot thuộc lần crawl gần nhất: bắt đầu từ slot bắt đầu muộn nhất, thêm dần các slot
+        có khoảng [start_time, updated_at] chồng lên nhóm (shard của cùng lần crawl chạy song song);
+        slot của lần crawl trước đã xong trước khi lần này bắt đầu bị bỏ qua
+        """
+        def start(record):
+            return record["start_time"] or record["updated_at"]
+
+        rest = sorted(records, key=start, reverse=True)
+        run = [rest.pop(0)]
+        run_start = start(run[0])
+        changed = True
+        while changed:
+            changed = False
+            for record in list(rest):
+                if record["status"] == "running" or record["updated_at"] >= run_start:
+                    rest.remove(record)
+                    run.append(record)
+                    run_start = min(run_start, start(record))
+                    changed = True
+        return run
+
+    @staticmethod
+    def _merge(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        statuses = {record["status"] for record in records}
+        status = next((s for s in ("running", "failed", "completed") if s in statuses), "idle")
+        starts = [record["start_time"] for record in records if record["start_time"]]
+        # Đang chạy: chỉ cộng tốc độ của các tiến trình còn chạy
+        active = [record for record in records if record["status"] == "running"] or records
+        return {
+            "site": records[0]["site"],
+            "status": status,
+            **{name: sum(record[name] for record in records) for name in COUNTERS},
+            "throughput": round(sum(record["throughput"] for record in active), 3),
+            "start_time": min(starts) if starts else None,
+            "updated_at": max(record["updated_at"] for record in records),
+            "pids": sorted(record["pid"] for record in records),
+        }
+
+    def _read_slot(self, slot: int, retries: int = 10) -> Optional[Dict[str, Any]]:
+        offset = self._offset(slot)
+        for _ in range(retries):
+            values = SLOT.unpack_from(self._mmap, offset)
+            seq_after = struct.unpack_from("<I", self._mmap, offset)[0]
+            if values[0] % 2 == 0 and values[0] == seq_after:
+                break
+        else:
+            return None
+        (_, name, status, *rest) = values
+        name = name.rstrip(b"\x00").decode("utf-8", errors="ignore")
+        if not name:
+            return None
+        counters = dict(zip(COUNTERS, rest[:len(COUNTERS)]))
+        throughput, start_time, updated_at, pid = rest[len(COUNTERS):]
+        return {
+            "site": name,
+            "status": STATUSES[status] if status < len(STATUSES) else "idle",
+            **counters,
+            "throughput": round(throughput, 3),
+            "start_time": start_time or None,
+            "updated_at": updated_at,
+            "pid": pid
+        }
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -1,139 +1,219 @@
 import re
+import unicodedata
 from datetime import datetime, timedelta
-from typing import Optional
+from itertools import chain
+from typing import List, Optional
 
 
-def clean_text(text: str) -> str:
-    """Làm sạch text"""
+# Ký tự đặc biệt bị loại bỏ: mọi thứ ngoài chữ/số (\w đã gồm chữ có dấu), khoảng trắng và dấu câu thông dụng
+_DISALLOWED_CHARS_RE = re.compile(r'[^\w\s\-.,:;()\[\]{}!?@#$%^&*+=<>/\\|`~"\']+')
+
+
+def _build_fold_table() -> List[Optional[str]]:
+    """
+    Bảng tra cho str.translate, index là code point tới hết Latin Extended Additional.
+    Ký tự ngoài bảng (emoji, CJK...) được giữ nguyên vì translate bỏ qua IndexError.
+    """
+    table = [chr(cp) for cp in range(0x2000)]
+    for cp in chain(range(0xC0, 0x250), range(0x1EA0, 0x1F00)):
+        base = ''.join(ch for ch in unicodedata.normalize('NFD', chr(cp)) if unicodedata.category(ch) != 'Mn')
+        if base != chr(cp) and base.isascii() and base.isalpha():
+            table[cp] = base
+    table[ord('Đ')], table[ord('đ')] = 'D', 'd'
+    # Dấu tổ hợp rời (text dạng NFD)
+    for cp in range(0x300, 0x370):
+        table[cp] = None
+    return table
+
+
+_FOLD_TABLE = _build_fold_table()
+
+
+def clean_text(text: str, fold_accents: bool = False) -> str:
+    """Làm sạch text; fold_accents=True trả về bản không dấu (dùng cho so khớp, làm key)"""
     if not text:
         return None
 
-    # Loại bỏ khoảng trắng thừa
-    text = re.sub(r'\s+', ' ', text.strip())
+    # Loại bỏ ký tự đặc biệt rồi gộp khoảng trắng thừa
+    text = ' '.join(_DISALLOWED_CHARS_RE.sub('', text).split())
+    if fold_accents:
+        text = text.translate(_FOLD_TABLE)
+
+    return text
 
-    # Loại bỏ ký tự đặc biệt
-    text = re.sub(
-        r'[^\w\s\-.,:;()\[\]{}!?@#$%^&*+=<>/\\|`~"\'àáạảãâầấậẩẫăằắặẳẵèéẹẻẽêềếệểễìíịỉĩòóọỏõôồốộổỗơờớợởỡùúụủũưừứựửữỳýỵỷỹđ]',
-        '', text)
 
-    return text.strip()
+def strip_accents(text: str) -> str:
+    """Bỏ dấu tiếng Việt (giữ nguyên hoa/thường), dùng cho so khớp không dấu"""
+    if not text:
+        return text
+    return text.translate(_FOLD_TABLE)
+
+
+# ---------------------------------------------------------------------------
+# Parser số + đơn vị (giá, diện tích): biên dịch sẵn, quét text một lần
+# ---------------------------------------------------------------------------
+
+_BILLION, _MILLION, _THOUSAND, _AREA = 'ty', 'trieu', 'nghin', 'm2'
+_PRICE_MULTIPLIERS = {_BILLION: 1_000_000_000, _MILLION: 1_000_000, _THOUSAND: 1_000}
+
+_QUANTITY_RE = re.compile(
+    r'(?P<num>\d+(?:[.,]\d+)*)\s*'
+    r'(?:(?P<ty>t[ỷy])'
+    r'|(?P<trieu>triệu|trieu|tr(?![^\W\d_]))'  # "tr" viết tắt, không phải đầu từ (trệt, trường...)
+    r'|(?P<nghin>nghìn|ngàn|nghin|ngan|k(?![a-zàáạảãâầấậẩẫăằắặẳẵèéẹẻẽêềếệểễìíịỉĩòóọỏõôồốộổỗơờớợởỡùúụủũưừứựửữỳýỵỷỹđ]))'
+    r'|(?P<m2>m[²2]|m\s*2|mét\s*vuông|met\s*vuong))?'
+    r'(?:\s*/\s*(?P<per>tháng|thang|năm|nam|m[²2]))?'
+)
+_UNIT_GROUPS = (_BILLION, _MILLION, _THOUSAND, _AREA)
+_AREA_RE = re.compile(r'(\d+(?:[.,]\d+)?)\s*(?:m[²2]|m\s*2|mét\s*vuông|met\s*vuong)')
+
+
+def _to_number(raw: str, has_unit: bool) -> float:
+    """
+    '3,5' / '3.5' -> 3.5; '1.200.000' -> 1200000.
+    Một dấu phân cách + đúng 3 chữ số và không có đơn vị được coi là phân cách hàng nghìn.
+    """
+    if raw.isdigit():
+        return float(raw)
+    parts = raw.replace(',', '.').split('.')
+    if len(parts) > 2 or (not has_unit and len(parts[1]) == 3):
+        if all(len(part) == 3 for part in parts[1:]):
+            return float(''.join(parts))
+    return float(f"{parts[0]}.{parts[1]}")
+
+
+def _scan_quantities(text: str):
+    """Trả về list (giá trị, đơn vị, per) cho mọi cụm số trong text (đã lower)"""
+    tokens = []
+    for match in _QUANTITY_RE.finditer(text):
+        unit = None
+        for name in _UNIT_GROUPS:
+            if match.group(name):
+                unit = name
+                break
+        tokens.append((_to_number(match.group('num'), unit is not None), unit, match.group('per')))
+    return tokens
+
+
+def _price_from_tokens(tokens) -> Optional[float]:
+    # Dạng "x tỷ y triệu": cộng lần xuất hiện đầu tiên của mỗi đơn vị giá
+    seen = {}
+    for value, unit, _ in tokens:
+        if unit in _PRICE_MULTIPLIERS and unit not in seen:
+            seen[unit] = value * _PRICE_MULTIPLIERS[unit]
+    if seen:
+        total = sum(seen.values())
+        if total > 0:
+            return total
+    # Không có đơn vị giá: lấy số đầu tiên
+    return tokens[0][0] if tokens else None
+
+
+def parse_quantities(text: str) -> dict:
+    """
+    Quét text một lần, trả về {'price', 'unit_price', 'area', 'per_month'}.
+    Hỗ trợ "12 tỷ 500 triệu", "3,5 tỷ", "40 triệu/tháng", "85 triệu/m²", "120 m²", ...
+    """
+    result = {'price': None, 'unit_price': None, 'area': None, 'per_month': False}
+    if not text:
+        return result
+    tokens = _scan_quantities(text.lower())
+    price_tokens = []
+    unit_price_tokens = []
+    for token in tokens:
+        value, unit, per = token
+        if unit == _AREA:
+            if result['area'] is None:
+                result['area'] = value
+        elif per in ('m²', 'm2'):
+            unit_price_tokens.append(token)
+        else:
+            price_tokens.append(token)
+            if per in ('tháng', 'thang') and unit in _PRICE_MULTIPLIERS:
+                result['per_month'] = True
+    if unit_price_tokens:
+        result['unit_price'] = _price_from_tokens(unit_price_tokens)
+    if any(unit in _PRICE_MULTIPLIERS for _, unit, _ in price_tokens):
+        result['price'] = _price_from_tokens(price_tokens)
+    return result
+
+
+def parse_many(texts) -> list:
+    """Bản batch của parse_quantities cho một list text"""
+    parse = parse_quantities
+    return [parse(text) for text in texts]
 
 
 def extract_price(text: str) -> Optional[float]:
     """Trích xuất giá từ text (VND), hỗ trợ cả dạng '12 tỷ 500 triệu'."""
     if not text:
         return None
-
-    text = text.lower().replace(',', '.').replace('  ', ' ')
-    total = 0
-
-    # Xử lý dạng "x tỷ y triệu"
-    ty_match = re.search(r'(\d+(?:[.,]\d+)?)\s*t[ỷy]', text)
-    trieu_match = re.search(r'(\d+(?:[.,]\d+)?)\s*triệu', text)
-    nghin_match = re.search(r'(\d+(?:[.,]\d+)?)\s*(nghìn|ngàn|k)', text)
-
-    if ty_match:
-        ty = float(ty_match.group(1).replace(',', '.'))
-        total += ty * 1_000_000_000
-    if trieu_match:
-        trieu = float(trieu_match.group(1).replace(',', '.'))
-        total += trieu * 1_000_000
-    if nghin_match:
-        nghin = float(nghin_match.group(1).replace(',', '.'))
-        total += nghin * 1_000
-
-    # Nếu có dạng "x tỷ y triệu" thì trả về luôn
-    if total > 0:
-        return total
-
-    # Nếu không, fallback về các pattern cũ
-    patterns = [
-        (r'(\d+)[,\.](\d+)\s*tỷ', 1_000_000_000),
-        (r'(\d+)[,\.](\d+)\s*ty', 1_000_000_000),
-        (r'(\d+)\s*tỷ', 1_000_000_000),
-        (r'(\d+)\s*ty', 1_000_000_000),
-        (r'(\d+)[,\.](\d+)\s*triệu', 1_000_000),
-        (r'(\d+)[,\.](\d+)\s*tr(?![aăâ])', 1_000_000),
-        (r'(\d+)\s*triệu', 1_000_000),
-        (r'(\d+)\s*tr(?![aăâ])', 1_000_000),
-        (r'(\d+)[,\.](\d+)\s*nghìn', 1_000),
-        (r'(\d+)[,\.](\d+)\s*ngàn', 1_000),
-        (r'(\d+)[,\.](\d+)\s*k', 1_000),
-        (r'(\d+)\s*nghìn', 1_000),
-        (r'(\d+)\s*ngàn', 1_000),
-        (r'(\d+)\s*k', 1_000),
-        (r'(\d+(?:\d{3})*)', 1),
-    ]
-
-    for pattern, multiplier in patterns:
-        match = re.search(pattern, text)
-        if match:
-            try:
-                if len(match.groups()) == 2:
-                    integer_part = int(match.group(1))
-                    decimal_part = int(match.group(2))
-                    if decimal_part < 10:
-                        value = integer_part + decimal_part / 10.0
-                    else:
-                        value = integer_part + decimal_part / 100.0
-                else:
-                    value = float(match.group(1))
-                return value * multiplier
-            except (ValueError, IndexError):
-                continue
-
-    return None
+    return _price_from_tokens(_scan_quantities(text.lower()))
 
 
 def extract_area(text: str) -> Optional[float]:
     """Trích xuất diện tích từ text (m²)"""
     if not text:
         return None
+    match = _AREA_RE.search(text.lower())
+    return _to_number(match.group(1), True) if match else None
 
-    text = text.lower().replace(',', '.')
 
-    patterns = [
-        r'(\d+(?:\.\d+)?)\s*m[²2]',
-        r'(\d+(?:\.\d+)?)\s*m\s*2',
-        r'(\d+(?:\.\d+)?)\s*mét\s*vuông',
-        r'(\d+(?:\.\d+)?)\s*met\s*vuong'
-    ]
+# Số VN: tiền tố 0 / 84 / +84 rồi 9-10 chữ số, cho phép dấu cách, chấm, gạch ngang xen giữa
+_PHONE_RE = re.compile(r'(?<!\d)(?:\+?84|0)(?:[\s.\-]?\d){8,10}(?!\d)')
+# Số quốc gia (bỏ 0 đầu): di động 9 chữ số đầu 3/5/7/8/9, cố định 10 chữ số đầu 2
+_NATIONAL_PHONE_RE = re.compile(r'(?:[35789]\d{8}|2\d{9})')
 
-    for pattern in patterns:
-        match = re.search(pattern, text)
-        if match:
-            return float(match.group(1))
 
-    return None
+def normalize_phone(raw: str) -> Optional[str]:
+    """Chuẩn hóa số điện thoại VN về E.164 (+84xxxxxxxxx); không hợp lệ thì trả None"""
+    if not raw:
+        return None
+    digits = re.sub(r'\D', '', raw)
+    if digits.startswith('84') and len(digits) in (11, 12, 13):
+        national = digits[2:]
+        if national.startswith('0'):
+            national = national[1:]  # +84 0909... (viết thừa số 0)
+    elif digits.startswith('0'):
+        national = digits[1:]
+    else:
+        national = digits
+    if not _NATIONAL_PHONE_RE.fullmatch(national):
+        return None
+    return '+84' + national
 
 
 def extract_phone(text: str) -> Optional[str]:
-    """Trích xuất số điện thoại từ text"""
+    """Trích xuất số điện thoại hợp lệ đầu tiên từ text, dạng E.164"""
     if not text:
         return None
 
-    # Loại bỏ khoảng trắng và dấu
-    text = re.sub(r'[\s\-.]', '', text)
+    for match in _PHONE_RE.finditer(text):
+        phone = normalize_phone(match.group(0))
+        if phone:
+            return phone
+    return None
+
 
-    # Pattern cho số điện thoại VN
-    patterns = [
-        r'(0\d{9,10})',  # 0xxxxxxxxx
-        r'(\+84\d{9,10})',  # +84xxxxxxxxx
-        r'(84\d{9,10})',  # 84xxxxxxxxx
-    ]
+# Pattern theo thứ tự ưu tiên; kết quả lấy match có ưu tiên cao nhất (rồi tới vị trí sớm nhất)
+_ROOMS_RE = re.compile(
+    r'(\d+)\s*(?:(?P<r0>phòng\s*ngủ)|(?P<r1>pn\b)|(?P<r2>bed(?:room)?\b)|(?P<r3> ngủ\b)|(?P<r4>pn)|(?P<r5>phòng))'
+)
+_BATHROOMS_RE = re.compile(
+    r'(\d+)\s*(?:(?P<b0>phòng)|(?P<b1>wc\b)|(?P<b2>toilet\b)|(?P<b3>bath(?:room)?\b)|(?P<b4>tắm\b)'
+    r'|(?P<b5>vệ\s*sinh\b)|(?P<b6>wc))'
+)
 
-    for pattern in patterns:
-        match = re.search(pattern, text)
-        if match:
-            phone = match.group(1)
-            # Chuẩn hóa về định dạng 0xxxxxxxxx
-            if phone.startswith('+84'):
-                phone = '0' + phone[3:]
-            elif phone.startswith('84'):
-                phone = '0' + phone[2:]
-            return phone
 
-    return None
+def _first_by_priority(pattern: re.Pattern, text: str) -> Optional[int]:
+    best_value, best_priority = None, None
+    for match in pattern.finditer(text):
+        priority = match.lastindex
+        if best_priority is None or priority < best_priority:
+            best_value, best_priority = match.group(1), priority
+            if priority == 2:  # nhóm ưu tiên cao nhất
+                break
+    return int(best_value) if best_value is not None else None
 
 
 def extract_rooms(text: str) -> Optional[int]:
@@ -142,21 +222,9 @@ def extract_rooms(text: str) -> Optional[int]:
         return None
 
     text = text.lower()
-
-    patterns = [
-        r'(\d+)\s*phòng\s*ngủ',
-        r'(\d+)\s*pn\b',
-        r'(\d+)\s*bed(room)?\b',
-        r'(\d+)\s*bed\b',
-        r'(\d+)\s* ngủ\b',
-        r'(\d+)\s*pn',  # 2pn, 3pn không dấu cách
-        r'(\d+)\s*phòng',
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, text)
-        if match:
-            return int(match.group(1))
+    value = _first_by_priority(_ROOMS_RE, text)
+    if value is not None:
+        return value
 
     # Nếu chỉ là số, ví dụ "2", "3"
     if text.strip().isdigit():
@@ -171,23 +239,9 @@ def extract_bathrooms(text: str) -> Optional[int]:
         return None
 
     text = text.lower()
-
-    patterns = [
-        r'(\d+)\s*phòng',
-        r'(\d+)\s*phòng\s*tắm',
-        r'(\d+)\s*phòng\s*vệ\s*sinh',
-        r'(\d+)\s*wc\b',
-        r'(\d+)\s*toilet\b',
-        r'(\d+)\s*bath(room)?\b',
-        r'(\d+)\s*tắm\b',
-        r'(\d+)\s*vệ\s*sinh\b',
-        r'(\d+)\s*wc',  # 2wc, 3wc không dấu cách
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, text)
-        if match:
-            return int(match.group(1))
+    value = _first_by_priority(_BATHROOMS_RE, text)
+    if value is not None:
+        return value
 
     # Nếu chỉ là số, ví dụ "1", "2"
     if text.strip().isdigit():
@@ -279,10 +333,16 @@ def extract_frontage(text: str) -> Optional[float]:
 
 
 def extract_city_from_address(text: str) -> str:
-    """Extract city name from address (after last comma, clean format)"""
+    """Extract city name from address (gazetteer, fallback: clean part after last comma)"""
     if not text:
         return None
 
+    from src.utils.gazetteer import resolve_address
+
+    city = resolve_address(text)["city"]
+    if city:
+        return city
+
     # Split by comma and get the last part
     parts = text.split(',')
     if len(parts) >= 2:
@@ -293,47 +353,28 @@ def extract_city_from_address(text: str) -> str:
     # Clean city name - remove prefixes like TP, Thành phố, Tỉnh, etc.
     city_part = re.sub(r'^(TP\.?\s*|Thành phố\s*|Tỉnh\s*|Huyện\s*)', '', city_part, flags=re.IGNORECASE)
 
-    # Specific handling for common Vietnamese cities
-    city_mapping = {
-        'Hồ Chí Minh': 'Hồ Chí Minh',
-        'HCM': 'Hồ Chí Minh',
-        'TPHCM': 'Hồ Chí Minh',
-        'Ho Chi Minh': 'Hồ Chí Minh',
-        'Sai Gon': 'Hồ Chí Minh',
-        'Sài Gòn': 'Hồ Chí Minh',
-        'Hà Nội': 'Hà Nội',
-        'Ha Noi': 'Hà Nội',
-        'Hanoi': 'Hà Nội',
-        'Đà Nẵng': 'Đà Nẵng',
-        'Da Nang': 'Đà Nẵng',
-        'Danang': 'Đà Nẵng',
-        'Hải Phòng': 'Hải Phòng',
-        'Hai Phong': 'Hải Phòng',
-        'Cần Thơ': 'Cần Thơ',
-        'Can Tho': 'Cần Thơ',
-        'Biên Hòa': 'Biên Hòa',
-        'Bien Hoa': 'Biên Hòa',
-        'Nha Trang': 'Nha Trang',
-        'Vũng Tàu': 'Vũng Tàu',
-        'Vung Tau': 'Vũng Tàu',
-        'Huế': 'Huế',
-        'Hue': 'Huế'
-    }
-
-    # Check exact matches first
-    for key, value in city_mapping.items():
-        if key.lower() in city_part.lower():
-            return value
-
-    # If no exact match, clean and return the city part
-    city_part = city_part.strip()
-
     # Remove any remaining prefixes/suffixes
     city_part = re.sub(r'(việt nam|vietnam|vn)$', '', city_part, flags=re.IGNORECASE).strip()
 
     return city_part if city_part else None
 
 
+PROPERTY_TYPES = ["căn hộ", "nhà phố", "đất nền", "biệt thự", "shophouse", "kho xưởng"]
+
+
+def normalize_property_type(value: str, default: Optional[str] = None) -> Optional[str]:
+    """Chuẩn hóa loại hình về một trong PROPERTY_TYPES; không khớp thì trả default"""
+    if not value:
+        return None
+    value = str(value).strip().lower()
+    if value in PROPERTY_TYPES:
+        return value
+    for allowed_type in PROPERTY_TYPES:
+        if allowed_type in value or value in allowed_type:
+            return allowed_type
+    return default
+
+
 def is_valid_url(url: str) -> bool:
     """Kiểm tra URL hợp lệ"""
     if not url:
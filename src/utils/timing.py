@@ -0,0 +1,142 @@
+"""
+Đo thời gian theo pha của một lần crawl (fetch, parse, DB, LLM...) với chi phí rất nhỏ:
+mỗi mẫu chỉ tăng một bucket của histogram cố định, không giữ danh sách mẫu.
+
+Repository, LLMService, observer không giữ tham chiếu tới crawler nên ghi theo source:
+crawler gọi start_run(source) khi bắt đầu, CrawlPipeline gọi finish_run(source) sau khi drain
+rồi lưu summary() vào CrawlStats.timings. Ghi vào source không có run đang mở thì bỏ qua
+(histogram Prometheus crawler_phase_seconds vẫn được ghi).
+"""
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from src.utils import metrics
+
+# Biên trên của bucket (giây), tăng ×1.25 từ 0.1ms tới ~10 phút; percentile nội suy trong bucket
+_BOUNDS = [1e-4 * 1.25 ** i for i in range(70)]
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Giá trị ở percentile q, nội suy tuyến tính trong bucket chứa mẫu thứ q"""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(q * self.count))
+        cumulative = 0
+        for index, bucket in enumerate(self.counts):
+            if cumulative + bucket >= rank:
+                lower = _BOUNDS[index - 1] if index > 0 else 0.0
+                upper = _BOUNDS[index] if index < len(_BOUNDS) else self.max
+                return min(lower + (upper - lower) * (rank - cumulative) / bucket, self.max)
+            cumulative += bucket
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        def ms(value):
+            return round(value * 1000, 2) if value is not None else None
+
+        return {
+            "count": self.count,
+            "total_s": round(self.total, 3),
+            "mean_ms": ms(self.total / self.count) if self.count else None,
+            "p50_ms": ms(self.percentile(0.50)),
+            "p95_ms": ms(self.percentile(0.95)),
+            "p99_ms": ms(self.percentile(0.99)),
+            "max_ms": ms(self.max),
+        }
+
+
+class PhaseTimings:
+    """Histogram theo pha + bộ đếm (bytes tải về, số round-trip DB, token LLM...) của một lần crawl"""
+
+    def __init__(self):
+        self.phases: Dict[str, Histogram] = {}
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()  # observer chặn I/O ghi từ thread
+
+    def observe(self, phase: str, seconds: float):
+        with self._lock:
+            histogram = self.phases.get(phase)
+            if histogram is None:
+                histogram = self.phases[phase] = Histogram()
+            histogram.observe(seconds)
+
+    def count(self, counter: str, amount: int = 1):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    @contextmanager
+    def timer(self, phase: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(phase, time.perf_counter() - start)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "phases": {phase: histogram.summary() for phase, histogram in sorted(self.phases.items())},
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+
+_runs: Dict[str, PhaseTimings] = {}
+
+
+def start_run(source: str) -> PhaseTimings:
+    run = _runs[source] = PhaseTimings()
+    return run
+
+
+def get_run(source: str) -> Optional[PhaseTimings]:
+    return _runs.get(source)
+
+
+def finish_run(source: str) -> Optional[PhaseTimings]:
+    return _runs.pop(source, None)
+
+
+def observe(source: str, phase: str, seconds: float):
+    metrics.observe(metrics.PHASE_SECONDS, seconds, source, phase)
+    run = _runs.get(source)
+    if run is not None:
+        run.observe(phase, seconds)
+
+
+def count(source: str, counter: str, amount: int = 1):
+    run = _runs.get(source)
+    if run is not None:
+        run.count(counter, amount)
+
+
+@contextmanager
+def timed(source: str, phase: str):
+    run = _runs.get(source)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.observe(metrics.PHASE_SECONDS, elapsed, source, phase)
+        if run is not None:
+            run.observe(phase, elapsed)
@@ -0,0 +1,61 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import mongomock
+import pytest
+
+from src.crawlers.base.shards import Shard
+from src.data.database.connection import db
+from src.data.repositories.CrawlJobRepository import CrawlJobRepository, FAILED, PENDING, RUNNING
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    # Node chạy giờ Việt Nam (UTC+7): mốc thời gian vẫn phải là UTC
+    monkeypatch.setenv("TZ", "Asia/Ho_Chi_Minh")
+    time.tzset()
+    monkeypatch.setattr(db, "db", mongomock.MongoClient(tz_aware=True).real_estate_db)
+    monkeypatch.setattr(db, "connected", True)
+    yield db.db.crawl_jobs
+    monkeypatch.delenv("TZ")
+    time.tzset()
+
+
+def enqueue_one(max_attempts=3):
+    CrawlJobRepository.enqueue("site", [Shard(search_url="https://example.vn/s", first_page=1, last_page=5)],
+                               max_attempts=max_attempts)
+
+
+def test_lease_timestamps_are_utc(jobs):
+    enqueue_one()
+    job = CrawlJobRepository.claim("worker-a", lease_seconds=60)
+    now = datetime.now(timezone.utc)
+    assert abs(job["lease_expires_at"] - (now + timedelta(seconds=60))) < timedelta(seconds=5)
+    assert abs(job["created_at"] - now) < timedelta(seconds=5)
+    # Lease còn hạn: node khác không claim được, reap không đụng tới
+    assert CrawlJobRepository.claim("worker-b", lease_seconds=60) is None
+    assert CrawlJobRepository.reap_expired() == 0
+    assert CrawlJobRepository.heartbeat(job["_id"], "worker-a", 60) is not None
+
+
+def test_expired_lease_is_reclaimed_then_reaped(jobs):
+    enqueue_one(max_attempts=2)
+    job = CrawlJobRepository.claim("worker-a", lease_seconds=60)
+    jobs.update_one({"_id": job["_id"]},
+                    {"$set": {"lease_expires_at": datetime.now(timezone.utc) - timedelta(seconds=1)}})
+
+    reclaimed = CrawlJobRepository.claim("worker-b", lease_seconds=60)
+    assert reclaimed["_id"] == job["_id"] and reclaimed["status"] == RUNNING and reclaimed["attempts"] == 2
+    assert CrawlJobRepository.heartbeat(job["_id"], "worker-a", 60) is None  # worker-a đã mất lease
+
+    jobs.update_one({"_id": job["_id"]},
+                    {"$set": {"lease_expires_at": datetime.now(timezone.utc) - timedelta(seconds=1)}})
+    assert CrawlJobRepository.reap_expired() == 1
+    assert jobs.find_one({"_id": job["_id"]})["status"] == FAILED
+
+
+def test_failed_job_goes_back_to_pending(jobs):
+    enqueue_one()
+    job = CrawlJobRepository.claim("worker-a", lease_seconds=60)
+    assert CrawlJobRepository.fail(job, "worker-a", "boom")
+    assert jobs.find_one({"_id": job["_id"]})["status"] == PENDING
@@ -0,0 +1,91 @@
+import queue
+
+import pytest
+
+from src.services import crawl_worker_pool
+from src.services.crawl_worker_pool import CrawlWorkerPool, FAILED, QUEUED, RUNNING, _JobStopSignal
+
+
+class FakeProcess:
+    def __init__(self, index):
+        self.index = index
+        self.exitcode = None
+        self.pid = 1000 + index
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(crawl_worker_pool.metrics, "mark_process_dead", lambda pid: None)
+    pool = CrawlWorkerPool(num_workers=2)
+    pool.config.WEBSITES = {"site_a": {}, "site_b": {}}
+    pool.spawned = []
+
+    def spawn(index):
+        process = FakeProcess(index)
+        pool.spawned.append(process)
+        return process
+
+    pool._spawn = spawn
+    pool._jobs_queue = queue.Queue()
+    pool._stop_jobs = [pool._ctx.Value("q", 0) for _ in range(2)]
+    pool._processes = [spawn(0), spawn(1)]
+    return pool
+
+
+def start_on(pool, job_id, worker):
+    pool._handle(("started", job_id, worker, None))
+
+
+def test_dead_worker_fails_its_job_and_is_respawned(pool):
+    first = pool.submit("site_a")
+    second = pool.submit("site_b")
+    start_on(pool, first, 0)
+    start_on(pool, second, 1)
+    pool._handle(("ready", None, 0, None))
+
+    pool._processes[0].exitcode = -9  # bị OOM killer giết
+    pool._supervise()
+
+    jobs = {job["id"]: job for job in pool.status()}
+    assert jobs[first]["status"] == FAILED and "exit code -9" in jobs[first]["error"]
+    assert jobs[second]["status"] == RUNNING
+    assert pool._processes[0] is pool.spawned[-1] and pool._processes[0].exitcode is None
+    assert 0 not in pool.ready_workers
+    # Site không còn bị coi là bận: submit lại tạo job mới
+    assert pool.active_job("site_a") is None
+    assert pool.submit("site_a") != first
+
+
+def test_supervise_does_nothing_while_shutting_down(pool):
+    job_id = pool.submit("site_a")
+    start_on(pool, job_id, 0)
+    pool._processes[0].exitcode = 0
+    pool._closing = True
+    pool._supervise()
+    assert pool.status()[0]["status"] == RUNNING
+    assert len(pool.spawned) == 2
+
+
+def test_stale_cancel_does_not_stop_next_job_on_same_worker(pool):
+    first = pool.submit("site_a")
+    start_on(pool, first, 0)
+    # Worker đã xong job đầu nhưng message "finished" chưa được xử lý: cancel thấy RUNNING cũ
+    assert pool.cancel_job(first)
+    pool._handle(("finished", first, 0, {"status": "completed", "properties": 3, "error": None}))
+
+    second = pool.submit("site_b")
+    start_on(pool, second, 0)
+    assert _JobStopSignal(pool._stop_jobs[0], first).is_set()
+    assert not _JobStopSignal(pool._stop_jobs[0], second).is_set()
+
+    pool.cancel(["site_b"])
+    assert _JobStopSignal(pool._stop_jobs[0], second).is_set()
+
+
+def test_job_cancelled_while_queued_stops_when_started(pool):
+    job_id = pool.submit("site_a")
+    assert pool.status()[0]["status"] == QUEUED
+    assert pool.cancel() == ["site_a"]
+    assert not _JobStopSignal(pool._stop_jobs[1], job_id).is_set()
+    start_on(pool, job_id, 1)
+    assert _JobStopSignal(pool._stop_jobs[1], job_id).is_set()
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+
+from src.data.database.connection import db
+from src.services.dedup_service import DedupService
+
+DESCRIPTION = (
+    "Bán căn hộ chung cư cao cấp tại trung tâm quận 7, diện tích 80m2 gồm 2 phòng ngủ 2 phòng tắm, "
+    "ban công hướng đông nam view sông thoáng mát, nội thất đầy đủ cao cấp, sổ hồng chính chủ sang tên ngay, "
+    "gần trường học chợ siêu thị và bệnh viện, an ninh 24/24, hồ bơi phòng gym miễn phí cho cư dân"
+)
+OTHER = (
+    "Cho thuê kho xưởng mặt tiền đường lớn huyện Bình Chánh, xe container vào tận nơi, điện ba pha, "
+    "có văn phòng và nhà nghỉ cho công nhân, hợp đồng dài hạn, giá thương lượng cho khách thiện chí"
+)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(db, "db", mongomock.MongoClient().real_estate_db)
+    monkeypatch.setattr(db, "connected", True)
+    return DedupService(num_perm=64, bands=16, threshold=0.6)
+
+
+def save(link, description, price=3e9, area=80, **extra):
+    doc = {"link": link, "title": "Bán căn hộ Quận 7", "description": description, "price": price, "area": area,
+           **extra}
+    doc["_id"] = db.db.properties.insert_one(doc).inserted_id
+    return doc
+
+
+def test_signature_similarity(service):
+    base = {"title": "Bán căn hộ", "description": DESCRIPTION, "price": 3e9, "area": 80}
+    reposted = {**base, "description": DESCRIPTION.replace("hướng đông nam", "hướng tây bắc") + ", liên hệ ngay"}
+    signature = service.signature(base)
+    assert signature.shape == (64,) and len(service.band_keys(signature)) == 16
+    assert (service.signature(dict(base)) == signature).all()  # tất định
+    assert service.similarity(signature, service.signature(reposted)) >= 0.6
+    assert service.similarity(signature, service.signature({"description": OTHER})) < 0.3
+    assert service.signature({"title": "", "description": None}) is None
+
+
+def test_assign_puts_near_duplicates_in_one_cluster(service):
+    first = save("https://a.vn/1", DESCRIPTION)
+    assert service.assign(first, str(first["_id"])) == str(first["_id"])
+
+    repost = save("https://b.vn/9", DESCRIPTION.replace("nội thất đầy đủ", "full nội thất"), price=3.05e9)
+    assert service.assign(repost, str(repost["_id"])) == str(first["_id"])
+
+    unrelated = save("https://a.vn/2", OTHER, price=30e6, area=500)
+    assert service.assign(unrelated, str(unrelated["_id"])) == str(unrelated["_id"])
+
+    # Cùng mô tả nhưng giá lệch xa (căn khác) không bị gộp
+    other_unit = save("https://a.vn/3", DESCRIPTION, price=6e9)
+    assert service.assign(other_unit, str(other_unit["_id"])) == str(other_unit["_id"])
+
+    stored = {doc["link"]: doc["cluster_id"] for doc in db.db.properties.find()}
+    assert stored["https://b.vn/9"] == stored["https://a.vn/1"]
+    assert len(set(stored.values())) == 3
+
+
+def test_assign_merges_clusters_into_smallest_id(service):
+    signature = service.signature({"title": "Bán căn hộ Quận 7", "description": DESCRIPTION, "price": 3e9, "area": 80})
+    lsh = {"minhash": signature.tobytes(), "lsh_bands": service.band_keys(signature)}
+    save("https://a.vn/1", DESCRIPTION, cluster_id="cluster-b", **lsh)
+    save("https://b.vn/1", DESCRIPTION, cluster_id="cluster-a", **lsh)
+    save("https://c.vn/1", DESCRIPTION, cluster_id="cluster-b", **lsh)
+
+    bridge = save("https://d.vn/1", DESCRIPTION)
+    assert service.assign(bridge, str(bridge["_id"])) == "cluster-a"
+    assert {doc["cluster_id"] for doc in db.db.properties.find()} == {"cluster-a"}
+
+
+def test_assign_bumps_updated_at_of_changed_documents(service):
+    old = datetime.now() - timedelta(days=1)
+    signature = service.signature({"title": "Bán căn hộ Quận 7", "description": DESCRIPTION, "price": 3e9, "area": 80})
+    lsh = {"minhash": signature.tobytes(), "lsh_bands": service.band_keys(signature)}
+    save("https://a.vn/1", DESCRIPTION, cluster_id="cluster-a", updated_at=old, **lsh)
+    save("https://b.vn/1", DESCRIPTION, cluster_id="cluster-b", updated_at=old, **lsh)
+    save("https://c.vn/1", OTHER, price=30e6, area=500, cluster_id="cluster-c", updated_at=old)
+
+    bridge = save("https://d.vn/1", DESCRIPTION, updated_at=old)
+    service.assign(bridge, str(bridge["_id"]))
+    # Export incremental lọc theo updated_at: tin mới và tin bị gộp cluster phải được xuất lại
+    updated = {doc["link"] for doc in db.db.properties.find({"updated_at": {"$gt": old}})}
+    assert updated == {"https://b.vn/1", "https://d.vn/1"}
+
+
+def test_backfill_clusters_with_union_find(service):
+    for i, (text, price) in enumerate([
+        (DESCRIPTION, 3e9), (OTHER, 30e6), (DESCRIPTION.replace("80m2", "82m2"), 3e9), (DESCRIPTION, 6e9),
+        (DESCRIPTION.replace("hồ bơi", "bể bơi"), 3.1e9),
+    ]):
+        save(f"https://x.vn/{i}", text, price=price)
+    assert service.backfill(dry_run=True) == {"scanned": 5, "clusters": 3, "duplicates": 2, "modified": 0}
+    assert db.db.properties.count_documents({"cluster_id": {"$exists": True}}) == 0
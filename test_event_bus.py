@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+
+from src.crawlers.base.event_bus import EventBus, EventSubscriber, ObserverAdapter, OverflowPolicy
+from src.crawlers.base.observer import CrawlerObserver, LoggingObserver
+
+
+class Recorder(EventSubscriber):
+    """Ghi lại sự kiện và cách giao (on_event / on_properties); gate chặn consumer để hàng đợi đầy"""
+
+    def __init__(self, lossy=False):
+        self.lossy = lossy
+        self.calls = []
+        self.gate = asyncio.Event()
+
+    async def on_event(self, event):
+        await self.gate.wait()
+        self.calls.append(("event", event.event_type, event.data))
+
+    async def on_properties(self, source, properties):
+        await self.gate.wait()
+        self.calls.append(("properties", source, list(properties)))
+
+
+def test_consecutive_properties_are_batched_per_source():
+    async def run():
+        bus = EventBus(buffer_size=50, batch_size=10)
+        recorder = Recorder()
+        recorder.gate.set()
+        bus.subscribe(recorder)
+        await bus.publish("crawl_started", "s", "a")
+        for i in range(3):
+            await bus.publish("property_extracted", i, "a")
+        await bus.publish("property_extracted", 9, "b")
+        await bus.publish("crawl_completed", "c", "a")
+        await bus.close()
+        return recorder.calls
+
+    assert asyncio.run(run()) == [
+        ("event", "crawl_started", "s"),
+        ("properties", "a", [0, 1, 2]),
+        ("properties", "b", [9]),
+        ("event", "crawl_completed", "c"),
+    ]
+
+
+def test_flush_waits_for_all_events():
+    async def run():
+        bus = EventBus(buffer_size=100, batch_size=3)
+        recorder = Recorder()
+        bus.subscribe(recorder)
+        for i in range(10):
+            await bus.publish("property_extracted", i, "a")
+        asyncio.get_running_loop().call_later(0.01, recorder.gate.set)
+        await bus.flush()
+        delivered = [item for _, _, items in recorder.calls for item in items]
+        await bus.close()
+        return delivered
+
+    assert asyncio.run(run()) == list(range(10))
+
+
+def run_overflow(policy, events):
+    """buffer 2, batch 1: consumer giữ sự kiện đầu (chặn ở gate), hàng đợi chứa 2 sự kiện kế tiếp"""
+
+    async def run():
+        bus = EventBus(buffer_size=2, batch_size=1, overflow=policy)
+        recorder = Recorder(lossy=True)
+        subscription = bus.subscribe(recorder)
+        published = []
+        for event_type, data in events:
+            task = asyncio.ensure_future(bus.publish(event_type, data, "a"))
+            await asyncio.sleep(0)
+            published.append(task)
+        blocked = sum(not task.done() for task in published)
+        recorder.gate.set()
+        await asyncio.gather(*published)
+        await bus.close()
+        return [call[2] for call in recorder.calls], subscription.dropped, blocked
+
+    return asyncio.run(run())
+
+
+def props(*items):
+    return [("property_extracted", item) for item in items]
+
+
+def test_block_policy_applies_backpressure_and_keeps_everything():
+    delivered, dropped, blocked = run_overflow(OverflowPolicy.BLOCK, props(1, 2, 3, 4, 5))
+    assert [item for batch in delivered for item in batch] == [1, 2, 3, 4, 5]
+    assert dropped == 0 and blocked == 2
+
+
+def test_drop_newest_discards_incoming_events():
+    delivered, dropped, blocked = run_overflow(OverflowPolicy.DROP_NEWEST, props(1, 2, 3, 4, 5))
+    assert [item for batch in delivered for item in batch] == [1, 2, 3]
+    assert dropped == 2 and blocked == 0
+
+
+def test_drop_oldest_discards_queued_events():
+    delivered, dropped, blocked = run_overflow(OverflowPolicy.DROP_OLDEST, props(1, 2, 3, 4, 5))
+    assert [item for batch in delivered for item in batch] == [1, 4, 5]
+    assert dropped == 2 and blocked == 0
+
+
+@pytest.mark.parametrize("policy", [OverflowPolicy.DROP_OLDEST, OverflowPolicy.DROP_NEWEST])
+def test_lifecycle_events_are_never_dropped(policy):
+    events = [("property_extracted", 1), ("crawl_started", "start"), ("property_extracted", 2),
+              ("property_extracted", 3), ("crawl_completed", "done")]
+    delivered, _, _ = run_overflow(policy, events)
+    assert "start" in delivered and "done" in delivered
+    assert delivered.index("start") < delivered.index("done")
+
+
+def test_drop_oldest_waits_when_queue_holds_only_lifecycle_events():
+    events = [("property_extracted", 1), ("crawl_started", "a"), ("crawl_completed", "b"), ("property_extracted", 2)]
+    delivered, dropped, blocked = run_overflow(OverflowPolicy.DROP_OLDEST, events)
+    assert delivered == [[1], "a", "b", [2]]
+    assert dropped == 0 and blocked == 1
+
+
+class SaveLike(CrawlerObserver):
+    def notify(self, event_type, data, source):
+        pass
+
+
+def test_data_observers_always_block():
+    bus = EventBus(overflow=OverflowPolicy.DROP_OLDEST)
+    assert bus.subscribe(ObserverAdapter(SaveLike())).overflow == OverflowPolicy.BLOCK
+    assert bus.subscribe(ObserverAdapter(LoggingObserver(None))).overflow == OverflowPolicy.DROP_OLDEST
+    with pytest.raises(ValueError):
+        bus.subscribe(ObserverAdapter(SaveLike()), overflow=OverflowPolicy.DROP_NEWEST)
@@ -0,0 +1,53 @@
+import csv
+import gzip
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+
+from src.data.database.connection import db
+from src.services.export_service import ExportService
+
+
+@pytest.fixture
+def service(monkeypatch):
+    database = mongomock.MongoClient().real_estate_db
+    monkeypatch.setattr(db, "db", database)
+    monkeypatch.setattr(db, "connected", True)
+    monkeypatch.setenv("EXPORT_WATERMARK_LAG", "60")
+    return ExportService(batch_size=2)
+
+
+def exported_links(service, tmp_path):
+    result = service.export(fmt="csv", output_dir=str(tmp_path), incremental=True)
+    with gzip.open(result["files"][0], "rt", encoding="utf-8") as f:
+        return [row["link"] for row in csv.DictReader(f)]
+
+
+def test_late_saved_rows_are_not_skipped(service, tmp_path):
+    now = datetime.now()
+    properties = db.db.properties
+    properties.insert_one({"link": "a", "crawled_at": now - timedelta(hours=2), "updated_at": now - timedelta(hours=2)})
+    properties.insert_one({"link": "b", "crawled_at": now - timedelta(hours=1), "updated_at": now - timedelta(hours=1)})
+    assert exported_links(service, tmp_path) == ["a", "b"]
+
+    # Crawl trước b nhưng chờ hàng đợi LLM, được ghi sau lần xuất trước
+    properties.insert_one({"link": "c", "crawled_at": now - timedelta(hours=3), "updated_at": now - timedelta(minutes=5)})
+    assert exported_links(service, tmp_path) == ["c"]
+    assert exported_links(service, tmp_path) == []
+
+
+def test_rows_written_within_lag_wait_for_next_export(service, tmp_path):
+    now = datetime.now()
+    db.db.properties.insert_one({"link": "recent", "crawled_at": now, "updated_at": now - timedelta(seconds=5)})
+    assert exported_links(service, tmp_path) == []
+    assert service.get_watermark("csv") is None
+
+
+def test_legacy_crawled_at_watermark_is_still_read(service):
+    mark = datetime(2026, 1, 1)
+    db.get_collection("export_watermarks").insert_one({"_id": "parquet", "crawled_at": mark})
+    assert service.get_watermark("parquet") == mark
+    service.set_watermark("parquet", mark + timedelta(days=1))
+    assert db.get_collection("export_watermarks").find_one({"_id": "parquet"}).get("crawled_at") is None
+    assert service.get_watermark("parquet") == mark + timedelta(days=1)
@@ -0,0 +1,47 @@
+import pytest
+
+from src.utils.gazetteer import Gazetteer, resolve_address
+from src.utils.text_processing import extract_city_from_address
+
+
+@pytest.mark.parametrize("address, city", [
+    ("Lộc Thọ, Nha Trang, Khánh Hòa", "Nha Trang"),
+    ("Nha Trang", "Nha Trang"),
+    ("Biên Hòa, Đồng Nai", "Biên Hòa"),
+    ("Đường Trần Phú, Vũng Tàu", "Vũng Tàu"),
+    ("Bà Rịa - Vũng Tàu", "Vũng Tàu"),
+    ("123 Lê Lợi, Sài Gòn", "Hồ Chí Minh"),
+    ("Cầu Giấy, Hanoi", "Hà Nội"),
+    ("Huế", "Huế"),
+])
+def test_city_keeps_legacy_mapping(address, city):
+    assert extract_city_from_address(address) == city
+
+
+def test_district_still_resolved_for_legacy_cities():
+    assert resolve_address("Lộc Thọ, Nha Trang, Khánh Hòa") == {
+        "city": "Nha Trang", "district": "Thành phố Nha Trang", "ward": None}
+
+
+def test_ward_from_prefix_only_without_ward_data():
+    gazetteer = Gazetteer()
+    gazetteer.add_builtin()
+    assert not gazetteer.has_wards
+    assert gazetteer.resolve("Phường 12, Quận 10, TP HCM")["ward"] == "Phường 12"
+    assert gazetteer.resolve("Lộc Thọ, Nha Trang")["ward"] is None
+
+    gated = Gazetteer(prefix_wards=False)
+    gated.add_builtin()
+    assert gated.resolve("Phường 12, Quận 10, TP HCM") == {"city": "Hồ Chí Minh", "district": "Quận 10", "ward": None}
+
+
+def test_ward_data_from_file(tmp_path):
+    path = tmp_path / "wards.json"
+    path.write_text('{"Khánh Hòa": {"districts": {"Thành phố Nha Trang": {"wards": ["Phường Lộc Thọ"]}}}}',
+                    encoding="utf-8")
+    gazetteer = Gazetteer()
+    gazetteer.add_builtin()
+    gazetteer.load_file(str(path))
+    assert gazetteer.has_wards
+    assert gazetteer.resolve("Lộc Thọ, Nha Trang") == {
+        "city": "Nha Trang", "district": "Thành phố Nha Trang", "ward": "Phường Lộc Thọ"}
@@ -0,0 +1,45 @@
+import mongomock
+import pytest
+
+import main
+from src.config.settings import config
+from src.data.database import indexes
+from src.data.database.connection import db
+from src.data.database.indexes import IndexManager, LEGACY_INDEXES
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = mongomock.MongoClient().real_estate_db
+    monkeypatch.setattr(db, "db", database)
+    monkeypatch.setattr(db, "connected", True)
+    monkeypatch.setattr(IndexManager, "usage", lambda self: [])  # mongomock không hỗ trợ $indexStats
+    properties = database.properties
+    for field in ["thanh_pho", "gia", "dien_tich", "loai_hinh"]:
+        properties.create_index(field)
+    properties.create_index([("source", 1), ("crawled_at", -1)])
+    properties.create_index([("city", 1), ("type", 1), ("price", 1)])
+    properties.create_index("ghi_chu")  # index lạ không có trong LEGACY_INDEXES
+    return database
+
+
+def test_action_indexes_drops_legacy_indexes(database, monkeypatch):
+    monkeypatch.setattr(config, "INDEX_DROP_STALE", False)
+    assert main.run_indexes()  # --action indexes
+    existing = database.properties.index_information()
+    assert not set(LEGACY_INDEXES["properties"]) & set(existing)
+    assert "ghi_chu_1" in existing  # index lạ chỉ bị xóa khi bật INDEX_DROP_STALE
+    for spec in indexes.RealEstateProperty.INDEXES:
+        assert indexes.index_name(spec["keys"]) in existing
+
+
+def test_drop_stale_also_drops_unknown_indexes(database, monkeypatch):
+    monkeypatch.setattr(config, "INDEX_DROP_STALE", True)
+    assert main.run_indexes()  # --action indexes
+    assert "ghi_chu_1" not in database.properties.index_information()
+
+
+def test_ensure_never_drops(database):
+    IndexManager(database).ensure()
+    existing = database.properties.index_information()
+    assert set(LEGACY_INDEXES["properties"]) <= set(existing)
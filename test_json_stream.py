@@ -0,0 +1,54 @@
+from src.utils.json_stream import JsonArrayStreamParser, parse_json_array
+
+
+def feed_chunks(text, size):
+    parser = JsonArrayStreamParser()
+    items = []
+    for i in range(0, len(text), size):
+        items.extend(parser.feed(text[i:i + size]))
+    return parser, items
+
+
+def test_complete_array_in_one_chunk():
+    assert parse_json_array('[{"id": "1", "price": 5}, {"id": "2"}]') == [{"id": "1", "price": 5}, {"id": "2"}]
+
+
+def test_items_emitted_as_soon_as_complete():
+    parser = JsonArrayStreamParser()
+    assert parser.feed('[{"id": "1", "legal": "sổ đỏ"}, {"id": "2", "ti') == [{"id": "1", "legal": "sổ đỏ"}]
+    assert parser.feed('tle": "a"}]') == [{"id": "2", "title": "a"}]
+    assert parser.finished
+
+
+def test_chunk_boundaries_do_not_change_result():
+    text = '```json\n[{"id": "1", "desc": "a, b [x] \\"q\\" }"}, {"id": "2", "n": [1, {"k": 2}]}]\n```'
+    expected = parse_json_array(text)
+    assert expected == [{"id": "1", "desc": 'a, b [x] "q" }'}, {"id": "2", "n": [1, {"k": 2}]}]
+    for size in (1, 2, 3, 7, 16):
+        assert feed_chunks(text, size)[1] == expected
+
+
+def test_truncated_stream_keeps_finished_items():
+    parser, items = feed_chunks('[{"id": "1"}, {"id": "2", "price": 12', 4)
+    assert items == [{"id": "1"}]
+    assert not parser.finished
+
+
+def test_invalid_element_is_skipped():
+    assert parse_json_array('[{"id": "1"}, {"id": 2,,}, {"id": "3"}]') == [{"id": "1"}, {"id": "3"}]
+
+
+def test_array_wrapped_in_object_and_bracket_in_string():
+    assert parse_json_array('{"note": "[not this]", "items": [{"id": "1"}]}') == [{"id": "1"}]
+
+
+def test_nothing_after_array_end():
+    parser = JsonArrayStreamParser()
+    assert parser.feed('[{"id": "1"}] [{"id": "2"}]') == [{"id": "1"}]
+    assert parser.feed('[{"id": "3"}]') == []
+
+
+def test_empty_and_missing_input():
+    assert parse_json_array('') == []
+    assert parse_json_array(None) == []
+    assert parse_json_array('[]') == []
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+from bson import ObjectId
+
+from src.data.database.connection import db
+from src.data.repositories.RealEstateRepository import RealEstateRepository
+
+
+@pytest.fixture
+def repo(monkeypatch):
+    database = mongomock.MongoClient().real_estate_db
+    monkeypatch.setattr(db, "db", database)
+    monkeypatch.setattr(db, "connected", True)
+    start = datetime(2026, 1, 1)
+    prices = [5e9, None, 3e9, 5e9, 2e9, None, 3e9, 7e9, 5e9, 1e9, 4e9]
+    database.properties.insert_many([
+        {"_id": ObjectId(), "link": f"https://example.vn/{i}", "city": "Hồ Chí Minh", "type": "căn hộ",
+         "source": "batdongsan" if i % 2 else "chotot", "price": price, "crawled_at": start + timedelta(hours=i % 4),
+         "description": "mô tả dài"}
+        for i, price in enumerate(prices)
+    ])
+    return RealEstateRepository()
+
+
+def fetch_all_pages(repo, query, limit, fields=None):
+    sort_key = repo.search_sort_key(query)
+    pages, after = [], None
+    while True:
+        page = list(repo.search(query, after=after, limit=limit, fields=fields))
+        pages.append(page)
+        if len(page) < limit:
+            return pages
+        cursor_key, value, last_id = repo.decode_cursor(repo.encode_cursor(page[-1], sort_key))
+        assert cursor_key == sort_key
+        after = (value, last_id)
+
+
+@pytest.mark.parametrize("query, sort_key", [
+    ({"city": "Hồ Chí Minh", "type": "căn hộ"}, "price"),
+    ({"source": "batdongsan"}, "crawled_at"),
+    ({"crawled_at": {"$gte": datetime(2026, 1, 1, 1)}}, "crawled_at"),
+    ({}, None),
+])
+@pytest.mark.parametrize("limit", [1, 2, 3, 20])
+def test_pages_cover_every_document_once_in_index_order(repo, query, sort_key, limit):
+    assert repo.search_sort_key(query) == sort_key
+    docs = [doc for page in fetch_all_pages(repo, query, limit) for doc in page]
+    expected = list(db.db.properties.find(query))
+    assert sorted(doc["_id"] for doc in docs) == sorted(doc["_id"] for doc in expected)
+
+    def order(doc):
+        value = doc.get(sort_key) if sort_key else None
+        return (value is not None, value or 0, doc["_id"])
+
+    assert docs == sorted(docs, key=order)
+
+
+def test_search_keeps_sort_field_in_projection(repo):
+    query = {"city": "Hồ Chí Minh"}
+    first = list(repo.search(query, limit=2, fields=["title"]))
+    assert all(set(doc) == {"_id", "price"} for doc in first)
+    assert "description" not in next(repo.search(query, limit=1))
+
+
+def test_cursor_round_trip_keeps_types():
+    last_id = ObjectId()
+    crawled_at = datetime(2026, 3, 4, 5, 6, 7)
+    token = RealEstateRepository.encode_cursor({"_id": last_id, "crawled_at": crawled_at}, "crawled_at")
+    assert RealEstateRepository.decode_cursor(token) == ("crawled_at", crawled_at, last_id)
+    assert RealEstateRepository.decode_cursor(RealEstateRepository.encode_cursor({"_id": last_id}, None)) == (
+        None, None, last_id)
+
+
+@pytest.mark.parametrize("token", ["", "not-a-cursor", str(ObjectId()), "eyJrIjogbnVsbH0"])
+def test_invalid_cursor(token):
+    with pytest.raises(ValueError):
+        RealEstateRepository.decode_cursor(token)
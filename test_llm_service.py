@@ -0,0 +1,115 @@
+import asyncio
+
+from src.data.models.RealEstateModel import RealEstateProperty
+from src.services.llm_service import LLMService
+
+
+def make_property(**fields):
+    return RealEstateProperty(link=fields.pop("link", "https://example.vn/1"), source="test", **fields)
+
+
+def test_null_values_do_not_clear_existing_data():
+    prop = make_property(title="Nhà phố Quận 7", price=5e9, area=80, legal="Sổ đỏ chính chủ")
+    LLMService()._update_properties_from_response([prop], [
+        {"id": str(prop.id), "title": None, "price": None, "area": None, "legal": None, "type": "nhà phố"}
+    ])
+    assert prop.title == "Nhà phố Quận 7"
+    assert prop.price == 5e9
+    assert prop.area == 80
+    assert prop.legal == "Sổ đỏ chính chủ"
+    assert prop.type == "nhà phố"
+
+
+def test_unparseable_values_are_skipped():
+    prop = make_property(price=3e9, bedroom=2)
+    LLMService()._update_properties_from_response([prop], [
+        {"id": str(prop.id), "price": "thỏa thuận", "bedroom": "", "area": "75 m²"}
+    ])
+    assert prop.price == 3e9
+    assert prop.bedroom == 2
+    assert prop.area == 75
+    assert prop.unit_price == 4e7
+
+
+class FakeRemoteBackend:
+    """Remote backend giả: trả về responses[id] và ghi lại các tin được gửi lên"""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.sent = []
+
+    async def enrich(self, descriptions, fields, usage=None):
+        self.sent.extend(desc["id"] for desc in descriptions)
+        for desc in descriptions:
+            if desc["id"] in self.responses:
+                yield {"id": desc["id"], **self.responses[desc["id"]]}
+
+
+def make_service(monkeypatch, mode, remote=None):
+    monkeypatch.setenv("LLM_BACKEND", mode)
+    monkeypatch.setenv("LLM_LOCAL_EXECUTOR", "thread")
+    service = LLMService()
+    service.remote_backend = remote
+    return service
+
+
+def test_local_backend_only_fills_fields_missing_on_each_property(monkeypatch):
+    service = make_service(monkeypatch, "local")
+    a = make_property(link="https://example.vn/a", title="Bán căn hộ chung cư", legal="Sổ đỏ chính chủ",
+                      description="Căn hộ 2PN, sổ hồng riêng")
+    b = make_property(link="https://example.vn/b", title="Bán nhà phố", description="Nhà đẹp, đã có sổ")
+    asyncio.run(service._process_single_batch([a, b]))
+    assert a.legal == "Sổ đỏ chính chủ"
+    assert b.legal == "đã có sổ"
+    assert a.type == "căn hộ"
+    assert b.type == "nhà phố"
+
+
+def test_local_backend_keeps_existing_type(monkeypatch):
+    service = make_service(monkeypatch, "local")
+    a = make_property(link="https://example.vn/a", title="Bán biệt thự", type="biệt thự",
+                      description="Biệt thự, kèm 2 căn hộ chung cư cho thuê")
+    b = make_property(link="https://example.vn/b", title="Cho thuê kho xưởng", description="Kho bãi rộng")
+    asyncio.run(service._process_single_batch([a, b]))
+    assert a.type == "biệt thự"
+    assert b.type == "kho xưởng"
+
+
+def test_hybrid_sends_only_low_confidence_items_and_guards_remote_fields(monkeypatch):
+    a = make_property(link="https://example.vn/a", title="Bán căn hộ chung cư cao cấp",
+                      description="Căn hộ chung cư, sổ hồng riêng. Gần trường học và siêu thị")
+    b = make_property(link="https://example.vn/b", title="Bán nhà", seller="Anh Minh", price=2e9,
+                      description="Nhà cách chợ 5 phút")
+    remote = FakeRemoteBackend({
+        str(b.id): {"seller": "Người khác", "price": None, "type": "nhà phố", "legal": None, "area": "50m2"},
+    })
+    service = make_service(monkeypatch, "hybrid", remote)
+    asyncio.run(service._process_single_batch([a, b]))
+
+    assert remote.sent == [str(b.id)]
+    assert a.type == "căn hộ" and a.legal == "sổ hồng riêng"
+    assert b.seller == "Anh Minh"  # đã có giá trị: remote không được ghi đè
+    assert b.price == 2e9  # null không xóa giá trị cũ
+    assert b.type == "nhà phố"
+    assert b.area == 50
+
+
+def test_hybrid_remote_does_not_overwrite_confident_local_fields(monkeypatch):
+    prop = make_property(link="https://example.vn/c", title="Bán nhà", description="Nhà cách chợ 5 phút")
+    remote = FakeRemoteBackend({str(prop.id): {"type": "nhà phố", "amenityLocation": "Gần chợ", "area": "60m2"}})
+    service = make_service(monkeypatch, "hybrid", remote)
+    fields_sent = []
+    enrich = remote.enrich
+
+    def record_fields(descriptions, fields, usage=None):
+        fields_sent.append(list(fields))
+        return enrich(descriptions, fields, usage)
+
+    remote.enrich = record_fields
+    asyncio.run(service._process_single_batch([prop]))
+
+    # Cục bộ chắc chắn về amenityLocation nhưng không phân loại được type: chỉ phần còn lại gửi remote
+    assert remote.sent == [str(prop.id)]
+    assert "amenityLocation" not in fields_sent[0] and "type" in fields_sent[0]
+    assert prop.amenityLocation == "Nhà cách chợ 5 phút"
+    assert prop.type == "nhà phố" and prop.area == 60
@@ -0,0 +1,26 @@
+import pytest
+
+from src.services.local_enrichment import classify_one, extract_amenities
+
+
+@pytest.mark.parametrize("text", [
+    "Cho thuê căn hộ", "Cho thue can ho gia re", "Bán nhà cho gia đình trẻ", "Thị trường sôi động",
+    "Có bảo vệ BV 24/7", "Nhà có ga ra ô tô",
+])
+def test_ordinary_words_are_not_amenities(text):
+    assert extract_amenities(text)[0] is None
+
+
+@pytest.mark.parametrize("text", [
+    "Gần chợ Bến Thành", "gan cho, truong hoc", "Cách ga Sài Gòn 1km", "Đối diện BV Chợ Rẫy",
+    "Gần trường học quốc tế", "Chợ dân sinh ngay cổng",
+])
+def test_amenities_are_confident(text):
+    assert extract_amenities(text) == (text, 0.8)
+
+
+def test_classify_one_skips_fields_already_present():
+    result = classify_one({"id": "1", "title": "Bán căn hộ", "legal": "Sổ đỏ", "description": "Sổ hồng riêng"},
+                          ["type", "legal"])
+    assert "legal" not in result and "legal" not in result["_confidence"]
+    assert result["type"] == "căn hộ"
@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from bson import ObjectId
+
+from src.services.normalization_service import NormalizationService
+
+
+def test_normalize_batch_sets_updated_at_only_on_changed_documents():
+    before = datetime.now()
+    docs = [
+        {"_id": ObjectId(), "price": "3,5 tỷ", "area": "80 m2", "city": "Hồ Chí Minh", "type": "căn hộ"},
+        {"_id": ObjectId(), "price": 3.5e9, "area": 80.0, "unit_price": 3.5e9 / 80, "city": "Hồ Chí Minh",
+         "type": "căn hộ"},
+    ]
+    updates = NormalizationService(batch_size=10).normalize_batch(docs)
+    assert [update._filter["_id"] for update in updates] == [docs[0]["_id"]]
+    fields = updates[0]._doc["$set"]
+    assert fields["price"] == 3.5e9 and fields["area"] == 80.0
+    assert fields["updated_at"] >= before
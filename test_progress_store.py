@@ -0,0 +1,131 @@
+import struct
+import threading
+from datetime import datetime
+
+import pytest
+
+from src.crawlers.base.observer import ProgressObserver
+from src.data.models.CrawlStatsModel import CrawlStats
+from src.utils import progress_store
+from src.utils.progress_store import COUNTERS, HEADER, MAGIC, ProgressStore
+
+
+def counters(value):
+    return {name: value for name in COUNTERS}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "progress.bin")
+
+
+def test_round_trip(path):
+    writer = ProgressStore(path, ["site_a", "site_b"], pid=101)
+    writer.write("site_a", "running", {"pages": 3, "extracted": 40, "saved": 12}, 2.5, 1000.0)
+    progress = ProgressStore(path, ["site_a", "site_b"]).read_all()
+    assert set(progress) == {"site_a"}
+    record = progress["site_a"]
+    assert record["status"] == "running" and record["pages"] == 3 and record["extracted"] == 40
+    assert record["saved"] == 12 and record["links"] == 0
+    assert record["throughput"] == 2.5 and record["start_time"] == 1000.0 and record["pids"] == [101]
+
+    writer.write("site_a", "completed", {"pages": 5, "extracted": 50, "saved": 50}, 1.0, 1000.0)
+    assert ProgressStore(path, ["site_a"]).read_all()["site_a"]["saved"] == 50
+
+
+def test_processes_crawling_one_site_are_summed(path, monkeypatch):
+    clock = iter(range(2000, 3000))
+    monkeypatch.setattr(progress_store.time, "time", lambda: float(next(clock)))
+    a, b = ProgressStore(path, ["site"], pid=201), ProgressStore(path, ["site"], pid=202)
+    a.write("site", "running", counters(1), 1.0, 1500.0)
+    b.write("site", "running", counters(2), 2.0, 1600.0)
+    # b bắt đầu shard sau, crawl_started của b không xóa bộ đếm của a
+    b.write("site", "running", counters(0), 0.0, 1600.0)
+    a.write("site", "completed", counters(5), 1.0, 1500.0)
+    record = ProgressStore(path, ["site"]).read_all()["site"]
+    assert record["status"] == "running"
+    assert record["extracted"] == 5 and record["saved"] == 5
+    assert record["throughput"] == 0.0 and record["start_time"] == 1500.0 and record["pids"] == [201, 202]
+
+
+def test_previous_run_of_another_process_is_not_summed(path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(progress_store.time, "time", lambda: now[0])
+    ProgressStore(path, ["site"], pid=301).write("site", "completed", counters(7), 1.0, 900.0)
+    now[0] = 5000.0
+    ProgressStore(path, ["site"], pid=302).write("site", "running", counters(2), 1.0, 4900.0)
+    record = ProgressStore(path, ["site"]).read_all()["site"]
+    assert record["extracted"] == 2 and record["pids"] == [302]
+
+
+def test_dead_process_slot_is_reused_when_full(path, monkeypatch):
+    monkeypatch.setattr(progress_store, "_pid_alive", lambda pid: pid != 7)
+    stores = [ProgressStore(path, ["site"], pid=pid) for pid in range(1, progress_store.MAX_SLOTS + 1)]
+    for store in stores:
+        store.write("site", "completed", counters(1), 0.0, 0)
+    ProgressStore(path, ["site"], pid=9999).write("site", "running", counters(3), 0.0, 0)
+    with pytest.raises(RuntimeError):
+        ProgressStore(path, ["site"], pid=10000).write("site", "running", counters(3), 0.0, 0)
+    assert 7 not in ProgressStore(path, ["site"]).read_all()["site"]["pids"]
+    assert 9999 in ProgressStore(path, ["site"]).read_all()["site"]["pids"]
+
+
+def test_torn_slot_is_not_returned(path):
+    writer = ProgressStore(path, ["site"], pid=1)
+    writer.write("site", "running", counters(1), 0.0, 0)
+    offset = writer._offset(writer._slots["site"])
+    struct.pack_into("<I", writer._mmap, offset, struct.unpack_from("<I", writer._mmap, offset)[0] + 1)
+    assert ProgressStore(path, ["site"]).read_all() == {}
+    writer.write("site", "running", counters(2), 0.0, 0)  # writer kế tiếp sửa seq lẻ
+    assert ProgressStore(path, ["site"]).read_all()["site"]["extracted"] == 2
+
+
+def test_reads_during_writes_are_consistent(path):
+    writer = ProgressStore(path, ["site"], pid=1)
+    writer.write("site", "running", counters(0), 0.0, 0)
+    reader = ProgressStore(path, ["site"])
+    stop = threading.Event()
+
+    def write_loop():
+        value = 0
+        while not stop.is_set():
+            value += 1
+            writer.write("site", "running", counters(value), float(value), 0)
+
+    thread = threading.Thread(target=write_loop)
+    thread.start()
+    try:
+        for _ in range(2000):
+            record = reader.read_all().get("site")
+            if record:
+                assert len({record[name] for name in COUNTERS}) == 1
+                assert record["throughput"] == record["pages"]
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_old_version_file_is_recreated_by_writer(path):
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, 1, 32) + b"\x00" * 4096)
+    assert ProgressStore(path, ["site"]).read_all() == {}
+    ProgressStore(path, ["site"], pid=1).write("site", "running", counters(1), 0.0, 0)
+    assert ProgressStore(path, ["site"]).read_all()["site"]["extracted"] == 1
+
+
+def test_observer_flush_publishes_counts_after_crawl_completed(path):
+    store = ProgressStore(path, ["site"], pid=1)
+    observer = ProgressObserver(store=store, flush_interval=3600)
+    stats = CrawlStats(source="site", start_time=datetime.now(), status="running")
+    observer.notify("crawl_started", stats, "site")
+    observer.notify("property_extracted", object(), "site")
+    stats.total_items, stats.end_time = 1, datetime.now()
+    observer.notify("crawl_completed", stats, "site")
+    # Hàng đợi LLM drain sau crawl_completed: bị throttle, chưa ghi ra store
+    observer.notify("property_enriched", object(), "site")
+    observer.notify("property_saved", object(), "site")
+    reader = ProgressStore(path, ["site"])
+    assert reader.read_all()["site"]["saved"] == 0
+    observer.flush("site")
+    record = reader.read_all()["site"]
+    assert record["status"] == "completed" and record["enriched"] == 1 and record["saved"] == 1
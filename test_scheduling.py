@@ -0,0 +1,85 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from src.config.settings import Config
+from src.services import scheduling
+from src.services.scheduling import AdmissionController, cron_trigger
+
+
+def test_cron_trigger_parses_five_fields_with_jitter():
+    trigger = cron_trigger("30 2,14 * * mon-fri", jitter=120, timezone="Asia/Ho_Chi_Minh")
+    fields = {field.name: str(field) for field in trigger.fields}
+    assert fields["minute"] == "30" and fields["hour"] == "2,14" and fields["day_of_week"] == "mon-fri"
+    assert trigger.jitter == 120 and str(trigger.timezone) == "Asia/Ho_Chi_Minh"
+    assert cron_trigger("0 2 * * *").jitter is None
+
+
+@pytest.mark.parametrize("expression", ["0 2 * *", "0 2 * * * *", ""])
+def test_cron_trigger_rejects_wrong_field_count(expression):
+    with pytest.raises(ValueError):
+        cron_trigger(expression)
+
+
+def test_cron_trigger_rejects_invalid_values():
+    with pytest.raises(ValueError):
+        cron_trigger("61 2 * * *")
+
+
+@pytest.fixture
+def load(monkeypatch):
+    """Tải giả của máy: cpu/memory (%) chỉnh được trong test"""
+    state = SimpleNamespace(cpu=10.0, memory=20.0)
+    monkeypatch.setattr(scheduling.psutil, "cpu_percent", lambda interval=None: state.cpu)
+    monkeypatch.setattr(scheduling.psutil, "virtual_memory", lambda: SimpleNamespace(percent=state.memory))
+    monkeypatch.setenv("ADMISSION_MAX_CPU_PERCENT", "80")
+    monkeypatch.setenv("ADMISSION_MAX_MEMORY_PERCENT", "90")
+    monkeypatch.setenv("ADMISSION_MAX_CONCURRENT", "2")
+    monkeypatch.setenv("ADMISSION_MAX_RSS_MB", "0")
+    return state
+
+
+def test_admission_thresholds(load):
+    admission = AdmissionController(Config())
+    assert admission.admit("a", 0, running=1) is None
+    assert "crawls running" in admission.admit("a", 0, running=2)
+    load.cpu = 80.0
+    assert "CPU" in admission.admit("a", 0, running=0)
+    load.cpu, load.memory = 10.0, 95.0
+    assert "memory" in admission.admit("a", 0, running=0)
+    load.memory = 20.0
+    assert admission.admit("a", 0, running=0) is None
+    assert admission.waiting == {}
+
+
+def test_admission_prefers_higher_priority_waiting_sites(load):
+    admission = AdmissionController(Config())
+    load.cpu = 99.0
+    assert admission.admit("low", 1, running=0)
+    assert admission.admit("high", 5, running=0)
+    load.cpu = 10.0
+    # Máy hết tải: site priority thấp vẫn phải nhường site priority cao đang chờ
+    assert "high" in admission.admit("low", 1, running=0)
+    assert admission.admit("high", 5, running=0) is None
+    assert admission.admit("low", 1, running=0) is None
+    assert admission.waiting == {}
+
+
+def test_admission_is_safe_across_scheduler_threads(load):
+    admission = AdmissionController(Config())
+    load.cpu = 99.0
+    sites = [f"site_{i}" for i in range(50)]
+    barrier = threading.Barrier(len(sites))
+
+    def admit(site):
+        barrier.wait()
+        for _ in range(20):
+            admission.admit(site, 0, running=0)
+
+    threads = [threading.Thread(target=admit, args=(site,)) for site in sites]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert set(admission.waiting) == set(sites)
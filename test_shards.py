@@ -0,0 +1,109 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.crawlers.base import base_crawler, rate_limiter
+from src.crawlers.base.base_crawler import BaseCrawler
+from src.crawlers.base.rate_limiter import DomainRateLimiter
+from src.crawlers.base.shards import Shard, plan_shards
+
+
+def test_plan_shards_last_shard_is_partial():
+    assert plan_shards(["s1", "s2"], pages=7, shard_pages=3) == [
+        Shard("s1", 1, 3), Shard("s1", 4, 6), Shard("s1", 7, 7),
+        Shard("s2", 1, 3), Shard("s2", 4, 6), Shard("s2", 7, 7),
+    ]
+
+
+@pytest.mark.parametrize("pages, shard_pages, expected", [
+    (6, 3, [(1, 3), (4, 6)]),  # chia hết
+    (5, None, [(1, 5)]),  # không chia: cả site một shard
+    (2, 5, [(1, 2)]),  # shard lớn hơn số trang
+    (3, 0, [(1, 3)]),
+    (1, 1, [(1, 1)]),
+])
+def test_plan_shards_covers_every_page_once(pages, shard_pages, expected):
+    shards = plan_shards(["s"], pages, shard_pages)
+    assert [(shard.first_page, shard.last_page) for shard in shards] == expected
+    covered = [page for shard in shards for page in range(shard.first_page, shard.last_page + 1)]
+    assert covered == list(range(1, pages + 1))
+
+
+@pytest.fixture
+def frozen_clock(monkeypatch):
+    """Đồng hồ đứng yên ở 100.0, asyncio.sleep chỉ ghi lại thời gian chờ"""
+    sleeps = []
+
+    async def sleep(seconds):
+        sleeps.append(round(seconds, 6))
+
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: 100.0)
+    monkeypatch.setattr(rate_limiter.asyncio, "sleep", sleep)
+    return sleeps
+
+
+def test_rate_limiter_reserves_consecutive_slots_for_concurrent_acquire(frozen_clock):
+    limiter = DomainRateLimiter(min_interval=0.5)
+
+    async def run():
+        await asyncio.gather(*(limiter.acquire(f"https://www.site.vn/page/{i}") for i in range(4)))
+        await limiter.acquire("https://site.vn/listing", requests=3)  # lô 3 trang giữ 3 khe
+        await limiter.acquire("https://site.vn/detail")
+        await limiter.acquire("https://other.vn/detail")  # domain khác không phải chờ
+
+    asyncio.run(run())
+    assert frozen_clock == [0.5, 1.0, 1.5, 2.0, 3.5]
+    assert limiter._next_slot == {"site.vn": 104.0, "other.vn": 100.5}
+
+
+def test_rate_limiter_disabled_with_zero_interval(frozen_clock):
+    limiter = DomainRateLimiter(min_interval=0)
+    asyncio.run(limiter.acquire("https://site.vn/1", requests=10))
+    assert frozen_clock == [] and limiter._next_slot == {}
+
+
+class FakeBrowser:
+    """AsyncWebCrawler giả: trang listing có 2 link, tin chi tiết lỗi nếu url chứa 'broken'"""
+
+    async def arun_many(self, urls, config=None, dispatcher=None):
+        return [SimpleNamespace(success=True, html=f"<p>{url}</p>", status_code=200) for url in urls]
+
+    async def arun(self, url):
+        return SimpleNamespace(success="broken" not in url, html=f"<p>{url}</p>", status_code=200)
+
+
+class FakeCrawler(BaseCrawler):
+
+    def build_pagination_url(self, base_url, page):
+        return f"{base_url}?p={page}"
+
+    def extract_links_from_page(self, soup):
+        url = soup.get_text()
+        return [{"url": f"{url}&item={i}"} for i in range(2)]
+
+    def extract_property_details(self, soup, url):
+        return {"title": f"Tin {url}", "description": "mô tả"}
+
+
+def test_shards_merge_counters_into_one_crawl_stats(monkeypatch):
+    monkeypatch.setattr(base_crawler.config, "PAGES_SITE", 5)
+    monkeypatch.setattr(base_crawler.config, "SHARD_PAGES", 2)
+    monkeypatch.setattr(base_crawler.config, "SHARD_CONCURRENCY", 2)
+    monkeypatch.setattr(base_crawler.config, "LINK_PER_BATCH", 20)
+    crawler = FakeCrawler("fake", {"base_url": "https://fake.vn",
+                                   "search_urls": ["https://fake.vn/ban", "https://fake.vn/broken"], "delay": 0})
+    crawler.rate_limiter = DomainRateLimiter(min_interval=0)
+    # Tin thứ 2 của mỗi trang đã có trong DB
+    crawler.repository = SimpleNamespace(exists_by_link=lambda url: url.endswith("item=1"))
+
+    properties = asyncio.run(crawler.crawl_all(FakeBrowser()))
+
+    stats = crawler.crawl_stats
+    # 2 search URL x 3 shard (1-2, 3-4, 5), 5 trang mỗi search URL
+    assert stats.total_pages == 10
+    assert stats.duplicate_items == 10
+    assert stats.failed_items == 5  # tin của search URL broken
+    assert stats.successful_items == len(properties) == 5
+    assert stats.total_items == 20
+    assert stats.status == "completed"
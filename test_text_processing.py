@@ -0,0 +1,146 @@
+import re
+
+import pytest
+
+from src.utils.text_processing import extract_area, extract_phone, extract_price, normalize_phone, parse_many, \
+    parse_quantities
+
+
+def legacy_extract_price(text):
+    """extract_price trước khi chuyển sang bộ quét một lượt, dùng làm mốc so sánh"""
+    if not text:
+        return None
+    text = text.lower().replace(',', '.').replace('  ', ' ')
+    total = 0
+    ty_match = re.search(r'(\d+(?:[.,]\d+)?)\s*t[ỷy]', text)
+    trieu_match = re.search(r'(\d+(?:[.,]\d+)?)\s*triệu', text)
+    nghin_match = re.search(r'(\d+(?:[.,]\d+)?)\s*(nghìn|ngàn|k)', text)
+    if ty_match:
+        total += float(ty_match.group(1).replace(',', '.')) * 1_000_000_000
+    if trieu_match:
+        total += float(trieu_match.group(1).replace(',', '.')) * 1_000_000
+    if nghin_match:
+        total += float(nghin_match.group(1).replace(',', '.')) * 1_000
+    if total > 0:
+        return total
+    patterns = [
+        (r'(\d+)[,\.](\d+)\s*tỷ', 1_000_000_000),
+        (r'(\d+)[,\.](\d+)\s*ty', 1_000_000_000),
+        (r'(\d+)\s*tỷ', 1_000_000_000),
+        (r'(\d+)\s*ty', 1_000_000_000),
+        (r'(\d+)[,\.](\d+)\s*triệu', 1_000_000),
+        (r'(\d+)[,\.](\d+)\s*tr(?![aăâ])', 1_000_000),
+        (r'(\d+)\s*triệu', 1_000_000),
+        (r'(\d+)\s*tr(?![aăâ])', 1_000_000),
+        (r'(\d+)[,\.](\d+)\s*nghìn', 1_000),
+        (r'(\d+)[,\.](\d+)\s*ngàn', 1_000),
+        (r'(\d+)[,\.](\d+)\s*k', 1_000),
+        (r'(\d+)\s*nghìn', 1_000),
+        (r'(\d+)\s*ngàn', 1_000),
+        (r'(\d+)\s*k', 1_000),
+        (r'(\d+(?:\d{3})*)', 1),
+    ]
+    for pattern, multiplier in patterns:
+        match = re.search(pattern, text)
+        if match:
+            if len(match.groups()) == 2:
+                integer_part, decimal_part = int(match.group(1)), int(match.group(2))
+                value = integer_part + decimal_part / (10.0 if decimal_part < 10 else 100.0)
+            else:
+                value = float(match.group(1))
+            return value * multiplier
+    return None
+
+
+def legacy_extract_area(text):
+    if not text:
+        return None
+    text = text.lower().replace(',', '.')
+    for pattern in (r'(\d+(?:\.\d+)?)\s*m[²2]', r'(\d+(?:\.\d+)?)\s*m\s*2', r'(\d+(?:\.\d+)?)\s*mét\s*vuông',
+                    r'(\d+(?:\.\d+)?)\s*met\s*vuong'):
+        match = re.search(pattern, text)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+PRICE_TEXTS = [
+    "5 tỷ", "3,5 tỷ", "3.5 tỷ", "12 tỷ 500 triệu", "1 tỷ 250 triệu", "850 triệu", "40 triệu/tháng",
+    "850tr", "15tr/tháng", "3,2tr", "500 nghìn", "700 ngàn", "900k", "Giá: 6,8 tỷ (thương lượng)",
+    "Nhà 1 trệt 2 lầu giá 5 tỷ", "Giá 4,5 tỷ gần 2 trường học", "2 tầng 1 trệt 900 triệu",
+    "Bán gấp 3 tỷ, sổ hồng, 2 trệt", "Cho thuê 12 triệu, gần 3 trường", "1 tỷ 2 trường học", "5tr5",
+    "Giá 2,35 tỷ", "", None,
+]
+
+
+@pytest.mark.parametrize("text", PRICE_TEXTS)
+def test_price_matches_legacy_parser(text):
+    assert extract_price(text) == pytest.approx(legacy_extract_price(text))
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Nhà 1 trệt 2 lầu giá 5 tỷ", 5e9),
+    ("Giá 4,5 tỷ gần 2 trường học", 4.5e9),
+    ("Cho thuê 12 triệu, gần 3 trường", 12e6),
+])
+def test_words_starting_with_tr_are_not_millions(text, expected):
+    assert extract_price(text) == expected
+    assert parse_quantities(text)['price'] == expected
+
+
+@pytest.mark.parametrize("text", [
+    "120 m²", "85m2", "72,5 m2", "100 mét vuông", "60 met vuong", "Diện tích 5 x 20 = 100 m 2", "không rõ", None,
+])
+def test_area_matches_legacy_parser(text):
+    assert extract_area(text) == legacy_extract_area(text)
+
+
+@pytest.mark.parametrize("text, expected", [
+    # Cải tiến so với parser cũ: phân cách hàng nghìn, "trieu" không dấu trong dạng "x tỷ y triệu"
+    ("1.200.000.000 đ", 1.2e9),
+    ("2 ty 300 trieu", 2.3e9),
+])
+def test_price_improvements_over_legacy(text, expected):
+    assert extract_price(text) == expected
+
+
+def test_parse_quantities_single_pass():
+    result = parse_quantities("Cho thuê nhà 1 trệt 2 lầu, 80 m², 25 triệu/tháng, đơn giá 300 nghìn/m²")
+    assert result == {'price': 25e6, 'unit_price': 3e5, 'area': 80, 'per_month': True}
+
+
+def test_parse_many_matches_parse_quantities():
+    texts = ["3 tỷ 80m2", "40tr/tháng", None, "gần 2 trường"]
+    assert parse_many(texts) == [parse_quantities(text) for text in texts]
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("0909123456", "+84909123456"),
+    ("0909.123.456", "+84909123456"),
+    ("0909 123 456", "+84909123456"),
+    ("+84 909 123 456", "+84909123456"),
+    ("(+84) 909-123-456", "+84909123456"),
+    ("84909123456", "+84909123456"),
+    ("+84 0909123456", "+84909123456"),  # viết thừa số 0 sau mã quốc gia
+    ("028.3812.3456", "+842838123456"),  # cố định: 10 chữ số đầu 2
+    ("+84 28 3812 3456", "+842838123456"),
+])
+def test_normalize_phone_to_e164(raw, expected):
+    assert normalize_phone(raw) == expected
+
+
+@pytest.mark.parametrize("raw", [None, "", "abc", "0123456", "0909 123 45", "0109123456", "12345678901234"])
+def test_normalize_phone_rejects_invalid(raw):
+    assert normalize_phone(raw) is None
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Liên hệ 0909.123.456 chính chủ", "+84909123456"),
+    ("Giá 3 tỷ, DT 80m2, LH: +84 912 345 678", "+84912345678"),
+    ("Mã tin 12345678901, gọi 0987654321", "+84987654321"),  # bỏ qua dãy số không phải SĐT
+    ("Hotline 1900 1234", None),
+    ("diện tích 084 m2", None),
+    (None, None),
+])
+def test_extract_phone_first_valid_number(text, expected):
+    assert extract_phone(text) == expected